@@ -0,0 +1,332 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+#################################################################################################################################
+# Bulk almanac generator: rise, set and transit of the Sun and the Moon, and twilight times,
+# for many sites over many days.
+# The geocentric positions only depend on time, so they are evaluated once per grid instant
+# and shared by all sites and twilight levels. For each site only the topocentric elevation
+# and hour angle are computed on the grid, with the sidereal time obtained by rotating the
+# Greenwich value instead of calling the trigonometric functions again. Events are bracketed
+# by sign changes and refined on the local cubic, as in RiseSetSolver.
+#################################################################################################################################
+
+import math
+import sys
+import time
+import numpy as np
+
+import Calendar
+from SunMoonCalculator import SunMoonCalculator, DEG_TO_RAD
+import SunMoonBatch
+
+
+# Step in days of the grid used to bracket the events.
+STEP = 10.0 / 1440.0
+
+# Number of sites and days in each block of the output.
+SITES_PER_BLOCK = 256
+DAYS_PER_BLOCK = 32
+
+# Twilight levels computed by default, with the names of their columns.
+TWILIGHTS = {
+    SunMoonCalculator.TWILIGHT.CIVIL: 'civil',
+    SunMoonCalculator.TWILIGHT.NAUTICAL: 'nautical',
+    SunMoonCalculator.TWILIGHT.ASTRONOMICAL: 'astronomical'
+}
+
+
+#/**
+# * Geocentric apparent positions of a body on a grid of instants.
+# * @param jd The grid of Julian days in UT.
+# * @param TTminusUT TT minus UT in seconds, scalar or array.
+# * @return The time dependent parameters returned by {@linkplain SunMoonBatch#getTimeState}
+# * for longitude 0, the equatorial rectangular coordinates in AU of the Sun and the Moon
+# * with shape (3, instants), and their angular radius.
+# */
+def getGeocentric(jd, TTminusUT):
+    state = SunMoonBatch.getTimeState(jd, TTminusUT, 0.0)
+    sunPos = SunMoonBatch.getSun(state[0])
+    moonPos = SunMoonBatch.getMoon(state[0])[0]
+
+    out = []
+    for pos in (sunPos, moonPos):
+        x, y, z = SunMoonBatch.getGeocentricEquatorial(pos, state)[:3]
+        out.append((np.array([x, y, z]), pos[3]))
+    return state, out[0], out[1]
+
+
+#/**
+# * Topocentric elevation and hour angle functions of a body for a set of sites.
+# * @param xyz Geocentric equatorial rectangular coordinates, shape (3, instants).
+# * @param cosLst Cosine of the local apparent sidereal time, shape (sites, instants).
+# * @param sinLst Sine of the local apparent sidereal time, shape (sites, instants).
+# * @param obsLat Latitudes in radians, shape (sites, 1).
+# * @param obsAlt Altitudes in m, shape (sites, 1).
+# * @return The sine of the geometric elevation, the cosine of the elevation times the
+# * cosine of the azimuth measured from the south, a function with the sign of the
+# * sine of the hour angle, and true where the body is in the upper half of the meridian.
+# */
+def getTopocentric(xyz, cosLst, sinLst, obsLat, obsAlt):
+    # Same reduction to the geocentric latitude as SunMoonBatch.getTopocentric
+    geocLat = obsLat - .1925 * np.sin(2 * obsLat) * DEG_TO_RAD
+    geocR = 1.0 - np.sin(obsLat) ** 2 / 298.257
+    radiusAU = (geocR * SunMoonCalculator.EARTH_RADIUS + obsAlt * 0.001) / SunMoonCalculator.AU
+
+    # Component of the geocentric position towards the meridian of each site
+    x, y, z = xyz
+    meridian = x * cosLst + y * sinLst
+    west = x * sinLst - y * cosLst
+
+    # Topocentric vector d = r - o, and sin(alt) = d . zenith / |d|
+    rho = radiusAU * np.cos(geocLat)
+    rhoZ = radiusAU * np.sin(geocLat)
+    r2 = x * x + y * y + z * z
+    d = np.sqrt(r2 - 2 * (rho * meridian + rhoZ * z) + radiusAU * radiusAU)
+    sinAlt = (np.cos(obsLat) * (meridian - rho) + np.sin(obsLat) * (z - rhoZ)) / d
+    south = (np.sin(obsLat) * (meridian - rho) - np.cos(obsLat) * (z - rhoZ)) / d
+
+    return sinAlt, south, west, meridian > rho
+
+
+#/**
+# * Finds the roots of sampled functions of the sites from the brackets, by Newton
+# * iteration on the cubic through the four samples around each one.
+# * @param values The sampled functions, shape (sites, instants).
+# * @param site Site index of each bracket.
+# * @param index Start of each bracketing interval.
+# * @return The roots as fractional grid indexes.
+# */
+def refineRoots(values, site, index):
+    j = np.clip(index - 1, 0, values.shape[1] - 4)
+    g0, g1, g2, g3 = (values[site, j + k] for k in range(4))
+
+    # Newton form of the cubic in u = index - j
+    d1 = g1 - g0
+    d2 = (g2 - 2 * g1 + g0) / 2.0
+    d3 = (g3 - 3 * g2 + 3 * g1 - g0) / 6.0
+
+    lo = index - j
+    a = values[site, index]
+    u = lo + a / (a - values[site, index + 1])
+    for k in range(5):
+        f = g0 + u * (d1 + (u - 1) * (d2 + d3 * (u - 2)))
+        df = d1 + d2 * (2 * u - 1) + d3 * (3 * u * u - 6 * u + 2)
+        u = np.clip(u - f / np.where(df == 0, np.inf, df), lo, lo + 1.0)
+
+    return j + u
+
+
+#/**
+# * Cubic interpolation of sampled functions of the sites.
+# * @param values The sampled functions, shape (sites, instants).
+# * @param site Site index of each point.
+# * @param x Fractional grid index of each point.
+# * @return The interpolated values.
+# */
+def interpolate(values, site, x):
+    j = np.clip(np.floor(x).astype(int) - 1, 0, values.shape[1] - 4)
+    g0, g1, g2, g3 = (values[site, j + k] for k in range(4))
+    u = x - j
+    return g0 + u * ((g1 - g0) + (u - 1) * ((g2 - 2 * g1 + g0) / 2.0 + (g3 - 3 * g2 + 3 * g1 - g0) / 6.0 * (u - 2)))
+
+
+#/**
+# * Bins the roots of a function into the local days of each site, keeping the
+# * first one of each day.
+# * @param values The sampled function, shape (sites, instants).
+# * @param site Site index of each bracket.
+# * @param index Start of each bracketing interval.
+# * @param grid The grid of Julian days.
+# * @param dayStart Julian day of the start of the first local day of each site, shape (sites, 1).
+# * @param days Number of days.
+# * @return The Julian days of the events, shape (sites, days), -1 when there is no event,
+# * and the fractional grid indexes of the roots found with their site and day.
+# */
+def getDailyEvents(values, site, index, grid, dayStart, days):
+    x = refineRoots(values, site, index)
+    jd = grid[0] + x * STEP
+    day = np.floor(jd - dayStart[site, 0]).astype(int)
+    valid = (day >= 0) & (day < days)
+    site, day, x, jd = site[valid], day[valid], x[valid], jd[valid]
+
+    # Roots are sorted by site and time, so the first one of each key is the first of the day
+    key, first = np.unique(site * days + day, return_index = True)
+    out = np.full((len(dayStart), days), -1.0)
+    out.flat[key] = jd[first]
+    return out, site[first], day[first], x[first]
+
+
+#/**
+# * Computes the almanac for a block of sites and days.
+# * @param jd0 Julian day of the first date at 0h UT.
+# * @param days Number of dates.
+# * @param obsLon Longitudes in radians.
+# * @param obsLat Latitudes in radians.
+# * @param obsAlt Altitudes in m.
+# * @param dayStart Julian day of the start of the first local day of each site.
+# * @param twilights The twilight levels to compute for the Sun.
+# * @param grid The grid of Julian days, covering the local days of all sites.
+# * @param geocentric The positions on the grid returned by getGeocentric.
+# * @return The columns of the block, as a dictionary of arrays.
+# */
+def calcBlock(jd0, days, obsLon, obsLat, obsAlt, dayStart, twilights, grid, geocentric):
+    state, sun, moon = geocentric
+    dayStart = dayStart[:, None]
+
+    # Local sidereal time from the Greenwich one by the angle addition formulae
+    cosLon = np.cos(obsLon)[:, None]
+    sinLon = np.sin(obsLon)[:, None]
+    cosGst = np.cos(state[4])
+    sinGst = np.sin(state[4])
+    cosLst = cosGst * cosLon - sinGst * sinLon
+    sinLst = sinGst * cosLon + cosGst * sinLon
+
+    lat = obsLat[:, None]
+    alt = obsAlt[:, None]
+    columns = {
+        'site': None,
+        'date': None
+    }
+    bodies = [('sun', sun, [(SunMoonCalculator.TWILIGHT.HORIZON_34arcmin, '')] + [(tw, TWILIGHTS[tw]) for tw in twilights]),
+        ('moon', moon, [(SunMoonCalculator.TWILIGHT.HORIZON_34arcmin, '')])]
+    for name, (xyz, angR), levels in bodies:
+        sinAlt, south, west, upper = getTopocentric(xyz, cosLst, sinLst, lat, alt)
+
+        for twilight, prefix in levels:
+            height = sinAlt - np.sin(SunMoonCalculator.getTwilightElevation(twilight, angR))
+            above = height >= 0
+            site, index = np.nonzero(above[:, :-1] != above[:, 1:])
+            rising = above[site, index + 1]
+            rise = getDailyEvents(height, site[rising], index[rising], grid, dayStart, days)[0]
+            set = getDailyEvents(height, site[~rising], index[~rising], grid, dayStart, days)[0]
+            if (prefix == ''):
+                columns[name + 'Rise'] = rise
+                columns[name + 'Set'] = set
+            else:
+                columns[prefix + 'Dawn'] = rise
+                columns[prefix + 'Dusk'] = set
+
+        # Transit when the hour angle goes through 0 in the upper half of the meridian
+        site, index = np.nonzero((west[:, :-1] < 0) & (west[:, 1:] >= 0) & upper[:, :-1] & upper[:, 1:])
+        transit, site, day, x = getDailyEvents(west, site, index, grid, dayStart, days)
+        transitElevation = np.zeros(transit.shape)
+        # The body is on the meridian, the elevation is well defined also near the zenith
+        elevation = np.arctan2(interpolate(sinAlt, site, x), np.abs(interpolate(south, site, x)))
+        transitElevation[site, day] = SunMoonBatch.refraction(elevation)
+        columns[name + 'Transit'] = transit
+        columns[name + 'TransitElevation'] = transitElevation
+
+    sites = len(obsLon)
+    columns['site'] = np.repeat(np.arange(sites), days)
+    columns['date'] = np.tile(jd0 + np.arange(days, dtype=float), sites)
+    for key in columns:
+        columns[key] = columns[key].ravel()
+    return columns
+
+
+#/**
+# * Generates the almanac for a set of sites and a range of dates. Blocks of rows are
+# * yielded as they are computed, each one a dictionary of equal length arrays:
+# * site index and date (Julian day at 0h UT), followed by the Julian days in UT of
+# * sunRise, sunSet, sunTransit, moonRise, moonSet and moonTransit, the apparent
+# * sunTransitElevation and moonTransitElevation in radians, and the dawn and dusk of
+# * each twilight level (civilDawn, civilDusk, ...). Events are searched within the
+# * local day of each site; the first one is reported if there are several, and -1
+# * if there is none (0 for the transit elevations).
+# * @param jdStart Julian day of the first date, rounded down to 0h UT.
+# * @param days Number of dates.
+# * @param obsLon Longitudes of the sites in radians.
+# * @param obsLat Latitudes of the sites in radians.
+# * @param obsAlt Altitudes of the sites in m.
+# * @param timeZone Offset of the local time to UT in hours, scalar or one per site.
+# * By default the local mean time from the longitude.
+# * @param twilights The twilight levels to compute for the Sun.
+# * @param TTminusUT TT minus UT in seconds, or None to compute it for each instant.
+# * @return A generator of column blocks, each one for a block of dates and sites.
+# */
+def generateAlmanac(jdStart, days, obsLon, obsLat, obsAlt = 0.0, timeZone = None,
+        twilights = tuple(TWILIGHTS), TTminusUT = None):
+    obsLon = np.atleast_1d(np.asarray(obsLon, dtype=float))
+    obsLat = np.broadcast_to(np.asarray(obsLat, dtype=float), obsLon.shape)
+    obsAlt = np.broadcast_to(np.asarray(obsAlt, dtype=float), obsLon.shape)
+    if (timeZone is None):
+        timeZone = obsLon * (12.0 / math.pi)
+    timeZone = np.broadcast_to(np.asarray(timeZone, dtype=float), obsLon.shape)
+
+    jd0 = math.floor(jdStart - 0.5) + 0.5
+    dayStart = jd0 - timeZone / 24.0
+    for day in range(0, days, DAYS_PER_BLOCK):
+        n = min(DAYS_PER_BLOCK, days - day)
+
+        # The grid covers the local days of all sites plus the samples needed by the cubic
+        first = math.floor((dayStart.min() - jd0) / STEP) - 2
+        last = math.ceil((dayStart.max() + n - jd0) / STEP) + 2
+        grid = jd0 + day + np.arange(first, last + 1) * STEP
+        geocentric = getGeocentric(grid, SunMoonBatch.getTTminusUT(grid) if TTminusUT is None else TTminusUT)
+
+        for site in range(0, len(obsLon), SITES_PER_BLOCK):
+            sites = slice(site, site + SITES_PER_BLOCK)
+            block = calcBlock(jd0 + day, n, obsLon[sites], obsLat[sites], obsAlt[sites], dayStart[sites] + day,
+                twilights, grid, geocentric)
+            block['site'] += site
+            yield block
+
+
+#/**
+# * Writes almanac blocks as CSV.
+# * @param blocks The blocks returned by generateAlmanac.
+# * @param out The output text stream.
+# */
+def writeCsv(blocks, out):
+    header = True
+    for block in blocks:
+        if (header):
+            out.write(','.join(block.keys()) + '\n')
+            header = False
+        rows = np.column_stack([block[key] for key in block])
+        np.savetxt(out, rows, delimiter=',', fmt=['%d', '%.1f'] + ['%.6f'] * (rows.shape[1] - 2))
+
+
+def main():
+    # Usage: python Almanac.py <number of sites> <year> [output csv]
+    sites = int(sys.argv[1])
+    year = int(sys.argv[2])
+
+    rng = np.random.default_rng(0)
+    obsLon = rng.uniform(-math.pi, math.pi, sites)
+    obsLat = np.arcsin(rng.uniform(math.sin(-60 * DEG_TO_RAD), math.sin(60 * DEG_TO_RAD), sites))
+    jdStart = Calendar.toJulianDay(year, 1, 1)
+    days = int(Calendar.toJulianDay(year + 1, 1, 1) - jdStart)
+
+    start = time.perf_counter()
+    blocks = generateAlmanac(jdStart, days, obsLon, obsLat)
+    if (len(sys.argv) > 3):
+        with open(sys.argv[3], 'w') as out:
+            writeCsv(blocks, out)
+    else:
+        rows = sum(len(block['site']) for block in blocks)
+        print(str(rows) + " rows")
+    print("Time: " + str(time.perf_counter() - start) + " s")
+
+if __name__ == '__main__':
+    main()
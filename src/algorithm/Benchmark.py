@@ -0,0 +1,376 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+
+#################################################################################################################################
+# Benchmarks of the calculator hot paths, with baselines and regression gates.
+# Each case is timed in samples of several calls, long enough for the timer resolution, and
+# the best sample gives the time per call and the throughput. Results can be saved as a JSON
+# baseline, and later runs compared against it: the run fails when a case is slower than its
+# baseline by more than the threshold. Baselines are only comparable on the same machine, so
+# none is kept in the repository: each host and environment has its own default baseline in
+# benchmarks/, see {@linkplain #getBaselinePath}. Run with --save on the reference commit
+# first, then with --compare after the changes. A baseline from another environment can be
+# given as the path of --compare, with a warning.
+# Usage: python Benchmark.py [-k filter] [--save [path]] [--compare [path]] [--threshold 0.25]
+#################################################################################################################################
+
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+import numpy as np
+
+from SunMoonCalculator import SunMoonCalculator, DEG_TO_RAD
+import Calendar
+import Refraction
+import SunMoonBatch
+
+
+# Minimum duration in seconds of each timed sample.
+SAMPLE_TIME = 0.05
+
+# Number of samples of each case.
+SAMPLES = 5
+
+# Directory of the default baselines, not under version control.
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks')
+
+# Default fraction of slowdown respect to the baseline that fails the run.
+THRESHOLD = 0.25
+
+# Observer and instant of the scalar cases, and start of the year of the series, as in the verifier notebook.
+OBS_LON = 19 * DEG_TO_RAD
+OBS_LAT = 54 * DEG_TO_RAD
+OBS_ALT = 1000
+DATE = datetime(2021, 12, 31)
+
+# Step in days of the year long series.
+SERIES_STEP = 0.1
+
+
+#/**
+# * Returns a calculator for the benchmark observer at an instant.
+# * @param date The instant, DATE by default.
+# * @return The calculator.
+# */
+def getCalculator(date = DATE):
+    return SunMoonCalculator(date=date, obsLat=OBS_LAT, obsLon=OBS_LON, obsAlt=OBS_ALT)
+
+
+#/**
+# * Returns a function giving a new instant each call, a little after the previous one,
+# * so that no case is timed on cached time dependent parameters.
+# * @param calc The calculator.
+# * @return The function.
+# */
+def getInstants(calc):
+    jd0 = calc.jd_UT
+    counter = iter(range(1 << 62))
+    return lambda: jd0 + next(counter) * 1.0e-4
+
+
+# Each case returns the function to time and the number of items it computes per call.
+
+def caseGetSun():
+    calc = getCalculator()
+    return calc.getSun, 1
+
+def caseGetMoon():
+    calc = getCalculator()
+    return calc.getMoon, 1
+
+def caseGetMoonAccuracy(accuracy):
+    def setup():
+        calc = getCalculator()
+        calc.setAccuracy(accuracy)
+        return calc.getMoon, 1
+    return setup
+
+def caseDoCalc():
+    calc = getCalculator()
+    pos = calc.getMoon()
+    return lambda: calc.doCalc(pos, False), 1
+
+def caseSetUTDate():
+    calc = getCalculator()
+    instants = getInstants(calc)
+    return lambda: calc.setUTDate(instants()), 1
+
+def caseRefraction():
+    return lambda: SunMoonCalculator.refraction(0.01), 1
+
+def caseRefractionArray():
+    alt = np.linspace(-5, 90, 100000) * DEG_TO_RAD
+    return lambda: SunMoonBatch.refraction(alt), len(alt)
+
+def caseRefractionNewtonArray():
+    model = Refraction.Refraction()
+    alt = np.linspace(-5, 90, 100000) * DEG_TO_RAD
+    return lambda: model.getApparentElevation(alt), len(alt)
+
+def caseAccurateSunRise():
+    calc = getCalculator()
+    calc.calcSunAndMoon()
+    rise = calc.sun.rise
+    return lambda: calc.obtainAccurateRiseSetTransit(rise, SunMoonCalculator.EVENT.RISE, 5, True), 1
+
+def caseAccurateMoonSet():
+    calc = getCalculator()
+    calc.calcSunAndMoon()
+    set = calc.moon.set
+    return lambda: calc.obtainAccurateRiseSetTransit(set, SunMoonCalculator.EVENT.SET, 5, False), 1
+
+def caseCalcSunAndMoon(twilight):
+    def setup():
+        calc = getCalculator()
+        calc.setTwilight(twilight)
+        instants = getInstants(calc)
+        def run():
+            calc.setUTDate(instants())
+            calc.calcSunAndMoon()
+            # Read an event of each body, so that the rise/set solver runs for both
+            return calc.sun.rise, calc.moon.rise
+        return run, 1
+    return setup
+
+def caseCalcSunAndMoonPositions():
+    calc = getCalculator()
+    instants = getInstants(calc)
+    def run():
+        calc.setUTDate(instants())
+        calc.calcSunAndMoon()
+        return calc.moonAge, calc.moon.rightAscension, calc.moon.declination
+    return run, 1
+
+def caseMoonPhaseTime():
+    calc = getCalculator()
+    return lambda: calc.getMoonPhaseTime(SunMoonCalculator.MOONPHASE.FULL_MOON.value[1]), 1
+
+def caseNotebookSeries():
+    # The verifier notebook: one calculator per instant of a year at 0.1 day steps, items are instants
+    x = np.arange(0, 365, SERIES_STEP)
+    def run():
+        for d in x:
+            calc = getCalculator(DATE + timedelta(days=float(d)))
+            calc.calcSunAndMoon()
+    return run, len(x)
+
+def caseBatchSeries(accuracy = SunMoonCalculator.ACCURACY.FULL):
+    def setup():
+        jd = getCalculator().jd_UT + np.arange(0, 365, SERIES_STEP)
+        return lambda: SunMoonBatch.calcSunAndMoon(jd, OBS_LON, OBS_LAT, OBS_ALT, accuracy=accuracy), len(jd)
+    return setup
+
+def caseDateAsString():
+    jd = getCalculator().jd_UT + np.arange(0, 365, SERIES_STEP)
+    return lambda: Calendar.getDateAsString(jd), len(jd)
+
+
+# The cases by name.
+CASES = {
+    'getSun': caseGetSun,
+    'getMoon': caseGetMoon,
+    'doCalc': caseDoCalc,
+    'setUTDate': caseSetUTDate,
+    'refraction': caseRefraction,
+    'refraction.array': caseRefractionArray,
+    'refraction.newton.array': caseRefractionNewtonArray,
+    'obtainAccurateRiseSetTransit.sunRise': caseAccurateSunRise,
+    'obtainAccurateRiseSetTransit.moonSet': caseAccurateMoonSet,
+    'calcSunAndMoon.positions': caseCalcSunAndMoonPositions,
+    'getMoonPhaseTime': caseMoonPhaseTime,
+    'series.notebook': caseNotebookSeries,
+    'series.batch': caseBatchSeries(),
+    'series.dateAsString': caseDateAsString,
+}
+for twilight in SunMoonCalculator.TWILIGHT:
+    CASES['calcSunAndMoon.' + twilight.name] = caseCalcSunAndMoon(twilight)
+for accuracy in (SunMoonCalculator.ACCURACY.STANDARD, SunMoonCalculator.ACCURACY.RENDER):
+    CASES['getMoon.' + accuracy.name] = caseGetMoonAccuracy(accuracy)
+    CASES['series.batch.' + accuracy.name] = caseBatchSeries(accuracy)
+
+
+#/**
+# * Times a function.
+# * @param run The function.
+# * @param samples Number of samples.
+# * @return The best and median time per call in seconds, and the number of calls per sample.
+# */
+def measure(run, samples = SAMPLES):
+    # Calls per sample, doubled until a sample lasts long enough
+    run()
+    calls = 1
+    while (True):
+        start = time.perf_counter()
+        for i in range(calls):
+            run()
+        elapsed = time.perf_counter() - start
+        if (elapsed >= SAMPLE_TIME):
+            break
+        calls *= 2 if elapsed <= 0 else min(max(2, int(math.ceil(SAMPLE_TIME / elapsed))), 1 << 20)
+
+    times = [elapsed / calls]
+    for j in range(samples - 1):
+        start = time.perf_counter()
+        for i in range(calls):
+            run()
+        times.append((time.perf_counter() - start) / calls)
+    return min(times), float(np.median(times)), calls
+
+
+#/**
+# * Runs the cases.
+# * @param names Names of the cases to run.
+# * @param samples Number of samples of each case.
+# * @param out Text stream for the progress, or None.
+# * @return A dictionary from the names to the results: time per call (best and median)
+# * in seconds, items per call, throughput in items per second, and calls per sample.
+# */
+def runCases(names, samples = SAMPLES, out = sys.stdout):
+    results = {}
+    for name in names:
+        run, items = CASES[name]()
+        best, median, calls = measure(run, samples)
+        results[name] = {'time': best, 'median': median, 'items': items, 'throughput': items / best, 'calls': calls}
+        if (out is not None):
+            out.write(formatResult(name, results[name]) + '\n')
+            out.flush()
+    return results
+
+
+#/**
+# * Formats a result as a line of the report.
+# * @param name The case.
+# * @param result The result.
+# * @return The text.
+# */
+def formatResult(name, result):
+    t = result['time']
+    unit, scale = ('s', 1.0) if t >= 1 else ('ms', 1.0e3) if t >= 1.0e-3 else ('us', 1.0e6)
+    return '{:<45}{:>12.3f} {:<3}{:>12.3f} {:<3}{:>16,.0f} items/s'.format(name, t * scale, unit, result['median'] * scale, unit, result['throughput'])
+
+
+#/**
+# * Returns the description of the machine stored with the baselines. The host name is
+# * left out, so a baseline is comparable on any host with the same environment.
+# * @return A dictionary.
+# */
+def getMachine():
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'machine': platform.machine(),
+        'processor': platform.processor()}
+
+
+#/**
+# * Returns the default baseline of this host and environment.
+# * @return The path of the JSON file in {@linkplain #BASELINES}.
+# */
+def getBaselinePath():
+    machine = getMachine()
+    key = '-'.join((platform.node() or 'host', 'python' + machine['python'], 'numpy' + machine['numpy'], machine['machine']))
+    return os.path.join(BASELINES, 'baseline-' + ''.join(c if c.isalnum() or c in '.-_' else '_' for c in key) + '.json')
+
+
+#/**
+# * Saves results as a baseline.
+# * @param results The results of {@linkplain #runCases}.
+# * @param path The JSON file. Cases already there and not run are kept.
+# */
+def saveBaseline(results, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    try:
+        with open(path) as f:
+            baseline = json.load(f)
+    except (OSError, ValueError):
+        baseline = {'cases': {}}
+    baseline['machine'] = getMachine()
+    baseline['date'] = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    baseline['cases'].update(results)
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+
+
+#/**
+# * Compares results against a baseline.
+# * @param results The results of {@linkplain #runCases}.
+# * @param path The JSON file of the baseline.
+# * @param threshold Fraction of slowdown that is a regression.
+# * @return A list of (name, ratio of the time per call to the baseline, regression flag) for
+# * the cases in the baseline.
+# */
+def compareBaseline(results, path, threshold = THRESHOLD):
+    with open(path) as f:
+        baseline = json.load(f)
+    if (baseline.get('machine') != getMachine()):
+        print('Warning: the baseline was measured on a different machine or environment', file=sys.stderr)
+
+    out = []
+    for name, result in results.items():
+        reference = baseline['cases'].get(name)
+        if (reference is None):
+            continue
+        ratio = result['time'] / reference['time']
+        out.append((name, ratio, ratio > 1.0 + threshold))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks of the SunMoonCalculator hot paths.')
+    parser.add_argument('-k', dest='filter', default='', help='only run the cases containing this text')
+    parser.add_argument('--samples', type=int, default=SAMPLES, help='timed samples of each case')
+    parser.add_argument('--save', metavar='PATH', nargs='?', const='', help='save the results as a baseline, by default the one of this host')
+    parser.add_argument('--compare', metavar='PATH', nargs='?', const='', help='compare against a baseline, failing on regressions')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='slowdown fraction failing the comparison')
+    parser.add_argument('--list', action='store_true', help='list the cases')
+    args = parser.parse_args()
+
+    names = [name for name in CASES if args.filter in name]
+    if (args.list):
+        print('\n'.join(names))
+        return 0
+    if (args.save == ''):
+        args.save = getBaselinePath()
+    if (args.compare == ''):
+        args.compare = getBaselinePath()
+    if (args.compare is not None and not os.path.exists(args.compare)):
+        parser.error('no baseline at ' + args.compare + ', create it with --save first')
+
+    print('{:<45}{:>16}{:>16}{:>24}'.format('case', 'best/call', 'median/call', 'throughput'))
+    results = runCases(names, args.samples)
+
+    status = 0
+    if (args.compare is not None):
+        print()
+        for name, ratio, regression in compareBaseline(results, args.compare, args.threshold):
+            print('{:<45}{:>8.2f}x  {}'.format(name, ratio, 'REGRESSION' if regression else 'ok'))
+            if (regression):
+                status = 1
+    if (args.save is not None):
+        saveBaseline(results, args.save)
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,167 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+
+#################################################################################################################################
+# Vectorized conversions between Julian days, calendar fields and NumPy datetime64.
+# Dates before October 15, 1582 are in the Julian calendar and the Gregorian one is used after
+# that, as in {@linkplain SunMoonCalculator#toJulianDay}. The conversions follow Meeus, chapter 7,
+# with integer arithmetic. datetime64 values are always in the proleptic Gregorian calendar.
+#################################################################################################################################
+
+import numpy as np
+
+
+# Julian day of the first day of the Gregorian calendar, October 15, 1582, at noon.
+GREGORIAN_START = 2299161
+
+# Julian day of the datetime64 epoch, 1970-01-01T00:00 UT.
+UNIX_EPOCH = 2440587.5
+
+# Seconds in one day.
+SECONDS_PER_DAY = 86400
+
+# Text for Julian days of events that do not happen, -1.
+NO_EVENT = "NO RISE/SET/TRANSIT FOR THIS OBSERVER/DATE"
+
+# Fixed width text of a date, with the positions and number of digits of each field.
+DATE_TEMPLATE = b"0000-00-00 00:00:00 UT"
+DATE_DIGITS = ((0, 4), (5, 2), (8, 2), (11, 2), (14, 2), (17, 2))
+
+
+#/**
+# * Transforms common dates into Julian days.
+# * @param year Year, scalar or array.
+# * @param month Month.
+# * @param day Day.
+# * @param h Hour.
+# * @param m Minute.
+# * @param s Second.
+# * @return Julian days, with the broadcast shape of the inputs.
+# */
+def toJulianDay(year, month, day, h = 0, m = 0, s = 0):
+    year = np.asarray(year).astype(np.int64)
+    month = np.asarray(month).astype(np.int64)
+    julian = (year * 10000 + month * 100 + day) < 15821015
+
+    Y = np.where(month < 3, year - 1, year)
+    M = np.where(month < 3, month + 12, month)
+    A = Y // 100
+    B = np.where(julian, 0, 2 - A + A // 4)
+    dayFraction = (np.add(h, np.add(m, np.divide(s, 60.0)) / 60.0)) / 24.0
+    return dayFraction + np.floor(365.25 * (Y + 4716)) + np.floor(30.6001 * (M + 1)) + day + B - 1524.5
+
+
+#/**
+# * Transforms Julian days into common dates.
+# * @param jd Julian days, scalar or array.
+# * @return Year, month, day, hour, minute and second: ints for a scalar jd, else integer
+# * arrays with the shape of jd. The second is truncated.
+# */
+def getDate(jd):
+    jd = np.asarray(jd, dtype=float)
+    fields = getDateFields(jd)
+    if (jd.ndim == 0):
+        return tuple(int(x) for x in fields)
+    return fields
+
+
+#/**
+# * Array form of getDate.
+# * @param jd Julian days, array.
+# * @return Integer arrays with the shape of jd: year, month, day, hour, minute, second.
+# */
+def getDateFields(jd):
+    Z = np.floor(jd + 0.5).astype(np.int64)
+    # Seconds of the day, rounded to the millisecond first to avoid 59.999 s after the conversion
+    seconds = np.floor(np.round((jd + 0.5 - Z) * SECONDS_PER_DAY, 3)).astype(np.int64)
+    Z += seconds // SECONDS_PER_DAY
+    seconds %= SECONDS_PER_DAY
+
+    a = (Z * 100 - 186721625) // 3652425
+    A = np.where(Z >= GREGORIAN_START, Z + 1 + a - a // 4, Z)
+    B = A + 1524
+    C = (B * 100 - 12210) // 36525
+    D = (C * 36525) // 100
+    E = ((B - D) * 10000) // 306001
+    day = B - D - (E * 306001) // 10000
+    month = np.where(E < 14, E - 1, E - 13)
+    year = np.where(month > 2, C - 4716, C - 4715)
+
+    return year, month, day, seconds // 3600, (seconds // 60) % 60, seconds % 60
+
+
+#/**
+# * Converts Julian days in UT to datetime64[ns]. The nanosecond range covers 1677-09-21
+# * to 2262-04-11.
+# * @param jd Julian days, scalar or array.
+# * @return The instants.
+# * @throws ValueError If some day is out of that range, or not finite.
+# */
+def toDatetime64(jd):
+    ns = np.round((np.asarray(jd, dtype=float) - UNIX_EPOCH) * (SECONDS_PER_DAY * 1.0e9))
+    # NaT is the most negative int64, so it is excluded as well
+    if (not np.all(np.abs(ns) < 2.0**63)):
+        raise ValueError('Julian days out of the datetime64[ns] range')
+    return ns.astype(np.int64).view('datetime64[ns]')
+
+
+#/**
+# * Converts datetime64 instants to Julian days in UT.
+# * @param date The instants, datetime64 of any unit, scalar or array.
+# * @return The Julian days.
+# */
+def fromDatetime64(date):
+    ns = np.asarray(date, dtype='datetime64[ns]').astype(np.int64)
+    days, ns = np.divmod(ns, SECONDS_PER_DAY * 1000000000)
+    return UNIX_EPOCH + days + ns / (SECONDS_PER_DAY * 1.0e9)
+
+
+#/**
+# * Returns dates as strings, like 2021-06-09 18:00:00 UT. The text is composed as a
+# * fixed width array of characters, only years outside 1000 - 9999 are formatted one by one.
+# * @param jd Julian days, scalar or array. -1 means no event.
+# * @return Array of strings with the shape of jd.
+# */
+def getDateAsString(jd):
+    jd = np.asarray(jd, dtype=float)
+    fields = getDateFields(jd)
+    flat = [x.ravel() for x in fields]
+
+    other = np.nonzero((flat[0] < 1000) | (flat[0] > 9999))[0]
+    noEvent = jd.ravel() == -1
+    width = len(NO_EVENT) if noEvent.any() else len(DATE_TEMPLATE) + (8 if len(other) > 0 else 0)
+
+    # UCS4 code points of the text, null padded to the width. Each character position is
+    # written as a contiguous row, and the result transposed once.
+    text = np.zeros((width, flat[0].size), dtype=np.uint32)
+    text[:len(DATE_TEMPLATE)] = np.frombuffer(DATE_TEMPLATE, dtype=np.uint8)[:, None]
+    for value, (start, digits) in zip(flat, DATE_DIGITS):
+        for k in range(digits - 1, -1, -1):
+            value, digit = np.divmod(value, 10)
+            text[start + k] = 48 + digit
+    out = np.ascontiguousarray(text.T).view('U' + str(width)).ravel()
+
+    for i in other:
+        out[i] = str(flat[0][i]) + out[i][4:]
+    out[noEvent] = NO_EVENT
+    return out.reshape(jd.shape)
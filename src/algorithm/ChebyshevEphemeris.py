@@ -0,0 +1,266 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+#################################################################################################################################
+# Chebyshev ephemeris cache for the Sun and the Moon.
+# The geocentric ecliptic longitude, latitude and distance given by SunMoonCalculator are
+# fitted with Chebyshev polynomials over fixed-length segments (4 days for the Moon, 32 days
+# for the Sun), so that a position is obtained with a segment index and a short polynomial
+# evaluation instead of the full series. Times are Julian days in TT.
+# The coefficients are stored in a page-aligned binary file that is memory mapped on load,
+# so many worker processes can share one precomputed ephemeris (e.g. 1800 - 2200, ~10 MB).
+#################################################################################################################################
+
+import struct
+import sys
+import numpy as np
+from numpy.polynomial import chebyshev
+
+from SunMoonCalculator import SunMoonCalculator, RAD_TO_DEG
+import SunMoonBatch
+
+
+class ChebyshevEphemeris(object):
+
+    # File identification and format version.
+    MAGIC = b'SMCHEB\0\0'
+    VERSION = 2
+
+    # Size of the header page. Coefficient blocks start at multiples of this size.
+    HEADER_SIZE = 4096
+
+    # Header: magic, version, number of bodies, header size.
+    HEADER = struct.Struct('<8sHHI')
+
+    # Body record: id, degree, number of segments, byte offset of the coefficients,
+    # first and last Julian day (TT), segment length in days, claimed accuracy in
+    # degrees, and maximum fit errors in longitude and latitude (degrees) and distance (AU).
+    BODY_RECORD = struct.Struct('<iIIQddddddd')
+
+    # Default segment length in days and polynomial degree for each body.
+    SEGMENT_DAYS = {SunMoonCalculator.BODY.Moon: 4.0, SunMoonCalculator.BODY.Sun: 32.0}
+    DEGREE = {SunMoonCalculator.BODY.Moon: 9, SunMoonCalculator.BODY.Sun: 10}
+
+    # Expected accuracy of the underlying series over 1800 - 2200, in degrees.
+    # Generated coefficients must reproduce the series well within these values.
+    ACCURACY = {SunMoonCalculator.BODY.Moon: 0.005, SunMoonCalculator.BODY.Sun: 0.001}
+
+    #/**
+    # * Class to hold the coefficients of one body.
+    # */
+    class Segments(object):
+
+        def __init__(self, body, jdStart, segmentDays, coefficients, accuracy, fitError):
+            self.body = body
+            self.jdStart = jdStart
+            self.segmentDays = segmentDays
+            # Array of shape (segments, 3 components, degree + 1)
+            self.coefficients = coefficients
+            self.accuracy = accuracy
+            # Maximum fit error in longitude, latitude (deg) and distance (AU)
+            self.fitError = fitError
+
+        @property
+        def jdEnd(self):
+            return self.jdStart + len(self.coefficients) * self.segmentDays
+
+    def __init__(self, segments):
+        self.segments = dict((s.body, s) for s in segments)
+
+    #/**
+    # * Fits the Sun and Moon series over a time span.
+    # * @param jdStart First Julian day in TT.
+    # * @param jdEnd Last Julian day in TT. It is rounded up to a whole segment.
+    # * @param bodies The bodies to fit, Sun and Moon by default.
+    # * @return The ephemeris cache.
+    # * @throws ValueError If the fit error exceeds the claimed accuracy.
+    # */
+    @classmethod
+    def generate(cls, jdStart, jdEnd, bodies = (SunMoonCalculator.BODY.Sun, SunMoonCalculator.BODY.Moon)):
+        return cls([cls.fitBody(body, jdStart, jdEnd) for body in bodies])
+
+    @classmethod
+    def fitBody(cls, body, jdStart, jdEnd):
+        segmentDays = cls.SEGMENT_DAYS[body]
+        degree = cls.DEGREE[body]
+        nsegments = max(1, int(np.ceil((jdEnd - jdStart) / segmentDays)))
+        starts = jdStart + segmentDays * np.arange(nsegments)
+
+        # Interpolate at the Chebyshev nodes of each segment
+        nodes = chebyshev.chebpts1(degree + 1)
+        values = cls.evaluateSeries(body, starts[:, None] + (nodes + 1) * 0.5 * segmentDays)
+        values[0] = np.unwrap(values[0], axis=1)
+        coefficients = np.empty((nsegments, 3, degree + 1))
+        for i in range(3):
+            coefficients[:, i, :] = chebyshev.chebfit(nodes, values[i].T, degree).T
+
+        # Check the fit between the nodes
+        x = np.linspace(-1.0, 1.0, 4 * (degree + 1) + 1)
+        reference = cls.evaluateSeries(body, starts[:, None] + (x + 1) * 0.5 * segmentDays)
+        fitted = np.einsum('sck,kx->csx', coefficients, chebyshev.chebvander(x, degree).T)
+        error = np.abs(fitted - reference)
+        error[0] = np.abs((error[0] + np.pi) % SunMoonCalculator.TWO_PI - np.pi)
+        fitError = (float(error[0].max() * RAD_TO_DEG), float(error[1].max() * RAD_TO_DEG), float(error[2].max()))
+
+        accuracy = cls.ACCURACY[body]
+        if (max(fitError[0:2]) > accuracy):
+            raise ValueError("Chebyshev fit error for " + body.name + " (" + str(max(fitError[0:2])) + " deg) exceeds the claimed accuracy")
+
+        return cls.Segments(body, jdStart, segmentDays, coefficients, accuracy, fitError)
+
+    #/**
+    # * Evaluates the full series of a body.
+    # * @param body Sun or Moon.
+    # * @param jd Julian days in TT.
+    # * @return Array with ecliptic longitude, latitude (rad) and distance (AU).
+    # */
+    @staticmethod
+    def evaluateSeries(body, jd):
+        t = (jd - SunMoonCalculator.J2000) / SunMoonCalculator.JULIAN_DAYS_PER_CENTURY
+        if (body == SunMoonCalculator.BODY.Sun):
+            pos = SunMoonBatch.getSun(t)
+        elif (body == SunMoonCalculator.BODY.Moon):
+            pos = SunMoonBatch.getMoon(t)[0]
+        else:
+            raise ValueError("Unsupported body " + body.name)
+        return np.array(pos[0:3])
+
+    #/**
+    # * Returns the geocentric ecliptic position of a body from the cached polynomials.
+    # * @param body Sun or Moon.
+    # * @param jd Julian days in TT, scalar or array.
+    # * @return Ecliptic longitude, latitude, distance and angular radius, as in
+    # * {@linkplain SunMoonCalculator#getSun}.
+    # * @throws ValueError If an instant is outside the cached time span.
+    # */
+    def getPosition(self, body, jd):
+        segments = self.segments[body]
+        jd = np.asarray(jd, dtype=float)
+        if (np.any(jd < segments.jdStart) or np.any(jd > segments.jdEnd)):
+            raise ValueError("Julian day outside the cached time span")
+
+        s = (jd - segments.jdStart) / segments.segmentDays
+        index = np.minimum(s.astype(int), len(segments.coefficients) - 1)
+        x = 2.0 * (s - index) - 1.0
+
+        # Clenshaw recurrence over the coefficients of each instant's segment
+        c = segments.coefficients[index]
+        b1 = 0.0
+        b2 = 0.0
+        x2 = 2.0 * x[..., None]
+        for k in range(c.shape[-1] - 1, 0, -1):
+            b1, b2 = c[..., k] + x2 * b1 - b2, b1
+        value = c[..., 0] + x[..., None] * b1 - b2
+
+        lon = np.mod(value[..., 0], SunMoonCalculator.TWO_PI)
+        distance = value[..., 2]
+        angR = np.arctan(body.eqRadius / (SunMoonCalculator.AU * distance))
+
+        array = [lon, value[..., 1], distance, angR]
+        if (jd.ndim == 0):
+            array = [float(v) for v in array]
+
+        return array
+
+    #/**
+    # * Returns the geocentric apparent equatorial position of a body, correcting
+    # * the cached ecliptic position for nutation as {@linkplain SunMoonCalculator#doCalc}.
+    # * @param body Sun or Moon.
+    # * @param jd Julian days in TT, scalar or array.
+    # * @return Right ascension, declination (rad) and distance (AU).
+    # */
+    def getEquatorial(self, body, jd):
+        state = SunMoonBatch.getTimeState(jd, 0.0, 0.0)
+        out = SunMoonBatch.doCalc(self.getPosition(body, jd), state, 0.0, 0.0, True)
+        return out.rightAscension, out.declination, out.distance
+
+    #/**
+    # * Writes the coefficients to a binary file. The file starts with a fixed-size
+    # * header page holding the format version and, for each body, its time range
+    # * and the offset of its coefficient block. Blocks are page aligned so they
+    # * can be memory mapped independently.
+    # * @param path The file path.
+    # */
+    def save(self, path):
+        offset = self.HEADER_SIZE
+        records = []
+        for s in self.segments.values():
+            records.append(self.BODY_RECORD.pack(s.body.value[0], s.coefficients.shape[2] - 1, len(s.coefficients), offset,
+                s.jdStart, s.jdEnd, s.segmentDays, s.accuracy, s.fitError[0], s.fitError[1], s.fitError[2]))
+            offset += -(-s.coefficients.nbytes // self.HEADER_SIZE) * self.HEADER_SIZE
+
+        header = self.HEADER.pack(self.MAGIC, self.VERSION, len(records), self.HEADER_SIZE) + b''.join(records)
+        if (len(header) > self.HEADER_SIZE):
+            raise ValueError("Too many bodies for the ephemeris header")
+
+        with open(path, 'wb') as f:
+            f.write(header.ljust(self.HEADER_SIZE, b'\0'))
+            for s in self.segments.values():
+                block = np.ascontiguousarray(s.coefficients, dtype='<f8').tobytes()
+                f.write(block.ljust(-(-len(block) // self.HEADER_SIZE) * self.HEADER_SIZE, b'\0'))
+
+    #/**
+    # * Opens a binary file written by save. Only the header page is read; the
+    # * coefficients are memory mapped read-only, so every process opening the same
+    # * file shares the page cache and a lookup only touches the pages of the
+    # * segments it needs.
+    # * @param path The file path.
+    # * @return The ephemeris cache.
+    # * @throws ValueError If the file is not a Chebyshev ephemeris of this version.
+    # */
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            header = f.read(cls.HEADER_SIZE)
+
+        magic, version, nbodies, headerSize = cls.HEADER.unpack_from(header, 0)
+        if (magic != cls.MAGIC or version != cls.VERSION or headerSize != cls.HEADER_SIZE):
+            raise ValueError("Not a Chebyshev ephemeris file (version " + str(cls.VERSION) + "): " + str(path))
+
+        bodies = dict((b.value[0], b) for b in SunMoonCalculator.BODY)
+        segments = []
+        for i in range(nbodies):
+            (bodyId, degree, nsegments, offset, jdStart, jdEnd, segmentDays, accuracy,
+                errLon, errLat, errDist) = cls.BODY_RECORD.unpack_from(header, cls.HEADER.size + i * cls.BODY_RECORD.size)
+            coefficients = np.memmap(path, dtype='<f8', mode='r', offset=offset, shape=(nsegments, 3, degree + 1))
+            segments.append(cls.Segments(bodies[bodyId], jdStart, segmentDays, coefficients, accuracy, (errLon, errLat, errDist)))
+
+        return cls(segments)
+
+
+############################################## MAIN PROGRAM ####################################################################
+def main():
+    # Usage: python ChebyshevEphemeris.py <output file> [first year] [last year]
+    path = sys.argv[1]
+    firstYear = int(sys.argv[2]) if len(sys.argv) > 2 else 1800
+    lastYear = int(sys.argv[3]) if len(sys.argv) > 3 else 2200
+
+    jdStart = SunMoonCalculator.J2000 + (firstYear - 2000) * 365.25 - 0.5
+    jdEnd = SunMoonCalculator.J2000 + (lastYear + 1 - 2000) * 365.25 - 0.5
+    ephemeris = ChebyshevEphemeris.generate(jdStart, jdEnd)
+    ephemeris.save(path)
+
+    for s in ephemeris.segments.values():
+        print(s.body.name + ": " + str(len(s.coefficients)) + " segments of " + str(s.segmentDays) + " days, fit error " + str(s.fitError))
+
+if __name__ == '__main__':
+    main()
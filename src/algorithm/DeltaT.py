@@ -0,0 +1,204 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+#################################################################################################################################
+# TT minus UT (Delta T) providers.
+# Delta T is looked up by linear interpolation in a table of Julian days, either sampled
+# once per process from the polynomial fits used by SunMoonCalculator, or loaded from a
+# file of observed/predicted values. Lookups work for a single Julian day or an array.
+#################################################################################################################################
+
+import bisect
+import math
+import threading
+import numpy as np
+
+
+# Julian day of J2000 epoch, see SunMoonCalculator.J2000.
+J2000 = 2451545.0
+
+# Years covered by the polynomial fits.
+FIRST_YEAR = -600
+LAST_YEAR = 2200
+
+# Samples per year of the table built from the polynomial fits.
+SAMPLES_PER_YEAR = 12
+
+
+#/**
+# * Returns TT minus UT from the polynomial fits of the {@linkplain SunMoonCalculator}
+# * constructor, valid between years -600 and 2200.
+# * @param x The decimal year, scalar or array.
+# * @return TT minus UT in seconds, 0 outside the valid years.
+# */
+def getPolynomialTTminusUT(x):
+    x = np.asarray(x, dtype=float)
+    year = np.floor(x)
+    return np.where((year > FIRST_YEAR) & (year < LAST_YEAR), evaluatePolynomial(x), 0.0)
+
+
+#/**
+# * Evaluates the polynomial fits without checking the valid years.
+# * @param x The decimal year, array.
+# * @return TT minus UT in seconds.
+# */
+def evaluatePolynomial(x):
+    x2 = x * x
+    x3 = x2 * x
+    x4 = x3 * x
+    before1600 = 10535.328003 - 9.9952386275 * x + 0.00306730763 * x2 - 7.7634069836E-6 * x3 + 3.1331045394E-9 * x4 + 8.2255308544E-12 * x2 * x3 - 7.4861647156E-15 * x4 * x2 + 1.936246155E-18 * x4 * x3 - 8.4892249378E-23 * x4 * x4
+    after1600 = -1027175.3477559977 + 2523.256625418965 * x - 1.885686849058459 * x2 + 5.869246227888417E-5 * x3 + 3.3379295816475025E-7 * x4 + \
+        1.7758961671447929E-10 * x2 * x3 - 2.7889902806153024E-13 * x2 * x4 + 1.0224295822336825E-16 * x3 * x4 - 1.2528102370680435E-20 * x4 * x4
+
+    return np.where(x < 1600, before1600, after1600)
+
+
+#/**
+# * Converts decimal years to Julian days, with the year approximated as 365.25 days.
+# * @param year The decimal years.
+# * @return The Julian days.
+# */
+def yearToJulianDay(year):
+    return J2000 + (np.asarray(year, dtype=float) - 2000.0) * 365.25
+
+
+class DeltaT(object):
+
+    #/**
+    # * Constructor.
+    # * @param jd Julian days of the table, increasing.
+    # * @param values TT minus UT in seconds at each Julian day.
+    # * @param fallback Provider used outside the table, or None to return 0 there.
+    # */
+    def __init__(self, jd, values, fallback = None):
+        self.jd = np.asarray(jd, dtype=float)
+        self.values = np.asarray(values, dtype=float)
+        if (self.jd.ndim != 1 or self.jd.shape != self.values.shape or len(self.jd) < 2):
+            raise ValueError("Delta T table needs at least two Julian days and one value for each")
+        if (np.any(np.diff(self.jd) <= 0)):
+            raise ValueError("Delta T table must be sorted by Julian day")
+        self.fallback = fallback
+
+        # Python lists for the scalar lookup, faster than NumPy for a single value
+        self.jdList = self.jd.tolist()
+        self.valueList = self.values.tolist()
+
+    #/**
+    # * Returns TT minus UT.
+    # * @param jd The Julian day in UT, scalar or array.
+    # * @return TT minus UT in seconds, a float for a scalar Julian day.
+    # */
+    def getTTminusUT(self, jd):
+        if (isinstance(jd, float) or np.ndim(jd) == 0):
+            jd = float(jd)
+            i = bisect.bisect_right(self.jdList, jd)
+            if (i == 0 or i == len(self.jdList)):
+                if (jd == self.jdList[-1]):
+                    return self.valueList[-1]
+                return float(self.fallback.getTTminusUT(jd)) if self.fallback is not None else 0.0
+            jd0 = self.jdList[i - 1]
+            v0 = self.valueList[i - 1]
+            return v0 + (self.valueList[i] - v0) * (jd - jd0) / (self.jdList[i] - jd0)
+
+        jd = np.asarray(jd, dtype=float)
+        out = np.interp(jd, self.jd, self.values)
+        outside = (jd < self.jd[0]) | (jd > self.jd[-1])
+        if (np.any(outside)):
+            out[outside] = self.fallback.getTTminusUT(jd[outside]) if self.fallback is not None else 0.0
+        return out
+
+    #/**
+    # * Builds the table from the polynomial fits, see {@linkplain #getPolynomialTTminusUT}.
+    # * @param firstYear First year of the table.
+    # * @param lastYear Last year of the table.
+    # * @param samplesPerYear Number of samples per year.
+    # * @return The provider.
+    # */
+    @classmethod
+    def fromPolynomial(cls, firstYear = FIRST_YEAR + 1, lastYear = LAST_YEAR, samplesPerYear = SAMPLES_PER_YEAR):
+        year = firstYear + np.arange((lastYear - firstYear) * samplesPerYear + 1) / samplesPerYear
+        return cls(yearToJulianDay(year), evaluatePolynomial(year))
+
+    #/**
+    # * Loads a table from a text file. Each line has either a decimal year and TT
+    # * minus UT in seconds, or year, month, day and TT minus UT in seconds, separated
+    # * by spaces or commas. Empty lines and lines starting with # are ignored.
+    # * @param path The path to the file.
+    # * @param fallback Provider used outside the table, by default the process wide one.
+    # * @return The provider.
+    # */
+    @classmethod
+    def load(cls, path, fallback = None):
+        jd = []
+        values = []
+        with open(path) as f:
+            for line in f:
+                fields = line.replace(',', ' ').split()
+                if (len(fields) == 0 or fields[0].startswith('#')):
+                    continue
+                if (len(fields) == 2):
+                    year = float(fields[0])
+                elif (len(fields) == 4):
+                    year = float(fields[0]) + (float(fields[1]) - 1 + (float(fields[2]) - 1) / 30.4375) / 12.0
+                else:
+                    raise ValueError("Invalid Delta T line: " + line.strip())
+                jd.append(float(yearToJulianDay(year)))
+                values.append(float(fields[-1]))
+
+        return cls(jd, values, getDefault() if fallback is None else fallback)
+
+
+# The process wide provider, built on first use.
+default = None
+defaultLock = threading.Lock()
+
+
+#/**
+# * Returns the process wide provider, by default the table built from the polynomial fits.
+# * @return The provider.
+# */
+def getDefault():
+    global default
+    if (default is None):
+        with defaultLock:
+            if (default is None):
+                default = DeltaT.fromPolynomial()
+    return default
+
+
+#/**
+# * Replaces the process wide provider, used by every calculator created afterwards.
+# * @param provider The provider, for instance one returned by {@linkplain DeltaT#load}.
+# */
+def setDefault(provider):
+    global default
+    with defaultLock:
+        default = provider
+
+
+#/**
+# * Returns TT minus UT from the process wide provider.
+# * @param jd The Julian day in UT, scalar or array.
+# * @return TT minus UT in seconds.
+# */
+def getTTminusUT(jd):
+    return getDefault().getTTminusUT(jd)
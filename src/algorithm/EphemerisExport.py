@@ -0,0 +1,141 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+
+#################################################################################################################################
+# Columnar export of ephemeris series.
+# The columns of {@linkplain SunMoonBatch.EphemerisSeries} are written as they are: CSV is
+# streamed in chunks of rows, and Arrow record batches wrap the column buffers, without
+# copying them when they are contiguous, to be written as Arrow IPC or Parquet files. pyarrow is only needed for
+# the Arrow and Parquet functions.
+#################################################################################################################################
+
+import numpy as np
+
+import SunMoonBatch
+
+
+# Number of rows written at once to CSV, and of each Arrow record batch and Parquet row group.
+CHUNK_ROWS = 65536
+
+
+#/**
+# * Returns the flattened columns of a set of series.
+# * @param bodies A series, or a dictionary from body names to series of the same shape.
+# * Columns are named '<body>.<field>', or just by the field for a single series.
+# * @param jd Julian days of the samples, broadcast to the shape of the series, or None.
+# * @param fields The fields to export, all of them by default.
+# * @return A dictionary from the column names to 1D arrays. They are views of the
+# * series unless these are slices of a larger series.
+# */
+def getColumns(bodies, jd = None, fields = SunMoonBatch.FIELDS):
+    if (isinstance(bodies, SunMoonBatch.EphemerisSeries)):
+        bodies = {None: bodies}
+
+    out = {}
+    for name, series in bodies.items():
+        if (jd is not None and 'jd' not in out):
+            out['jd'] = np.broadcast_to(np.asarray(jd, dtype=float), series.columns.shape[1:]).ravel()
+        for field in fields:
+            out[field if name is None else name + '.' + field] = getattr(series, field).ravel()
+    return out
+
+
+#/**
+# * Writes a set of series as CSV, one row per sample.
+# * @param bodies The series, see {@linkplain #getColumns}.
+# * @param out The output text stream.
+# * @param jd Julian days of the samples, written as the first column when provided.
+# * @param fields The fields to export.
+# * @param fmt Format of the values.
+# */
+def writeCsv(bodies, out, jd = None, fields = SunMoonBatch.FIELDS, fmt = '%.9f'):
+    columns = getColumns(bodies, jd, fields)
+    out.write(','.join(columns) + '\n')
+    rows = len(next(iter(columns.values())))
+    block = np.empty((min(rows, CHUNK_ROWS), len(columns)))
+    for start in range(0, rows, CHUNK_ROWS):
+        end = min(start + CHUNK_ROWS, rows)
+        for i, column in enumerate(columns.values()):
+            block[:end - start, i] = column[start:end]
+        np.savetxt(out, block[:end - start], delimiter=',', fmt=fmt)
+
+
+#/**
+# * Returns the Arrow record batches of a set of series. Contiguous columns share their memory
+# * with the batches; columns of sliced series and broadcast jd values are copied once.
+# * @param bodies The series, see {@linkplain #getColumns}.
+# * @param jd Julian days of the samples, exported as the first column when provided.
+# * @param fields The fields to export.
+# * @return Generator of pyarrow.RecordBatch with CHUNK_ROWS rows at most.
+# */
+def toRecordBatches(bodies, jd = None, fields = SunMoonBatch.FIELDS):
+    import pyarrow
+
+    columns = getColumns(bodies, jd, fields)
+    arrays = [pyarrow.array(np.ascontiguousarray(column)) for column in columns.values()]
+    batch = pyarrow.RecordBatch.from_arrays(arrays, names=list(columns))
+    for start in range(0, max(batch.num_rows, 1), CHUNK_ROWS):
+        yield batch.slice(start, CHUNK_ROWS)
+
+
+#/**
+# * Writes a set of series as an Arrow IPC file.
+# * @param bodies The series, see {@linkplain #getColumns}.
+# * @param path The output file.
+# * @param jd Julian days of the samples, exported as the first column when provided.
+# * @param fields The fields to export.
+# */
+def writeArrow(bodies, path, jd = None, fields = SunMoonBatch.FIELDS):
+    import pyarrow
+
+    writer = None
+    try:
+        for batch in toRecordBatches(bodies, jd, fields):
+            if (writer is None):
+                writer = pyarrow.ipc.new_file(path, batch.schema)
+            writer.write_batch(batch)
+    finally:
+        if (writer is not None):
+            writer.close()
+
+
+#/**
+# * Writes a set of series as a Parquet file, one row group per record batch.
+# * @param bodies The series, see {@linkplain #getColumns}.
+# * @param path The output file.
+# * @param jd Julian days of the samples, exported as the first column when provided.
+# * @param fields The fields to export.
+# * @param compression The Parquet compression codec.
+# */
+def writeParquet(bodies, path, jd = None, fields = SunMoonBatch.FIELDS, compression = 'snappy'):
+    import pyarrow.parquet
+
+    writer = None
+    try:
+        for batch in toRecordBatches(bodies, jd, fields):
+            if (writer is None):
+                writer = pyarrow.parquet.ParquetWriter(path, batch.schema, compression=compression)
+            writer.write_batch(batch)
+    finally:
+        if (writer is not None):
+            writer.close()
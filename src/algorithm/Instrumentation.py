@@ -0,0 +1,222 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+
+#################################################################################################################################
+# Opt-in instrumentation: event counters and wall time histograms of the calculation stages.
+# Instrumented code checks the module level enabled flag before doing anything else, so the
+# cost while disabled is one attribute lookup:
+#     if (Instrumentation.enabled): Instrumentation.count('setUTDate')
+#     with Instrumentation.stage('calcSunAndMoon'): ...
+# Events are collected while a record() context is active, or sent to the hooks added with
+# addHook, for instance to forward them to a metrics pipeline.
+#################################################################################################################################
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+
+
+# Upper edges in seconds of the buckets of the time histograms, from 1 us to 1 s in factors of 2.
+# Longer times fall in a last, unbounded bucket.
+BUCKETS = 1.0e-6 * np.power(2.0, np.arange(21))
+
+# True while there are recorders or hooks.
+enabled = False
+
+# Active recorders and hooks, changed under the lock.
+recorders = []
+hooks = []
+lock = threading.Lock()
+
+
+#/**
+# * Wall time histogram of a stage.
+# */
+class Histogram(object):
+
+    __slots__ = ('count', 'total', 'min', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        self.buckets[int(np.searchsorted(BUCKETS, seconds))] += 1
+
+    def toDict(self):
+        return {'count': self.count, 'total': self.total, 'min': self.min if self.count > 0 else 0.0, 'max': self.max,
+            'mean': self.total / self.count if self.count > 0 else 0.0, 'buckets': list(self.buckets)}
+
+
+#/**
+# * Counters and histograms collected by a record() context.
+# */
+class Recorder(object):
+
+    def __init__(self):
+        self.counters = {}
+        self.timings = {}
+
+    def count(self, name, n):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def addTime(self, name, seconds):
+        histogram = self.timings.get(name)
+        if (histogram is None):
+            histogram = self.timings[name] = Histogram()
+        histogram.add(seconds)
+
+    #/**
+    # * Returns the collected values.
+    # * @return A dictionary with the 'counters' and the 'timings', the latter with the count,
+    # * total, min, max and mean time in seconds of each stage, and the counts of the buckets
+    # * delimited by {@linkplain #BUCKETS}.
+    # */
+    def toDict(self):
+        with lock:
+            return {'counters': dict(self.counters), 'timings': {name: h.toDict() for name, h in self.timings.items()}}
+
+
+#/**
+# * Counts an event. Call only when enabled.
+# * @param name Name of the counter.
+# * @param n Amount to add.
+# */
+def count(name, n = 1):
+    with lock:
+        for recorder in recorders:
+            recorder.count(name, n)
+        for hook in hooks:
+            hook('count', name, n)
+
+
+#/**
+# * Adds the wall time of a stage. Call only when enabled.
+# * @param name Name of the stage.
+# * @param seconds The time in seconds.
+# */
+def addTime(name, seconds):
+    with lock:
+        for recorder in recorders:
+            recorder.addTime(name, seconds)
+        for hook in hooks:
+            hook('time', name, seconds)
+
+
+#/**
+# * Context manager timing a stage.
+# */
+class Stage(object):
+
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        addTime(self.name, time.perf_counter() - self.start)
+
+
+#/**
+# * Context manager doing nothing, returned by stage while disabled.
+# */
+class NullStage(object):
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+NULL_STAGE = NullStage()
+
+
+#/**
+# * Returns a context manager timing a stage while enabled.
+# * @param name Name of the stage.
+# * @return The context manager.
+# */
+def stage(name):
+    return Stage(name) if enabled else NULL_STAGE
+
+
+#/**
+# * Collects the events of all threads while active. Contexts can be nested, each one
+# * collects the events of its own lifetime.
+# * @param hook Function called on exit with the collected values, see {@linkplain Recorder#toDict}.
+# * @return Context manager giving the Recorder.
+# */
+@contextmanager
+def record(hook = None):
+    global enabled
+    recorder = Recorder()
+    with lock:
+        recorders.append(recorder)
+        enabled = True
+    try:
+        yield recorder
+    finally:
+        with lock:
+            recorders.remove(recorder)
+            enabled = len(recorders) > 0 or len(hooks) > 0
+        if (hook is not None):
+            hook(recorder.toDict())
+
+
+#/**
+# * Adds a function called on every event, from the thread producing it, until removed.
+# * @param hook Function called with the kind of event ('count' or 'time'), the name of the
+# * counter or stage, and the amount or the time in seconds. It must be fast and not call
+# * the instrumentation functions.
+# */
+def addHook(hook):
+    global enabled
+    with lock:
+        hooks.append(hook)
+        enabled = True
+
+
+#/**
+# * Removes a function added with {@linkplain #addHook}.
+# * @param hook The function.
+# */
+def removeHook(hook):
+    global enabled
+    with lock:
+        hooks.remove(hook)
+        enabled = len(recorders) > 0 or len(hooks) > 0
@@ -0,0 +1,138 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+#################################################################################################################################
+# Moon phase finder for time ranges.
+# The elongation of the Moon (difference between the Moon and Sun ecliptic longitudes) is
+# sampled once per day, so that each phase is bracketed by the day in which the unwrapped
+# elongation goes through it. All brackets are then refined together by secant iterations,
+# each one a single vectorized evaluation of the Sun and Moon series.
+#################################################################################################################################
+
+import math
+import numpy as np
+
+from SunMoonCalculator import SunMoonCalculator
+import Instrumentation
+import SunMoonBatch
+
+
+# Step in days of the grid used to bracket the phases. The elongation grows less than 90 degrees in it.
+STEP = 1.0
+
+# Days computed at once by the event generator.
+BLOCK_DAYS = 3650
+
+# Maximum number of secant iterations, and their convergence limit in days.
+MAX_ITERATIONS = 8
+ACCURACY = 0.01 / SunMoonCalculator.SECONDS_PER_DAY
+
+
+#/**
+# * Returns the elongation of the Moon, with the same longitudes used by
+# * {@linkplain SunMoonCalculator#getMoonPhaseTime}.
+# * @param jd The Julian days in UT.
+# * @param TTminusUT TT minus UT in seconds, or None to compute it for each instant.
+# * @return Moon minus Sun ecliptic longitude in radians, not normalized.
+# */
+def getElongation(jd, TTminusUT = None):
+    if (TTminusUT is None):
+        TTminusUT = SunMoonBatch.getTTminusUT(jd)
+    t = (jd + TTminusUT / SunMoonCalculator.SECONDS_PER_DAY - SunMoonCalculator.J2000) / SunMoonCalculator.JULIAN_DAYS_PER_CENTURY
+    return SunMoonBatch.getMoon(t)[0][0] - SunMoonBatch.getSun(t)[0]
+
+
+#/**
+# * Finds the instants in a range of time when the Moon goes through a set of phases.
+# * @param jdStart First Julian day in UT.
+# * @param jdEnd Last Julian day in UT, not included.
+# * @param fractions The phases as fractions of the lunar cycle, 0 for New Moon,
+# * 0.5 for Full Moon, as in the values of {@linkplain SunMoonCalculator.MOONPHASE}.
+# * @param TTminusUT TT minus UT in seconds, or None to compute it for each instant.
+# * @return The Julian days in UT of the events in increasing order, with accuracy of
+# * 0.01s with respect to the series, and the index in fractions of the phase of each one.
+# */
+def findPhaseTimes(jdStart, jdEnd, fractions, TTminusUT = None):
+    grid = np.arange(math.floor(jdStart) - STEP, jdEnd + STEP, STEP)
+    elongation = np.unwrap(getElongation(grid, TTminusUT))
+    target = SunMoonCalculator.TWO_PI * np.asarray(fractions, dtype=float)[:, None]
+
+    # Number of times each phase has been passed at each instant of the grid
+    cycles = np.floor((elongation - target) / SunMoonCalculator.TWO_PI)
+    phase, index = np.nonzero(cycles[:, 1:] > cycles[:, :-1])
+    level = target[phase, 0] + SunMoonCalculator.TWO_PI * cycles[phase, index + 1]
+
+    # Secant iterations starting from the ends of each bracket
+    x0 = grid[index]
+    x1 = grid[index + 1]
+    r0 = elongation[index] - level
+    r1 = elongation[index + 1] - level
+    for i in range(MAX_ITERATIONS):
+        # Converged brackets can have equal residuals, keep them where they are
+        slope = np.where(r1 != r0, (x1 - x0) / np.where(r1 != r0, r1 - r0, 1.0), 0.0)
+        x2 = x1 - r1 * slope
+        if (i > 0 and np.max(np.abs(x2 - x1), initial = 0) < ACCURACY):
+            x1 = x2
+            break
+        r2 = getElongation(x2, TTminusUT) - level
+        r2 = np.mod(r2 + math.pi, SunMoonCalculator.TWO_PI) - math.pi
+        x0, r0, x1, r1 = x1, r1, x2, r2
+    else:
+        if (Instrumentation.enabled):
+            Instrumentation.count('findPhaseTimes.notConverged')
+    if (Instrumentation.enabled):
+        Instrumentation.count('findPhaseTimes.iterations', i + 1)
+
+    keep = (x1 >= jdStart) & (x1 < jdEnd)
+    order = np.argsort(x1[keep], kind='stable')
+    return x1[keep][order], phase[keep][order]
+
+
+#/**
+# * Generates the Moon phases in a range of time, in chronological order. The range
+# * is processed in blocks, so that it can span centuries.
+# * @param jdStart First Julian day in UT.
+# * @param jdEnd Last Julian day in UT, not included.
+# * @param phases The phases to find, by default all of them.
+# * @param TTminusUT TT minus UT in seconds, or None to compute it for each instant.
+# * @return A generator of (Julian day in UT, {@linkplain SunMoonCalculator.MOONPHASE}) tuples.
+# */
+def generateMoonPhases(jdStart, jdEnd, phases = tuple(SunMoonCalculator.MOONPHASE), TTminusUT = None):
+    phases = list(phases)
+    fractions = [p.value[1] for p in phases]
+    for start in np.arange(jdStart, jdEnd, BLOCK_DAYS):
+        jd, index = findPhaseTimes(start, min(start + BLOCK_DAYS, jdEnd), fractions, TTminusUT)
+        for event, i in zip(jd.tolist(), index.tolist()):
+            yield event, phases[i]
+
+
+def main():
+    # Prints the Moon phases of a year
+    year = 2024
+    smc = SunMoonCalculator(0, 0, 0, year, 1, 1)
+    jdStart = smc.toJulianDay(year, 1, 1, 0, 0, 0)
+    jdEnd = smc.toJulianDay(year + 1, 1, 1, 0, 0, 0)
+    for jd, phase in generateMoonPhases(jdStart, jdEnd):
+        print(phase.value[0] + " " + smc.getDateAsString(jd))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+
+#################################################################################################################################
+# Baked lookup table of the Moon's appearance for the renderer.
+# The phase angle, bright limb position angle and relative size are computed with the
+# vectorized calculator on a uniform time grid, and written as float32 rows after a small
+# header with the first instant and the step. The client fetches the table once and
+# interpolates it, instead of evaluating its own series every frame.
+#################################################################################################################################
+
+import math
+import struct
+import sys
+import time
+import numpy as np
+
+from SunMoonCalculator import SunMoonCalculator
+import Calendar
+import SunMoonBatch
+
+
+# File signature and format version.
+MAGIC = b'MOON'
+VERSION = 1
+
+# Little endian header: signature, version, Julian day in UT of the first row, step in days,
+# number of rows and number of channels. It takes 32 bytes, so the float32 rows are aligned.
+HEADER = struct.Struct('<4sIddII')
+
+# The channels of each row, in order.
+CHANNELS = ('phaseAngle', 'positionAngle', 'relativeSize')
+
+# Default step in days, one hour.
+STEP = 1.0 / 24.0
+
+# Semi-major axis of the Moon's orbit in km, where the relative size is 1 as in moonRelativeSize.ts.
+MOON_SEMI_MAJOR_AXIS = 384400.0
+
+
+#/**
+# * Computes the values of the table for a set of instants, from the geocentric positions.
+# * The phase angle is the Moon's apparent longitude minus the Sun's, from 0 at new Moon to
+# * pi at full Moon, as the renderer expects. The position angle of the bright limb is
+# * measured from the north towards the east (Meeus, chapter 48). The relative size is the
+# * angular radius over the one at the semi-major axis of the orbit.
+# * @param jd_UT The Julian days in UT.
+# * @param TTminusUT TT minus UT in seconds, computed for each instant when not provided.
+# * @param accuracy The {@linkplain SunMoonCalculator#ACCURACY} tier.
+# * @return Array with a row per instant and a column per channel.
+# */
+def getValues(jd_UT, TTminusUT = None, accuracy = SunMoonCalculator.ACCURACY.FULL):
+    geocentric = SunMoonBatch.calcGeocentric(jd_UT, TTminusUT, accuracy)
+    sun = geocentric.sun
+    moon = geocentric.moon
+
+    phaseAngle = SunMoonBatch.normalizeRadians(moon.eclipticLongitude - sun.eclipticLongitude)
+
+    sunRA = np.arctan2(sun.y, sun.x)
+    sunDec = np.arctan2(sun.z, np.hypot(sun.x, sun.y))
+    moonRA = np.arctan2(moon.y, moon.x)
+    moonDec = np.arctan2(moon.z, np.hypot(moon.x, moon.y))
+    dRA = sunRA - moonRA
+    positionAngle = np.arctan2(np.cos(sunDec) * np.sin(dRA),
+        np.sin(sunDec) * np.cos(moonDec) - np.cos(sunDec) * np.sin(moonDec) * np.cos(dRA))
+
+    relativeSize = moon.angularRadius / math.atan(SunMoonCalculator.BODY.Moon.eqRadius / MOON_SEMI_MAJOR_AXIS)
+
+    return np.stack((phaseAngle, positionAngle, relativeSize), axis=-1)
+
+
+#/**
+# * Bakes the table for a time span.
+# * @param jdStart The Julian day in UT of the first row.
+# * @param jdEnd The Julian day in UT to cover, the last row is at or after it.
+# * @param step The step in days.
+# * @param accuracy The {@linkplain SunMoonCalculator#ACCURACY} tier.
+# * @return The float32 table, with a row per instant jdStart + i * step.
+# * @throws ValueError If the span does not give at least the two rows to interpolate.
+# */
+def bake(jdStart, jdEnd, step = STEP, accuracy = SunMoonCalculator.ACCURACY.FULL):
+    rows = int(math.ceil((jdEnd - jdStart) / step - 1.0e-9)) + 1
+    if (rows < 2):
+        raise ValueError("The table needs at least two rows, jdEnd must be after jdStart")
+    jd = jdStart + np.arange(rows) * step
+    return getValues(jd, accuracy = accuracy).astype(np.float32)
+
+
+#/**
+# * Writes a table.
+# * @param path The output file.
+# * @param jdStart The Julian day in UT of the first row.
+# * @param step The step in days.
+# * @param table The table returned by {@linkplain #bake}.
+# */
+def write(path, jdStart, step, table):
+    table = np.ascontiguousarray(table, dtype='<f4')
+    with open(path, 'wb') as out:
+        out.write(HEADER.pack(MAGIC, VERSION, jdStart, step, table.shape[0], table.shape[1]))
+        out.write(table.tobytes())
+
+
+#/**
+# * Reads a table written by {@linkplain #write}.
+# * @param path The file.
+# * @return The Julian day in UT of the first row, the step in days and the table.
+# * @throws ValueError If the file is not a table or has less than two rows.
+# */
+def read(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, version, jdStart, step, rows, channels = HEADER.unpack_from(data)
+    if (magic != MAGIC or version != VERSION or channels != len(CHANNELS)):
+        raise ValueError("Not a version " + str(VERSION) + " Moon table: " + str(path))
+    if (rows < 2):
+        raise ValueError("The Moon table needs at least two rows: " + str(path))
+    table = np.frombuffer(data, dtype='<f4', count=rows * channels, offset=HEADER.size)
+    return jdStart, step, table.reshape(rows, channels)
+
+
+#/**
+# * Interpolates a table linearly, as the client does. Angles are interpolated along the
+# * shortest arc, and instants out of the table are clamped to its ends.
+# * @param jdStart The Julian day in UT of the first row.
+# * @param step The step in days.
+# * @param table The table.
+# * @param jd The Julian days in UT.
+# * @return The interpolated rows.
+# */
+def lookup(jdStart, step, table, jd):
+    x = np.clip((np.asarray(jd, dtype=float) - jdStart) / step, 0, len(table) - 1)
+    i = np.minimum(x.astype(int), len(table) - 2)
+    f = (x - i)[..., None]
+    a = table[i].astype(float)
+    d = table[i + 1] - a
+    d[..., :2] = (d[..., :2] + math.pi) % SunMoonCalculator.TWO_PI - math.pi
+    return a + f * d
+
+
+def main():
+    # Usage: python MoonTable.py <first year> <last year> [step in hours] [output file]
+    firstYear = int(sys.argv[1])
+    lastYear = int(sys.argv[2])
+    step = float(sys.argv[3]) / 24.0 if len(sys.argv) > 3 else STEP
+    path = sys.argv[4] if len(sys.argv) > 4 else 'moon.bin'
+
+    start = time.perf_counter()
+    jdStart = Calendar.toJulianDay(firstYear, 1, 1)
+    table = bake(jdStart, Calendar.toJulianDay(lastYear + 1, 1, 1), step)
+    write(path, jdStart, step, table)
+    print(str(len(table)) + " rows, " + str(HEADER.size + table.nbytes) + " bytes")
+    print("Time: " + str(time.perf_counter() - start) + " s")
+
+    # Interpolation error in the middle of the steps. The position angle turns quickly close
+    # to the new and full Moon, where the bright limb is not visible or not defined
+    jd = jdStart + (np.arange(len(table) - 1) + 0.5) * step
+    values = getValues(jd)
+    error = np.abs(lookup(jdStart, step, table, jd) - values)
+    error[:, :2] = np.abs((error[:, :2] + math.pi) % SunMoonCalculator.TWO_PI - math.pi)
+    limb = np.abs(np.abs(values[:, 0] - math.pi) - math.pi * 0.5) < math.radians(85)
+    print("Max. error in phaseAngle:    " + str(math.degrees(error[:, 0].max())) + " deg")
+    print("Max. error in positionAngle: " + str(math.degrees(error[limb, 1].max())) + " deg, 5 deg or more from new and full Moon")
+    print("Max. error in relativeSize:  " + str(error[:, 2].max()))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+#################################################################################################################################
+# Parallel driver for ephemeris grids over many sites and instants.
+# The job is split in shards of a block of sites by a block of days, computed in a process
+# pool. Each shard evaluates the geocentric positions of its instants once for all its sites
+# and writes the requested Sun/Moon fields, and optionally the daily almanac of each
+# twilight, directly into arrays in shared memory. The time grid and the sites are also
+# placed in shared memory, and the small job description is sent once to each worker when
+# the pool starts, so that only the shard bounds travel between processes for each shard.
+#################################################################################################################################
+
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+
+from SunMoonCalculator import SunMoonCalculator
+import SunMoonBatch
+import Almanac
+
+
+# Default number of sites and days of each shard.
+SITES_PER_SHARD = Almanac.SITES_PER_BLOCK
+DAYS_PER_SHARD = Almanac.DAYS_PER_BLOCK
+
+# Input arrays placed in the shared memory block with the output.
+INPUTS = ('jd', 'obsLon', 'obsLat', 'obsAlt')
+
+# The job of the worker process, see {@linkplain #initWorker}.
+job = None
+
+
+#/**
+# * Layout of the output arrays in one shared memory block.
+# */
+class Layout(object):
+
+    #/**
+    # * Constructor.
+    # * @param arrays List of (name, shape) of the float64 arrays.
+    # */
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.offsets = {}
+        size = 0
+        for name, shape in arrays:
+            self.offsets[name] = (size, shape)
+            size += int(np.prod(shape)) * 8
+        self.size = max(size, 8)
+
+    #/**
+    # * Returns the arrays mapped on a shared memory block.
+    # * @param buffer The buffer of the block.
+    # * @return A dictionary from name to array.
+    # */
+    def getArrays(self, buffer):
+        return {name: np.ndarray(shape, dtype=np.float64, buffer=buffer, offset=offset)
+            for name, (offset, shape) in self.offsets.items()}
+
+
+#/**
+# * Sets the job of a worker process, once when the pool starts.
+# * @param parameters The shared memory name, layout and common parameters of the job.
+# */
+def initWorker(parameters):
+    global job
+    job = parameters
+
+
+#/**
+# * Computes one shard and writes it into shared memory. This runs in the worker processes.
+# * @param sites Slice of the sites of the shard.
+# * @param days Slice of the days of the shard.
+# * @return The number of values written.
+# */
+def calcShard(sites, days):
+    memory = shared_memory.SharedMemory(name=job['memory'])
+    # The views of the block must be released before closing it, even if the shard fails early
+    out = jd = None
+    try:
+        out = job['layout'].getArrays(memory.buf)
+        obsLon = out['obsLon'][sites].copy()
+        obsLat = out['obsLat'][sites].copy()
+        obsAlt = out['obsAlt'][sites].copy()
+        written = 0
+
+        # Positions of the instants within the days of the shard, for all its sites at once
+        jd = out['jd']
+        first = np.searchsorted(jd, job['jd0'] + days.start)
+        last = np.searchsorted(jd, job['jd0'] + days.stop)
+        if (last > first and len(job['fields']) > 0):
+            geocentric = SunMoonBatch.calcGeocentric(jd[first:last].copy())
+            sun, moon = SunMoonBatch.calcForObservers(geocentric, obsLon[:, None], obsLat[:, None], obsAlt[:, None])
+            for name, series in (('sun', sun), ('moon', moon)):
+                for field in job['fields']:
+                    out[name + '.' + field][sites, first:last] = getattr(series, field)
+                    written += series.azimuth.size
+
+        # Daily events
+        if (job['almanac']):
+            for block in Almanac.generateAlmanac(job['jd0'] + days.start, days.stop - days.start, obsLon, obsLat, obsAlt,
+                    twilights = job['twilights']):
+                site = block['site'] + sites.start
+                day = (block['date'] - job['jd0']).astype(int)
+                for column, values in block.items():
+                    if (column not in ('site', 'date')):
+                        out[column][site, day] = values
+                        written += len(values)
+        return written
+    finally:
+        del out, jd
+        memory.close()
+
+
+#/**
+# * Computes the Sun and Moon positions on a grid of instants and the daily almanac
+# * for a set of sites, in parallel.
+# * @param jdStart First Julian day in UT of the grid.
+# * @param jdEnd Last Julian day in UT, not included.
+# * @param step Step of the grid in days.
+# * @param obsLon Longitudes of the sites in radians.
+# * @param obsLat Latitudes of the sites in radians.
+# * @param obsAlt Altitudes of the sites in m.
+# * @param fields Fields of {@linkplain SunMoonBatch.EphemerisSeries} to return for each
+# * body, instant and site.
+# * @param twilights Twilight levels of the almanac, or None to skip the almanac.
+# * @param workers Number of worker processes, by default the number of CPUs.
+# * @param sitesPerShard Number of sites of each shard.
+# * @param daysPerShard Number of days of each shard.
+# * @return A dictionary of arrays: 'jd' with the grid, 'sun.<field>' and 'moon.<field>'
+# * with shape (sites, instants), and the almanac columns of {@linkplain Almanac#generateAlmanac}
+# * with shape (sites, days) for the dates from jdStart rounded down to 0h UT.
+# */
+def calcGrid(jdStart, jdEnd, step, obsLon, obsLat, obsAlt = 0.0, fields = ('azimuth', 'elevation'),
+        twilights = tuple(Almanac.TWILIGHTS), workers = None, sitesPerShard = SITES_PER_SHARD, daysPerShard = DAYS_PER_SHARD):
+    obsLon = np.atleast_1d(np.asarray(obsLon, dtype=float))
+    obsLat = np.broadcast_to(np.asarray(obsLat, dtype=float), obsLon.shape).copy()
+    obsAlt = np.broadcast_to(np.asarray(obsAlt, dtype=float), obsLon.shape).copy()
+    jd = jdStart + np.arange(math.ceil((jdEnd - jdStart) / step)) * step
+    jd0 = math.floor(jdStart - 0.5) + 0.5
+    days = math.ceil(jdEnd - jd0)
+    sites = len(obsLon)
+
+    arrays = [('jd', jd.shape), ('obsLon', obsLon.shape), ('obsLat', obsLat.shape), ('obsAlt', obsAlt.shape)]
+    arrays += [(body + '.' + field, (sites, len(jd))) for body in ('sun', 'moon') for field in fields]
+    if (twilights is not None):
+        columns = ['sunRise', 'sunSet', 'sunTransit', 'sunTransitElevation', 'moonRise', 'moonSet', 'moonTransit', 'moonTransitElevation']
+        for tw in twilights:
+            columns += [Almanac.TWILIGHTS[tw] + 'Dawn', Almanac.TWILIGHTS[tw] + 'Dusk']
+        arrays += [(column, (sites, days)) for column in columns]
+    layout = Layout(arrays)
+
+    memory = shared_memory.SharedMemory(create=True, size=layout.size)
+    try:
+        shared = layout.getArrays(memory.buf)
+        for name, values in zip(INPUTS, (jd, obsLon, obsLat, obsAlt)):
+            shared[name][:] = values
+        del shared
+
+        parameters = {'memory': memory.name, 'layout': layout, 'jd0': jd0, 'fields': fields,
+            'almanac': twilights is not None, 'twilights': twilights}
+        shards = [(slice(s, min(s + sitesPerShard, sites)), slice(d, min(d + daysPerShard, days)))
+            for d in range(0, days, daysPerShard) for s in range(0, sites, sitesPerShard)]
+        with ProcessPoolExecutor(workers, initializer=initWorker, initargs=(parameters,)) as executor:
+            for future in [executor.submit(calcShard, s, d) for s, d in shards]:
+                future.result()
+
+        out = {name: np.array(array) for name, array in layout.getArrays(memory.buf).items() if name not in INPUTS}
+    finally:
+        memory.close()
+        memory.unlink()
+
+    out['jd'] = jd
+    return out
+
+
+def main():
+    # Usage: python ParallelGrid.py [sites] [days]
+    # Reports the throughput of a grid at 30 minute steps for 1, 2, 4 ... workers up to the number of CPUs
+    sites = int(sys.argv[1]) if len(sys.argv) > 1 else 512
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    rng = np.random.default_rng(0)
+    obsLon = rng.uniform(-math.pi, math.pi, sites)
+    obsLat = rng.uniform(-1.0, 1.0, sites)
+    jdStart = 2460310.5
+
+    cpus = os.cpu_count() or 1
+    workers = 1
+    base = None
+    while (True):
+        start = time.perf_counter()
+        out = calcGrid(jdStart, jdStart + days, 1.0 / 48, obsLon, obsLat, workers = workers)
+        elapsed = time.perf_counter() - start
+        rate = sites * days / elapsed
+        base = base or rate
+        print(str(workers) + " workers: " + str(round(elapsed, 2)) + " s, " + str(round(rate)) + " site-days/s, speedup " + str(round(rate / base, 2)))
+        if (workers >= cpus):
+            break
+        workers = min(workers * 2, cpus)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+
+#################################################################################################################################
+# Atmospheric refraction.
+# The models give the refraction as a function of the apparent elevation with Bennet's 1982
+# formula, for optical wavelengths or adapted to radio ones, scaled for the ambient pressure,
+# temperature and humidity. The apparent elevation of a geometric one is obtained by Newton
+# iteration on the whole array at once, or by linear interpolation in a precomputed table.
+#################################################################################################################################
+
+import enum
+import math
+import threading
+import numpy as np
+
+
+# Radians to degrees.
+RAD_TO_DEG = 180.0 / math.pi
+
+# Degrees to radians.
+DEG_TO_RAD = 1.0 / RAD_TO_DEG
+
+# Default ambient conditions: pressure in mb, temperature in C and relative humidity in %.
+PRESSURE = 1010.0
+TEMPERATURE = 10.0
+HUMIDITY = 20.0
+
+# Newton iterations of the inversion, converged to 1e-6 arcseconds from the minimum elevation to the zenith.
+ITERATIONS = 4
+
+# Step in degrees of geometric elevation of the tables.
+TABLE_STEP = 0.01
+
+
+#/**
+# * The refraction formulae. Values are the two constants of the Bennet formula,
+# * R = k / tan(h + a / (h + b)) with h in degrees, and the geometric elevation
+# * in degrees below which no refraction is applied.
+# */
+class MODEL(enum.Enum):
+    # Bennet 1982 formulae for optical wavelengths, do the job but not accurate close to horizon.
+    # Yan 1996 formulae would be better but with much more lines of code
+    OPTICAL = (7.31, 4.4, -3.0)
+    # Bennet formulae adapted to radio wavelenths. Use this for position in radio wavelengths.
+    # Reference for some values: http://icts-yebes.oan.es/reports/doc/IT-OAN-2003-2.pdf (Yebes 40m radiotelescope)
+    RADIO = (5.9, 2.5, -1.0)
+
+
+class Refraction(object):
+
+    #/**
+    # * Constructor. Ambient conditions can be arrays, to be broadcast against the elevations.
+    # * @param model The formula.
+    # * @param pressure Pressure in mb.
+    # * @param temperature Temperature in C.
+    # * @param humidity Relative humidity in %, only used for radio wavelengths.
+    # */
+    def __init__(self, model = MODEL.OPTICAL, pressure = PRESSURE, temperature = TEMPERATURE, humidity = HUMIDITY):
+        self.model = model
+        self.pressure = pressure
+        self.temperature = temperature
+        self.humidity = humidity
+
+        Ps = np.asarray(pressure, dtype=float)
+        Ts = np.asarray(temperature, dtype=float) + 273.15
+        if (model == MODEL.OPTICAL):
+            # Refraction in radians for tan = 1
+            self.scale = DEG_TO_RAD / 60.0 * (0.28 * Ps / Ts)
+        else:
+            # Water vapor saturation pressure following Crane (1976), as in the ALMA memorandum
+            esat = 6.105 * np.exp(25.22 * (Ts - 273.15) / Ts) * np.power(Ts / 273.15, -5.31)
+            Pw = np.asarray(humidity, dtype=float) * esat / 100.0
+            self.scale = (16.01 / Ts) * (Ps - 0.072 * Pw + 4831 * Pw / Ts) * DEG_TO_RAD / 3600.0
+        self.a, self.b, minimum = model.value
+        self.minimum = minimum * DEG_TO_RAD
+
+    #/**
+    # * Returns the refraction for an apparent elevation and its derivative.
+    # * @param alt Apparent elevations in radians.
+    # * @return Refraction in radians and its derivative respect to the elevation.
+    # */
+    def getRefraction(self, alt):
+        altDeg = alt * RAD_TO_DEG
+        d = 1.0 / (altDeg + self.b)
+        cot = 1.0 / np.tan((altDeg + self.a * d) * DEG_TO_RAD)
+        scale = np.copysign(self.scale, cot)
+        return scale * cot, -scale * (1.0 + cot * cot) * (1.0 - self.a * d * d)
+
+    #/**
+    # * Compute geometric elevations from apparent elevations.
+    # * @param alt Apparent elevations in radians.
+    # * @return Geometric elevations in radians.
+    # */
+    def computeGeometricElevation(self, alt):
+        alt = np.asarray(alt, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.minimum(alt - self.getRefraction(alt)[0], math.pi * 0.5)
+
+    #/**
+    # * Corrects geometric elevations for refraction if they are above the minimum of the
+    # * model, inverting {@linkplain #computeGeometricElevation}.
+    # * @param alt Geometric elevations in radians.
+    # * @return Apparent elevations.
+    # */
+    def getApparentElevation(self, alt):
+        geometric = np.asarray(alt, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            apparent = self.invert(geometric)
+        out = np.where(geometric > self.minimum, np.minimum(apparent, math.pi * 0.5), geometric)
+        return float(out) if out.ndim == 0 else out
+
+    #/**
+    # * Newton iteration for the apparent elevations, without checking the minimum.
+    # * @param geometric Geometric elevations in radians, array.
+    # * @return Apparent elevations.
+    # */
+    def invert(self, geometric):
+        apparent = geometric + self.getRefraction(geometric)[0]
+        for i in range(ITERATIONS):
+            refr, dRefr = self.getRefraction(apparent)
+            apparent = apparent - (apparent - refr - geometric) / (1.0 - dRefr)
+        return apparent
+
+    #/**
+    # * Returns a table of this model, for conditions given as scalars.
+    # * @param step Step in degrees of geometric elevation.
+    # * @return The table.
+    # */
+    def getTable(self, step = TABLE_STEP):
+        return RefractionTable(self, step)
+
+
+#/**
+# * Apparent elevations of a model tabulated on a uniform grid of geometric elevations,
+# * from the minimum of the model to the zenith. With the default step the linear
+# * interpolation error is below 0.12 arcseconds, and 0.003 arcseconds between the horizon
+# * and 89.9 degrees.
+# */
+class RefractionTable(object):
+
+    def __init__(self, refraction, step = TABLE_STEP):
+        self.refraction = refraction
+        self.minimum = refraction.minimum
+        self.step = step * DEG_TO_RAD
+        grid = self.minimum + np.arange(math.ceil((math.pi * 0.5 - self.minimum) / self.step) + 2) * self.step
+        self.correction = np.minimum(refraction.invert(grid), math.pi * 0.5) - grid
+
+    #/**
+    # * Corrects geometric elevations for refraction, see {@linkplain Refraction#getApparentElevation}.
+    # * @param alt Geometric elevations in radians.
+    # * @return Apparent elevations.
+    # */
+    def getApparentElevation(self, alt):
+        geometric = np.asarray(alt, dtype=float)
+        x = np.clip((geometric - self.minimum) / self.step, 0.0, len(self.correction) - 1.000001)
+        i = x.astype(np.intp)
+        u = x - i
+        apparent = geometric + self.correction[i] * (1.0 - u) + self.correction[i + 1] * u
+        out = np.where(geometric > self.minimum, np.minimum(apparent, math.pi * 0.5), geometric)
+        return float(out) if out.ndim == 0 else out
+
+    #/**
+    # * Compute geometric elevations from apparent elevations with the model of the table.
+    # * @param alt Apparent elevations in radians.
+    # * @return Geometric elevations in radians.
+    # */
+    def computeGeometricElevation(self, alt):
+        return self.refraction.computeGeometricElevation(alt)
+
+
+# Process wide model, created when first used.
+default = None
+defaultLock = threading.Lock()
+
+
+#/**
+# * Returns the process wide model, by default the table of optical refraction for
+# * 1010 mb and 10 C.
+# * @return The model or table.
+# */
+def getDefault():
+    global default
+    if (default is None):
+        with defaultLock:
+            if (default is None):
+                default = Refraction().getTable()
+    return default
+
+
+#/**
+# * Replaces the process wide model.
+# * @param model A Refraction or RefractionTable.
+# */
+def setDefault(model):
+    global default
+    with defaultLock:
+        default = model
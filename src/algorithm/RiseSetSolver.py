@@ -0,0 +1,246 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+#################################################################################################################################
+# Bracketed rise/set/transit/culmination solver.
+# The Sun or Moon series is evaluated only at a few Chebyshev nodes around the calculation
+# instant. The geocentric position is interpolated from them on a dense time grid, where the
+# topocentric elevation and hour angle are computed with the exact sidereal time. Events are
+# bracketed by sign changes on the grid and refined by Newton iteration on the local cubic
+# through the four surrounding samples.
+#################################################################################################################################
+
+import math
+import numpy as np
+from numpy.polynomial import chebyshev
+
+from SunMoonCalculator import SunMoonCalculator
+import Instrumentation
+import SunMoonBatch
+
+
+class RiseSetSolver(object):
+
+    # Half width in days of the time span searched around the calculation instant.
+    WINDOW = 1.25
+
+    # Number of evaluations of the series used to interpolate the geocentric position.
+    NODES = 9
+
+    # Step in days of the grid used to bracket the events.
+    STEP = 10.0 / 1440.0
+
+    # Chebyshev nodes and the matrix interpolating values at the nodes onto the grid,
+    # both relative to the calculation instant.
+    nodes = WINDOW * chebyshev.chebpts1(NODES)
+    grid = np.arange(-WINDOW, WINDOW + STEP * 0.5, STEP)
+    interpolation = chebyshev.chebvander(grid / WINDOW, NODES - 1) @ np.linalg.inv(chebyshev.chebvander(nodes / WINDOW, NODES - 1))
+
+    #/**
+    # * Class to hold the events found for a body. Times are Julian days in UT,
+    # * -1 when there is no such event for the observer and date.
+    # */
+    class Events(object):
+
+        def __init__(self, rise, set, transit, transitElevation, culmination):
+            self.rise = rise
+            self.set = set
+            self.transit = transit
+            self.transitElevation = transitElevation
+            self.culmination = culmination
+
+    def __init__(self, obsLon, obsLat, obsAlt, TTminusUT, twilight = SunMoonCalculator.TWILIGHT.HORIZON_34arcmin,
+                 accuracy = SunMoonCalculator.ACCURACY.FULL):
+        self.obsLon = obsLon
+        self.obsLat = obsLat
+        self.obsAlt = obsAlt
+        self.TTminusUT = TTminusUT
+        self.twilight = twilight
+        # Accuracy tier of the series evaluated at the nodes
+        self.accuracy = accuracy
+
+        # Number of evaluations of the Sun/Moon series done by this solver.
+        self.evaluations = 0
+
+        # Time dependent parameters on the grid of the last instant, shared by both bodies.
+        self.state = None
+
+    #/**
+    # * Creates a solver for the observer, TT-UT, twilight and accuracy of a calculator.
+    # * @param calc The calculator.
+    # * @return The solver.
+    # */
+    @classmethod
+    def fromCalculator(cls, calc):
+        return cls(calc.obsLon, calc.obsLat, calc.obsAlt, calc.TTminusUT, calc.twilight, calc.accuracy)
+
+    #/**
+    # * Computes the rise, set, transit and culmination closest to an instant, with the
+    # * same preference as {@linkplain SunMoonCalculator#doCalc}: the previous event is
+    # * returned if it happens the same day and is closer than the next one.
+    # * @param jd The Julian day in UT.
+    # * @param sun True for the Sun, false for the Moon.
+    # * @return The events, with 1s accuracy or better.
+    # */
+    def getEvents(self, jd, sun):
+        # Geocentric ecliptic position interpolated from the series
+        t = (jd + self.nodes + self.TTminusUT / SunMoonCalculator.SECONDS_PER_DAY - SunMoonCalculator.J2000) / SunMoonCalculator.JULIAN_DAYS_PER_CENTURY
+        if (sun):
+            pos = SunMoonBatch.getSun(t, self.accuracy)
+        else:
+            pos = SunMoonBatch.getMoon(t, accuracy = self.accuracy)[0]
+        self.evaluations += self.NODES
+        if (Instrumentation.enabled):
+            Instrumentation.count('riseSetSolver.getEvents')
+        lon, lat, distance = np.array([np.unwrap(pos[0]), pos[1], pos[2]]) @ self.interpolation.T
+        eqRadius = (SunMoonCalculator.BODY.Sun if sun else SunMoonCalculator.BODY.Moon).eqRadius
+        angR = np.arctan(eqRadius / (SunMoonCalculator.AU * distance))
+
+        # Topocentric geometric elevation and hour angle on the grid
+        grid = jd + self.grid
+        if (self.state is None or self.state[0] != jd):
+            self.state = (jd, SunMoonBatch.getTimeState(grid, self.TTminusUT, self.obsLon))
+        state = self.state[1]
+        ra, dec, dist, eclLon, eclLat = SunMoonBatch.getEquatorial([lon, lat, distance, angR], state, self.obsLat, self.obsAlt)
+        angh = state[4] - ra
+        sinLat = math.sin(self.obsLat)
+        cosLat = math.cos(self.obsLat)
+        alt = np.arcsin(sinLat * np.sin(dec) + cosLat * np.cos(dec) * np.cos(angh))
+        height = alt - SunMoonCalculator.getTwilightElevation(self.twilight, angR)
+        sinH = np.sin(angh)
+        upper = np.cos(angh) > 0
+        slope = np.gradient(alt)
+
+        rise = self.selectEvent(jd, grid, height, (height[:-1] < 0) & (height[1:] >= 0))
+        set = self.selectEvent(jd, grid, height, (height[:-1] >= 0) & (height[1:] < 0))
+        transit = self.selectEvent(jd, grid, sinH, (sinH[:-1] < 0) & (sinH[1:] >= 0) & upper[:-1] & upper[1:])
+        culmination = self.selectEvent(jd, grid, slope, (slope[:-1] > 0) & (slope[1:] <= 0) & upper[:-1] & upper[1:], alt)
+
+        transitElevation = 0
+        if (transit != -1):
+            transitDec = self.interpolate(grid, dec, transit)
+            transitElevation = math.asin(math.sin(transitDec) * sinLat + math.cos(transitDec) * cosLat)
+            if (self.accuracy.refraction):
+                transitElevation = float(SunMoonBatch.refraction(transitElevation))
+
+        return self.Events(rise, set, transit, transitElevation, culmination)
+
+    #/**
+    # * Refines the bracketed roots and returns the one to report. Of the last root before
+    # * the instant and the first one after it, the previous one is reported when it falls on
+    # * the same UT date as the instant and is strictly closer to it, otherwise the next one.
+    # * This is the rule of {@linkplain SunMoonCalculator#calcBody}, applied to the refined
+    # * instants instead of the rough estimates. When both candidates are about half a day
+    # * away the estimates can rank them the other way, and obtainAccurateRiseSetTransit then
+    # * converges to the other candidate. Near the polar circles the Moon can also rise or set
+    # * within the window while it does not at the instant, where obtainAccurateRiseSetTransit
+    # * returns -1 and the solver the candidate chosen by the same rule.
+    # * @param jd The calculation instant.
+    # * @param grid The grid of Julian days.
+    # * @param values The function whose roots are searched, on the grid.
+    # * @param brackets Boolean array, true for intervals containing a root.
+    # * @param extremumOf If set, roots are searched for the derivative of this
+    # * function instead, values being only used to bracket them.
+    # * @return The Julian day of the event, or -1.
+    # */
+    def selectEvent(self, jd, grid, values, brackets, extremumOf = None):
+        index = np.nonzero(brackets)[0]
+        if (len(index) == 0):
+            if (Instrumentation.enabled):
+                Instrumentation.count('riseSetSolver.noEvent')
+            return -1
+
+        # Only the last root before and the first root after the instant can be reported
+        i = np.searchsorted(grid[index], jd)
+        index = index[max(i - 2, 0):i + 1]
+
+        roots = self.refineRoots(grid, values if extremumOf is None else extremumOf, index, extremumOf is not None)
+        if (Instrumentation.enabled):
+            Instrumentation.count('riseSetSolver.roots', len(roots))
+        before = roots[roots <= jd]
+        after = roots[roots > jd]
+
+        jdToday = math.floor(jd - 0.5) + 0.5
+        if (len(before) > 0):
+            previous = before[-1]
+            if (math.floor(previous - 0.5) + 0.5 == jdToday and (len(after) == 0 or abs(previous - jd) < abs(after[0] - jd))):
+                return float(previous)
+        if (len(after) > 0):
+            return float(after[0])
+        if (Instrumentation.enabled):
+            Instrumentation.count('riseSetSolver.noEvent')
+        return -1
+
+    #/**
+    # * Newton iteration on the cubic through the four samples around each bracket.
+    # * @param grid The uniform grid of Julian days.
+    # * @param values The sampled function.
+    # * @param index Start of each bracketing interval.
+    # * @param extremum True to find the roots of the derivative of the cubic.
+    # * @return The roots as Julian days.
+    # */
+    @staticmethod
+    def refineRoots(grid, values, index, extremum = False):
+        step = grid[1] - grid[0]
+        roots = []
+        for i in index.tolist():
+            j = min(max(i - 1, 0), len(grid) - 4)
+            g0, g1, g2, g3 = values[j:j + 4].tolist()
+
+            # Newton form of the cubic in u = (t - grid[j]) / step
+            d1 = g1 - g0
+            d2 = (g2 - 2 * g1 + g0) / 2.0
+            d3 = (g3 - 3 * g2 + 3 * g1 - g0) / 6.0
+
+            lo = i - j
+            if (extremum):
+                u = lo + 0.5
+            else:
+                u = lo + values[i] / (values[i] - values[i + 1])
+            for k in range(5):
+                if (extremum):
+                    f = d1 + d2 * (2 * u - 1) + d3 * (3 * u * u - 6 * u + 2)
+                    df = 2 * d2 + d3 * (6 * u - 6)
+                else:
+                    f = g0 + u * (d1 + (u - 1) * (d2 + d3 * (u - 2)))
+                    df = d1 + d2 * (2 * u - 1) + d3 * (3 * u * u - 6 * u + 2)
+                if (df == 0):
+                    break
+                u = min(max(u - f / df, lo), lo + 1.0)
+            roots.append(grid[j] + u * step)
+
+        return np.array(roots)
+
+    #/**
+    # * Cubic interpolation of a sampled function.
+    # * @param grid The uniform grid of Julian days.
+    # * @param values The sampled function.
+    # * @param jd The Julian day.
+    # * @return The interpolated value.
+    # */
+    @staticmethod
+    def interpolate(grid, values, jd):
+        step = grid[1] - grid[0]
+        j = min(max(int((jd - grid[0]) / step) - 1, 0), len(grid) - 4)
+        g0, g1, g2, g3 = values[j:j + 4]
+        u = (jd - grid[j]) / step
+        return g0 + u * ((g1 - g0) + (u - 1) * ((g2 - 2 * g1 + g0) / 2.0 + (g3 - 3 * g2 + 3 * g1 - g0) / 6.0 * (u - 2)))
@@ -0,0 +1,130 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+#################################################################################################################################
+# Equinox and solstice finder.
+# The instants when the apparent longitude of the Sun is a multiple of 90 degrees are
+# found for all years of a range at once: every event starts from its mean date and all of
+# them are refined together by secant iterations, each one a single vectorized evaluation
+# of the Sun series.
+#################################################################################################################################
+
+import math
+import numpy as np
+
+from SunMoonCalculator import SunMoonCalculator
+import Instrumentation
+import SunMoonBatch
+
+
+# Length of the tropical year in days.
+TROPICAL_YEAR = 365.2421897
+
+# Mean instant of the March equinox of year 2000, Julian day in UT.
+MARCH_EQUINOX_2000 = 2451623.81
+
+# Maximum number of secant iterations, and their convergence limit in days.
+MAX_ITERATIONS = 10
+ACCURACY = 0.1 / SunMoonCalculator.SECONDS_PER_DAY
+
+
+#/**
+# * Returns the apparent ecliptic longitude of the Sun, including nutation.
+# * @param jd The Julian days in UT.
+# * @param TTminusUT TT minus UT in seconds, or None to compute it for each instant.
+# * @return The longitude in radians, not normalized.
+# */
+def getApparentLongitude(jd, TTminusUT = None):
+    if (TTminusUT is None):
+        TTminusUT = SunMoonBatch.getTTminusUT(jd)
+    t = (jd + TTminusUT / SunMoonCalculator.SECONDS_PER_DAY - SunMoonCalculator.J2000) / SunMoonCalculator.JULIAN_DAYS_PER_CENTURY
+    return SunMoonBatch.getSun(t)[0] + SunMoonBatch.getNutation(t)[0]
+
+
+#/**
+# * Finds the equinoxes and solstices of a range of years.
+# * @param firstYear The first year.
+# * @param lastYear The last year, included.
+# * @param TTminusUT TT minus UT in seconds, or None to compute it for each instant.
+# * @return The Julian days in UT of the events, with shape (years, 4) and the
+# * columns in the order of {@linkplain SunMoonCalculator.SEASON}. The accuracy
+# * is limited by the Sun series and TT minus UT, better than one minute.
+# */
+def findSeasons(firstYear, lastYear, TTminusUT = None):
+    fractions = np.array([s.value[1] for s in SunMoonCalculator.SEASON])
+    year = np.arange(firstYear, lastYear + 1)[:, None]
+    target = SunMoonCalculator.TWO_PI * fractions
+
+    # Secant iterations starting one day around the mean instant of each event
+    guess = MARCH_EQUINOX_2000 + (year - 2000 + fractions) * TROPICAL_YEAR
+    x0 = guess - 1.0
+    x1 = guess + 1.0
+    r0 = residual(x0, target, TTminusUT)
+    r1 = residual(x1, target, TTminusUT)
+    for i in range(MAX_ITERATIONS):
+        # Converged events can have equal residuals, keep them where they are
+        slope = np.where(r1 != r0, (x1 - x0) / np.where(r1 != r0, r1 - r0, 1.0), 0.0)
+        x2 = x1 - r1 * slope
+        if (np.max(np.abs(x2 - x1)) < ACCURACY):
+            if (Instrumentation.enabled):
+                Instrumentation.count('findSeasons.iterations', i + 1)
+            return x2
+        x0, r0 = x1, r1
+        x1, r1 = x2, residual(x2, target, TTminusUT)
+
+    if (Instrumentation.enabled):
+        Instrumentation.count('findSeasons.iterations', MAX_ITERATIONS)
+        Instrumentation.count('findSeasons.notConverged')
+    return x1
+
+
+#/**
+# * Difference between the apparent longitude of the Sun and a target, in the range (-Pi, Pi).
+# */
+def residual(jd, target, TTminusUT):
+    r = getApparentLongitude(jd, TTminusUT) - target
+    return np.mod(r + math.pi, SunMoonCalculator.TWO_PI) - math.pi
+
+
+#/**
+# * Generates the equinoxes and solstices of a range of years, in chronological order.
+# * @param firstYear The first year.
+# * @param lastYear The last year, included.
+# * @param TTminusUT TT minus UT in seconds, or None to compute it for each instant.
+# * @return A generator of (Julian day in UT, {@linkplain SunMoonCalculator.SEASON}) tuples.
+# */
+def generateSeasons(firstYear, lastYear, TTminusUT = None):
+    seasons = list(SunMoonCalculator.SEASON)
+    for row in findSeasons(firstYear, lastYear, TTminusUT).tolist():
+        for jd, season in zip(row, seasons):
+            yield jd, season
+
+
+def main():
+    # Prints the equinoxes and solstices of a year
+    year = 2024
+    smc = SunMoonCalculator(0, 0, 0, year, 1, 1)
+    for jd, season in generateSeasons(year, year):
+        print(season.value[0] + " " + smc.getDateAsString(jd))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,586 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+#################################################################################################################################
+# Vectorized (NumPy) counterpart of SunMoonCalculator.
+# Every function takes arrays of instants instead of a single calculator state and
+# evaluates the same series as the scalar class, so that a whole time series is
+# computed in one pass. Rise/set/transit times are not computed here.
+# The observer independent part (series, nutation, rotation to the equator) can be
+# computed once with calcGeocentric and reduced for many observers with calcForObservers.
+#################################################################################################################################
+
+import math
+import numpy as np
+
+from SunMoonCalculator import SunMoonCalculator, DEG_TO_RAD, RAD_TO_DEG
+import DeltaT
+import Refraction
+
+
+# Number of instants evaluated at once by the lunar series.
+CHUNK_SIZE = 4096
+
+
+# Fields of the ephemeris series, in the order of their columns.
+FIELDS = ('azimuth', 'elevation', 'rightAscension', 'declination', 'distance',
+    'eclipticLongitude', 'eclipticLatitude', 'angularRadius', 'illuminationPhase')
+
+# Structured type of one sample, see {@linkplain EphemerisSeries#toRecords}.
+RECORD_DTYPE = np.dtype([(field, np.float64) for field in FIELDS])
+
+
+#/**
+# * Class to hold the results of a batch computation. Every field is an array
+# * with the shape of the input Julian days, with the same meaning and units as
+# * in {@linkplain SunMoonCalculator.Ephemeris}. The fields are views of the rows
+# * of a single contiguous block of columns, so a series can be preallocated
+# * and filled in place, and exported without copying the values.
+# */
+class EphemerisSeries(object):
+
+    __slots__ = ('columns',)
+
+    #/**
+    # * Constructor. The values are broadcast and written to the columns.
+    # * @param columns Preallocated columns, an array of shape (len(FIELDS),) + shape,
+    # * for instance from {@linkplain #empty} or a slice of a larger series. Allocated
+    # * when not provided.
+    # */
+    def __init__(self, azimuth, elevation, rightAscension, declination, distance,
+            eclipticLongitude, eclipticLatitude, angularRadius, columns = None):
+        if (columns is None):
+            columns = np.empty((len(FIELDS),) + np.shape(azimuth))
+        self.columns = columns
+        self.azimuth = azimuth
+        self.elevation = elevation
+        self.rightAscension = rightAscension
+        self.declination = declination
+        self.distance = distance
+        self.eclipticLongitude = eclipticLongitude
+        self.eclipticLatitude = eclipticLatitude
+        self.angularRadius = angularRadius
+        self.illuminationPhase = 100.0
+
+    #/**
+    # * Creates a series with uninitialized values.
+    # * @param shape The shape of each field.
+    # * @return The series.
+    # */
+    @classmethod
+    def empty(cls, shape):
+        series = cls.__new__(cls)
+        series.columns = np.empty((len(FIELDS),) + ((shape,) if isinstance(shape, int) else tuple(shape)))
+        return series
+
+    # Number of samples.
+    def __len__(self):
+        return self.columns[0].size
+
+    #/**
+    # * Returns the series of a subset of the samples, sharing the columns.
+    # * @param index Index or slice of the samples.
+    # * @return The series.
+    # */
+    def __getitem__(self, index):
+        if (not isinstance(index, tuple)):
+            index = (index,)
+        series = EphemerisSeries.__new__(EphemerisSeries)
+        series.columns = self.columns[(slice(None),) + index]
+        return series
+
+    #/**
+    # * Returns the samples as a NumPy structured array of {@linkplain #RECORD_DTYPE}.
+    # * This is the only method copying the values, to interleave the fields.
+    # * @return The flattened records.
+    # */
+    def toRecords(self):
+        records = np.empty(len(self), dtype=RECORD_DTYPE)
+        for i, field in enumerate(FIELDS):
+            records[field] = self.columns[i].ravel()
+        return records
+
+
+#/**
+# * Adds a property for a field of the series, reading and writing its column.
+# * @param index The column.
+# * @return The property.
+# */
+def columnProperty(index):
+    def get(self):
+        return self.columns[index]
+    def set(self, value):
+        self.columns[index] = value
+    return property(get, set)
+
+for i, field in enumerate(FIELDS):
+    setattr(EphemerisSeries, field, columnProperty(i))
+
+
+#/**
+# * Reduce angles in radians to the range (0 - 2 Pi).
+# * @param r Values in radians.
+# * @return The reduced radians values.
+# */
+def normalizeRadians(r):
+    return np.mod(r, SunMoonCalculator.TWO_PI)
+
+
+#/**
+# * Returns TT minus UT in seconds for a set of Julian days from the process wide
+# * {@linkplain DeltaT} provider.
+# * @param jd The Julian days in UT.
+# * @return TT minus UT in seconds.
+# */
+def getTTminusUT(jd):
+    return DeltaT.getTTminusUT(np.asarray(jd, dtype=float))
+
+
+#/**
+# * Computes the time dependent parameters of {@linkplain SunMoonCalculator#setUTDate}
+# * for a set of instants.
+# * @param jd_UT The Julian days in UT.
+# * @param TTminusUT TT minus UT in seconds, scalar or array.
+# * @param obsLon Observer's longitude in radians.
+# * @param tolerance If greater than 0, nutation and obliquity are interpolated
+# * linearly between nodes spaced to keep the error below this value in radians,
+# * see {@linkplain SunMoonCalculator.TimeStateCache}. This is faster for dense grids.
+# * @param nutation False to skip the nutation, which is then 0 and the sidereal time is the mean one.
+# * @return Julian centuries from J2000 in TT, nutation in longitude and obliquity,
+# * mean obliquity and local apparent sidereal time.
+# */
+def getTimeState(jd_UT, TTminusUT, obsLon, tolerance = 0.0, nutation = True):
+    jd_UT = np.asarray(jd_UT, dtype=float)
+    t = (jd_UT + TTminusUT / SunMoonCalculator.SECONDS_PER_DAY - SunMoonCalculator.J2000) / SunMoonCalculator.JULIAN_DAYS_PER_CENTURY
+
+    if (not nutation):
+        nutLon = nutObl = np.zeros_like(t)
+        meanObliquity = getMeanObliquity(t)
+    elif (tolerance > 0 and t.size > 2):
+        step = math.sqrt(8.0 * tolerance / SunMoonCalculator.TimeStateCache.NUTATION_CURVATURE) / SunMoonCalculator.JULIAN_DAYS_PER_CENTURY
+        nodes = np.arange(math.floor(t.min() / step), math.floor(t.max() / step) + 2) * step
+        nutLon, nutObl = getNutation(nodes)
+        nutLon = np.interp(t, nodes, nutLon)
+        nutObl = np.interp(t, nodes, nutObl)
+        meanObliquity = np.interp(t, nodes, getMeanObliquity(nodes))
+    else:
+        nutLon, nutObl = getNutation(t)
+        meanObliquity = getMeanObliquity(t)
+
+    # Obtain local apparent sidereal time
+    jd0 = np.floor(jd_UT - 0.5) + 0.5
+    T0 = (jd0 - SunMoonCalculator.J2000) / SunMoonCalculator.JULIAN_DAYS_PER_CENTURY
+    secs = (jd_UT - jd0) * SunMoonCalculator.SECONDS_PER_DAY
+    gmst = (((((-6.2e-6 * T0) + 9.3104e-2) * T0) + 8640184.812866) * T0) + 24110.54841
+    msday = 1.0 + (((((-1.86e-5 * T0) + 0.186208) * T0) + 8640184.812866) / (SunMoonCalculator.SECONDS_PER_DAY * SunMoonCalculator.JULIAN_DAYS_PER_CENTURY))
+    gmst = (gmst + msday * secs) * (15.0 / 3600.0) * DEG_TO_RAD
+    lst = normalizeRadians(gmst + obsLon + nutLon * np.cos(meanObliquity + nutObl))
+
+    return t, nutLon, nutObl, meanObliquity, lst
+
+
+#/**
+# * Computes the nutation in longitude and obliquity, see {@linkplain SunMoonCalculator#getNutation}.
+# * @param t Julian centuries from J2000 in TT.
+# * @return Nutation in longitude and obliquity in radians.
+# */
+def getNutation(t):
+    M1 = (124.90 - 1934.134 * t + 0.002063 * t * t) * DEG_TO_RAD
+    M2 = (201.11 + 72001.5377 * t + 0.00057 * t * t) * DEG_TO_RAD
+    nutLon = (-0.0047785 * np.sin(M1) - 0.0003667 * np.sin(M2)) * DEG_TO_RAD
+    nutObl = (0.002558 * np.cos(M1) - 0.00015339 * np.cos(M2)) * DEG_TO_RAD
+    return nutLon, nutObl
+
+
+#/**
+# * Computes the mean obliquity of the ecliptic, see {@linkplain SunMoonCalculator#getMeanObliquity}.
+# * @param t Julian centuries from J2000 in TT.
+# * @return The mean obliquity in radians.
+# */
+def getMeanObliquity(t):
+    t2 = t / 100.0
+    tmp = t2 * (27.87 + t2 * (5.79 + t2 * 2.45))
+    tmp = t2 * (-249.67 + t2 * (-39.05 + t2 * (7.12 + tmp)))
+    tmp = t2 * (-1.55 + t2 * (1999.25 + t2 * (-51.38 + tmp)))
+    tmp = (t2 * (-4680.93 + tmp)) / 3600.0
+    return (23.4392911111111 + tmp) * DEG_TO_RAD
+
+
+#/**
+# * Sun position for a set of instants, see {@linkplain SunMoonCalculator#getSun}.
+# * @param t Julian centuries from J2000 in TT.
+# * @param accuracy The {@linkplain SunMoonCalculator#ACCURACY} tier.
+# * @return Ecliptic longitude, latitude, distance and angular radius arrays.
+# */
+def getSun(t, accuracy = SunMoonCalculator.ACCURACY.FULL):
+    return SunMoonCalculator.getSunPosition(np.asarray(t, dtype=float), accuracy)
+
+
+#/**
+# * Moon position for a set of instants, see {@linkplain SunMoonCalculator#getMoon}.
+# * @param t Julian centuries from J2000 in TT.
+# * @param sunLongitude Apparent Sun longitude (including nutation) to compute the
+# * Moon's age, or None to estimate it from the mean phase.
+# * @param accuracy The {@linkplain SunMoonCalculator#ACCURACY} tier.
+# * @return Ecliptic longitude, latitude, distance and angular radius arrays, and the Moon's age in days.
+# */
+def getMoon(t, sunLongitude = None, accuracy = SunMoonCalculator.ACCURACY.FULL):
+    t = np.asarray(t, dtype=float)
+    if (t.ndim == 0 or t.size <= CHUNK_SIZE):
+        return SunMoonCalculator.getMoonPosition(t, sunLongitude, accuracy)
+
+    # Evaluate long series in chunks to bound the size of the (instant, term) temporaries
+    flat = t.ravel()
+    if (sunLongitude is not None):
+        sunLongitude = np.broadcast_to(sunLongitude, t.shape).ravel()
+    pos = [np.empty_like(flat) for i in range(4)]
+    moonAge = np.empty_like(flat)
+    for start in range(0, flat.size, CHUNK_SIZE):
+        chunk = slice(start, start + CHUNK_SIZE)
+        chunkPos, moonAge[chunk] = SunMoonCalculator.getMoonPosition(flat[chunk], None if sunLongitude is None else sunLongitude[chunk], accuracy)
+        for i in range(4):
+            pos[i][chunk] = chunkPos[i]
+
+    return [x.reshape(t.shape) for x in pos], moonAge.reshape(t.shape)
+
+
+#/**
+# * Planet position for a set of instants, see {@linkplain SunMoonCalculator#getPlanetPosition}.
+# * @param body The planet.
+# * @param t Julian centuries from J2000 in TT.
+# * @param sunPosition The output of getSun for t, to share it among planets.
+# * @return Ecliptic longitude, latitude, distance and angular radius arrays.
+# */
+def getPlanet(body, t, sunPosition = None):
+    return SunMoonCalculator.getPlanetPosition(body, np.asarray(t, dtype=float), sunPosition)
+
+
+#/**
+# * Corrects ecliptic positions for nutation and obtains the geocentric equatorial
+# * rectangular coordinates. This part of {@linkplain #doCalc} does not depend on the observer.
+# * @param pos Ecliptic longitude, latitude, distance and angular radius arrays from getSun or getMoon.
+# * @param state The time dependent parameters returned by getTimeState.
+# * @return The x, y, z coordinates in AU, and the ecliptic longitude and latitude
+# * corrected for nutation.
+# */
+def getGeocentricEquatorial(pos, state):
+    t, nutLon, nutObl, meanObliquity, lst = state
+
+    #// Correct for nutation in longitude and obliquity
+    lon = pos[0] + nutLon
+    lat = pos[1] + nutObl
+
+    #// Ecliptic to equatorial coordinates
+    cl = np.cos(lat)
+    x = pos[2] * np.cos(lon) * cl
+    y = pos[2] * np.sin(lon) * cl
+    z = pos[2] * np.sin(lat)
+    sinEcl = np.sin(meanObliquity)
+    cosEcl = np.cos(meanObliquity)
+    tmp = y * cosEcl - z * sinEcl
+    z = y * sinEcl + z * cosEcl
+    y = tmp
+
+    return x, y, z, lon, lat
+
+
+#/**
+# * Obtains topocentric rectangular coordinates from geocentric ones. Observer
+# * arguments can be arrays, broadcast against the coordinates.
+# * @param x Geocentric equatorial x coordinate in AU.
+# * @param y Geocentric equatorial y coordinate in AU.
+# * @param z Geocentric equatorial z coordinate in AU.
+# * @param lst Local apparent sidereal time in radians.
+# * @param obsLat Observer's latitude in radians.
+# * @param obsAlt Observer's altitude in m.
+# * @return The topocentric x, y, z coordinates in AU.
+# */
+def getTopocentric(x, y, z, lst, obsLat, obsAlt):
+    geocLat = (obsLat - .1925 * np.sin(2 * obsLat) * DEG_TO_RAD)
+    sinLat = np.sin(geocLat)
+    cosLat = np.cos(geocLat)
+    geocR = 1.0 - np.sin(obsLat) ** 2 / 298.257
+    radiusAU = (geocR * SunMoonCalculator.EARTH_RADIUS + obsAlt * 0.001) / SunMoonCalculator.AU
+
+    x = x - radiusAU * cosLat * np.cos(lst)
+    y = y - radiusAU * cosLat * np.sin(lst)
+    z = z - radiusAU * sinLat
+    return x, y, z
+
+
+#/**
+# * Corrects ecliptic positions for nutation and obtains the equatorial coordinates,
+# * topocentric unless geocentric is set. This is the first half of {@linkplain #doCalc}.
+# * @param pos Ecliptic longitude, latitude, distance and angular radius arrays from getSun or getMoon.
+# * @param state The time dependent parameters returned by getTimeState.
+# * @param obsLat Observer's latitude in radians.
+# * @param obsAlt Observer's altitude in m.
+# * @param geocentric True to return geocentric coordinates.
+# * @return Right ascension (not normalized), declination, distance, and ecliptic
+# * longitude and latitude corrected for nutation.
+# */
+def getEquatorial(pos, state, obsLat, obsAlt, geocentric = False):
+    x, y, z, lon, lat = getGeocentricEquatorial(pos, state)
+
+    #// Obtain topocentric rectangular coordinates
+    if (geocentric == False):
+        x, y, z = getTopocentric(x, y, z, state[4], obsLat, obsAlt)
+
+    # Obtain topocentric equatorial coordinates
+    ra = np.arctan2(y, x)
+    dec = np.arctan2(z, np.hypot(x, y))
+    dist = np.sqrt(x * x + y * y + z * z)
+
+    return ra, dec, dist, lon, lat
+
+
+#/**
+# * Obtains the azimuth and geometric elevation from equatorial coordinates.
+# * @param ra Right ascension in radians.
+# * @param dec Declination in radians.
+# * @param lst Local apparent sidereal time in radians.
+# * @param obsLat Observer's latitude in radians, scalar or array.
+# * @return Azimuth (0 = north) and geometric elevation in radians.
+# */
+def getHorizontal(ra, dec, lst, obsLat):
+    # Hour angle
+    angh = lst - ra
+
+    # Obtain azimuth and geometric alt
+    sinLat = np.sin(obsLat)
+    cosLat = np.cos(obsLat)
+    sinDec = np.sin(dec)
+    cosDec = np.cos(dec)
+    h = sinLat * sinDec + cosLat * cosDec * np.cos(angh)
+    alt = np.arcsin(h)
+    azy = np.sin(angh)
+    azx = np.cos(angh) * sinLat - sinDec * cosLat / cosDec
+    azi = math.pi + np.arctan2(azy, azx) #// 0 = north
+
+    return azi, alt
+
+
+#/**
+# * Compute the position of the body for a set of instants, see {@linkplain SunMoonCalculator#doCalc}.
+# * @param pos Ecliptic longitude, latitude, distance and angular radius arrays from getSun or getMoon.
+# * @param state The time dependent parameters returned by getTimeState.
+# * @param obsLat Observer's latitude in radians.
+# * @param obsAlt Observer's altitude in m.
+# * @param geocentric True to return geocentric position. Set this to false generally.
+# * @param out Series to write the output to, allocated when not provided.
+# * @param refractionModel The {@linkplain Refraction} model or table, the process wide one by default.
+# * @param accuracy The {@linkplain SunMoonCalculator#ACCURACY} tier, refraction is only applied when it allows.
+# * @return The ephemeris series with the output position
+# */
+def doCalc(pos, state, obsLat, obsAlt, geocentric = False, out = None, refractionModel = None,
+           accuracy = SunMoonCalculator.ACCURACY.FULL):
+    ra, dec, dist, lon, lat = getEquatorial(pos, state, obsLat, obsAlt, geocentric)
+    azi, alt = getHorizontal(ra, dec, state[4], obsLat)
+
+    if (geocentric == False and accuracy.refraction):
+        # Get apparent elevation
+        alt = refraction(alt, refractionModel)
+
+    return EphemerisSeries(azi, alt, normalizeRadians(ra), dec, dist, lon, lat, pos[3], None if out is None else out.columns)
+
+
+#/**
+# * Corrects geometric elevations for refraction, see {@linkplain SunMoonCalculator#refraction}.
+# * @param alt Geometric elevations in radians.
+# * @param model The {@linkplain Refraction} model or table, the process wide one by default.
+# * @return Apparent elevations.
+# */
+def refraction(alt, model = None):
+    return (model or Refraction.getDefault()).getApparentElevation(alt)
+
+
+#/**
+# * Compute geometric elevations from apparent elevations, see
+# * {@linkplain SunMoonCalculator#computeGeometricElevation}.
+# * @param alt Apparent elevations in radians.
+# * @param model The {@linkplain Refraction} model or table, the process wide one by default.
+# * @return Geometric elevations in radians.
+# */
+def computeGeometricElevation(alt, model = None):
+    return (model or Refraction.getDefault()).computeGeometricElevation(alt)
+
+
+#/**
+# * Sets the illumination phase field for the provided body series.
+# * @param body The ephemeris series for this body.
+# * @param sun The ephemeris series for the Sun at the same instants.
+# */
+def getIlluminationPhase(body, sun):
+    dlon = body.rightAscension - sun.rightAscension
+    cosElong = (np.sin(sun.declination) * np.sin(body.declination) + np.cos(sun.declination) * np.cos(body.declination) * np.cos(dlon))
+
+    RE = sun.distance
+    RO = body.distance
+    #Use elongation cosine as trick to solve the rectangle and get RP (distance body - sun)
+    RP = np.sqrt(-(cosElong * 2.0 * RE * RO - RE * RE - RO * RO))
+
+    DPH = ((RP * RP + RO * RO - RE * RE) / (2.0 * RP * RO))
+    body.illuminationPhase = 100 * (1.0 + DPH) * 0.5
+
+
+#/**
+# * Class to hold the observer independent part of the Sun and Moon positions for a
+# * set of instants: the time dependent parameters and the geocentric equatorial
+# * rectangular coordinates of both bodies.
+# */
+class GeocentricState(object):
+
+    #/**
+    # * Geocentric position of one body.
+    # */
+    class Body(object):
+
+        def __init__(self, x, y, z, eclipticLongitude, eclipticLatitude, angularRadius):
+            self.x = x
+            self.y = y
+            self.z = z
+            self.eclipticLongitude = eclipticLongitude
+            self.eclipticLatitude = eclipticLatitude
+            self.angularRadius = angularRadius
+
+    def __init__(self, jd_UT, state, sun, moon, moonAge, accuracy = SunMoonCalculator.ACCURACY.FULL):
+        self.jd_UT = jd_UT
+        # getTimeState output for longitude 0, the last element is the Greenwich apparent sidereal time
+        self.state = state
+        self.sun = sun
+        self.moon = moon
+        self.moonAge = moonAge
+        # The accuracy tier, refraction is only applied by calcForObservers when it allows
+        self.accuracy = accuracy
+
+
+#/**
+# * Computes the observer independent part of the Sun and Moon positions, to be
+# * reduced for any number of observers with {@linkplain #calcForObservers}.
+# * @param jd_UT The Julian days in UT.
+# * @param TTminusUT TT minus UT in seconds, scalar or array. Computed for each
+# * instant when not provided.
+# * @param accuracy The {@linkplain SunMoonCalculator#ACCURACY} tier.
+# * @return The geocentric state.
+# */
+def calcGeocentric(jd_UT, TTminusUT = None, accuracy = SunMoonCalculator.ACCURACY.FULL):
+    if (TTminusUT is None):
+        TTminusUT = getTTminusUT(jd_UT)
+    state = getTimeState(jd_UT, TTminusUT, 0.0, nutation = accuracy.nutation)
+
+    sunPos = getSun(state[0], accuracy)
+    sun = GeocentricState.Body(*getGeocentricEquatorial(sunPos, state), sunPos[3])
+    moonPos, moonAge = getMoon(state[0], sun.eclipticLongitude, accuracy)
+    moon = GeocentricState.Body(*getGeocentricEquatorial(moonPos, state), moonPos[3])
+
+    return GeocentricState(np.asarray(jd_UT, dtype=float), state, sun, moon, moonAge, accuracy)
+
+
+#/**
+# * Reduces a geocentric state for a set of observers. The observer arrays are
+# * broadcast against the instants of the state: with a single instant, pass one
+# * array element per observer; with a time series, pass obsLon[:, None] and so on
+# * to get one row per observer.
+# * @param geocentric The state returned by {@linkplain #calcGeocentric}.
+# * @param obsLon Observers' longitudes in radians.
+# * @param obsLat Observers' latitudes in radians.
+# * @param obsAlt Observers' altitudes in m.
+# * @param out The Sun and Moon series to write the output to, allocated when not provided.
+# * @param refractionModel The {@linkplain Refraction} model or table, the process wide one by
+# * default. A model with arrays of ambient conditions is broadcast like the observers.
+# * @return The Sun and Moon ephemeris series.
+# */
+def calcForObservers(geocentric, obsLon, obsLat, obsAlt = 0.0, out = (None, None), refractionModel = None):
+    lst = normalizeRadians(geocentric.state[4] + np.asarray(obsLon, dtype=float))
+    obsLat = np.asarray(obsLat, dtype=float)
+
+    series = []
+    for body, bodyOut in zip((geocentric.sun, geocentric.moon), out):
+        x, y, z = getTopocentric(body.x, body.y, body.z, lst, obsLat, obsAlt)
+        ra = np.arctan2(y, x)
+        dec = np.arctan2(z, np.hypot(x, y))
+        dist = np.sqrt(x * x + y * y + z * z)
+        azi, alt = getHorizontal(ra, dec, lst, obsLat)
+        if (geocentric.accuracy.refraction):
+            alt = refraction(alt, refractionModel)
+
+        # Observer independent fields are broadcast to the shape of the output
+        series.append(EphemerisSeries(azi, alt, normalizeRadians(ra), dec, dist,
+            body.eclipticLongitude, body.eclipticLatitude, body.angularRadius,
+            None if bodyOut is None else bodyOut.columns))
+    sun, moon = series
+
+    #// Compute illumination phase percentage for the Moon
+    getIlluminationPhase(moon, sun)
+
+    return sun, moon
+
+
+#/**
+# * Calculates the Sun and Moon positions for a set of instants in one pass.
+# * Matches the position fields of {@linkplain SunMoonCalculator#calcSunAndMoon}.
+# * @param jd_UT The Julian days in UT.
+# * @param obsLon Observer's longitude in radians.
+# * @param obsLat Observer's latitude in radians.
+# * @param obsAlt Observer's altitude in m.
+# * @param TTminusUT TT minus UT in seconds, scalar or array. Computed for each
+# * instant when not provided.
+# * @param accuracy The {@linkplain SunMoonCalculator#ACCURACY} tier.
+# * @return The Sun and Moon ephemeris series and the Moon's age in days.
+# */
+def calcSunAndMoon(jd_UT, obsLon, obsLat, obsAlt, TTminusUT = None, accuracy = SunMoonCalculator.ACCURACY.FULL):
+    geocentric = calcGeocentric(jd_UT, TTminusUT, accuracy)
+    sun, moon = calcForObservers(geocentric, obsLon, obsLat, obsAlt)
+    return sun, moon, geocentric.moonAge
+
+
+# The planets with a position, see {@linkplain SunMoonCalculator#getPlanetPosition}.
+PLANETS = tuple(b for b in SunMoonCalculator.BODY if b.value[0] >= 0 and b != SunMoonCalculator.BODY.EMB)
+
+
+#/**
+# * Calculates the positions of a set of planets for a set of instants, evaluating
+# * the Sun (and so the Earth) only once per instant for all of them.
+# * @param jd_UT The Julian days in UT.
+# * @param obsLon Observer's longitude in radians.
+# * @param obsLat Observer's latitude in radians.
+# * @param obsAlt Observer's altitude in m.
+# * @param bodies The planets, all of them by default.
+# * @param TTminusUT TT minus UT in seconds, scalar or array. Computed for each
+# * instant when not provided.
+# * @param accuracy The {@linkplain SunMoonCalculator#ACCURACY} tier of the Sun series, the
+# * nutation and the refraction. The planetary series are always complete.
+# * @return A dictionary from each planet to its ephemeris series, with the
+# * illumination phase.
+# */
+def calcPlanets(jd_UT, obsLon, obsLat, obsAlt, bodies = PLANETS, TTminusUT = None, accuracy = SunMoonCalculator.ACCURACY.FULL):
+    if (TTminusUT is None):
+        TTminusUT = getTTminusUT(jd_UT)
+    state = getTimeState(jd_UT, TTminusUT, obsLon, nutation = accuracy.nutation)
+
+    sunPosition = getSun(state[0], accuracy)
+    sun = doCalc(sunPosition, state, obsLat, obsAlt, accuracy = accuracy)
+    out = {}
+    for body in bodies:
+        out[body] = doCalc(getPlanet(body, state[0], sunPosition), state, obsLat, obsAlt, accuracy = accuracy)
+        getIlluminationPhase(out[body], sun)
+    return out
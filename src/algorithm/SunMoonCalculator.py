@@ -44,11 +44,19 @@
 #################################################################################################################################
 
 from datetime import datetime
+from collections import OrderedDict, namedtuple
+from functools import cached_property
 import sys
 import enum
 import math
+import threading
 import numpy as np
 
+import Calendar
+import DeltaT
+import Instrumentation
+import Refraction
+
 
 # Radians to degrees.
 RAD_TO_DEG = 180.0 / math.pi
@@ -129,6 +137,13 @@ class SunMoonCalculator:
         FULL_MOON = ("Full Moon:       ", 0.5)
         DESCENT_QUARTER = ("Descent quarter: ", 0.75)
 
+    # The set of equinoxes and solstices, with the apparent Sun longitude as fraction of a revolution.
+    class SEASON(enum.Enum):
+        MARCH_EQUINOX = ("March equinox:    ", 0)
+        JUNE_SOLSTICE = ("June solstice:    ", 0.25)
+        SEPTEMBER_EQUINOX = ("September equinox:", 0.5)
+        DECEMBER_SOLSTICE = ("December solstice:", 0.75)
+
     # The set of bodies to compute ephemerides.
     class BODY(enum.Enum):
 
@@ -147,19 +162,54 @@ class SunMoonCalculator:
         def eqRadius(self):
             return self.value[1]
 
-    # Input values and nutation/obliquity parameters only calculated once.
-    jd_UT = 0
-    t = 0
-    obsLon = 0
-    obsLat = 0
-    obsAlt = 0
-    TTminusUT = 0
-    twilight = TWILIGHT.HORIZON_34arcmin
-    nutLon = 0
-    nutObl = 0
-    meanObliquity = 0
+    #/**
+    # * Accuracy tiers for the Sun and Moon positions. A tier keeps the terms of the series
+    # * with an amplitude at or above its thresholds, and may skip the nutation and the
+    # * refraction. The values are the threshold for the lunar longitude and latitude terms
+    # * in degrees, for the lunar parallax terms in degrees, for the solar terms in 1E-7 rad,
+    # * and whether the nutation and the refraction are applied.
+    # * Maximum errors against FULL over 1800-2200, hourly geocentric samples (position angle
+    # * of the bright limb for the Moon more than 10 deg from the new or full phase):
+    # * STANDARD (89 of 125 lunar and 26 of 50 solar terms): Moon longitude 0.0055 deg,
+    # * latitude 0.0058 deg, angular radius 0.025%, Sun longitude 0.0016 deg, phase angle
+    # * 0.006 deg, position angle 0.03 deg.
+    # * RENDER (40 lunar and 12 solar terms, no nutation): Moon longitude 0.038 deg, latitude
+    # * 0.035 deg, angular radius 0.2%, Sun longitude 0.011 deg, phase angle 0.040 deg,
+    # * position angle 0.2 deg. Elevations are geometric, up to 0.6 deg below the apparent
+    # * ones close to the horizon.
+    # */
+    class ACCURACY(enum.Enum):
+        FULL = (0.0, 0.0, 0.0, True, True)
+        STANDARD = (0.001, 0.00005, 50.0, True, True)
+        RENDER = (0.005, 0.0005, 300.0, False, False)
 
-    lst = 0
+        @property
+        def moonThreshold(self):
+            return self.value[0]
+
+        @property
+        def parallaxThreshold(self):
+            return self.value[1]
+
+        @property
+        def sunThreshold(self):
+            return self.value[2]
+
+        @property
+        def nutation(self):
+            return self.value[3]
+
+        @property
+        def refraction(self):
+            return self.value[4]
+
+    #/**
+    # * Immutable time and observer state: the input values and the nutation/obliquity
+    # * parameters only calculated once for an instant. The calculation methods taking a
+    # * state do not modify the calculator, so that they can be called from several threads.
+    # */
+    State = namedtuple('State', ('jd_UT', 't', 'obsLon', 'obsLat', 'obsAlt', 'TTminusUT', 'twilight',
+                                 'nutLon', 'nutObl', 'meanObliquity', 'lst', 'accuracy'), defaults = (ACCURACY.FULL,))
 
     #/**
 	# * Class to hold the results of ephemerides.
@@ -167,22 +217,11 @@ class SunMoonCalculator:
 	# */
     class Ephemeris(object):
 
-        azimuth = 0
-        elevation = 0
-        rise = 0
-        set = 0
-        transit = 0
-        transitElevation = 0
-        rightAscension = 0
-        declination = 0
-        distance = 0
-        illuminationPhase=100
-        eclipticLongitude = 0
-        eclipticLatitude = 0
-        angR = 0
+        __slots__ = ('azimuth', 'elevation', 'rise', 'set', 'transit', 'transitElevation', 'rightAscension',
+                     'declination', 'distance', 'illuminationPhase', 'eclipticLongitude', 'eclipticLatitude', 'angularRadius')
 
         def __init__(self, azimuth, elevation, rise, set, transit, transitElevation, rightAscension, declination, distance,
-			eclipticLongitude, eclipticLatitude, angR):
+			eclipticLongitude, eclipticLatitude, angularRadius, illuminationPhase = 100):
             self.azimuth = azimuth
             self.elevation = elevation
             self.rise = rise
@@ -194,15 +233,210 @@ class SunMoonCalculator:
             self.declination = declination
             self.eclipticLongitude = eclipticLongitude
             self.eclipticLatitude = eclipticLatitude
-            self.angularRadius = angR
+            self.angularRadius = angularRadius
+            self.illuminationPhase = illuminationPhase
+
+        # Former name of the angular radius, read only.
+        @property
+        def angR(self):
+            return self.angularRadius
+
+    #/**
+    # * Ephemeris of a {@linkplain #Result}. The rise, set and transit times and the transit
+    # * elevation of the body are computed together when one of them is first read, unless
+    # * it was assigned before. Copies and pickles are plain, fully computed Ephemeris objects.
+    # */
+    class LazyEphemeris(Ephemeris):
+
+        __slots__ = ('result', 'isSun')
+
+        # Fields taken from the rise/set solver.
+        EVENT_FIELDS = ('rise', 'set', 'transit', 'transitElevation')
 
-    # Ephemeris for the Sun and Moon bodies.
-    sun = Ephemeris
-    moon = Ephemeris
+        def __init__(self, ephemeris, result, isSun):
+            for name in SunMoonCalculator.Ephemeris.__slots__:
+                if (name not in self.EVENT_FIELDS):
+                    setattr(self, name, getattr(ephemeris, name))
+            self.result = result
+            self.isSun = isSun
 
-    # Moon's age in days as an independent variable.
-    moonAge=None
+        @property
+        def events(self):
+            return self.result.sunEvents if self.isSun else self.result.moonEvents
 
+        #/**
+        # * Property for an event field: the value assigned to the slot of the Ephemeris
+        # * if any, else the one from the solver.
+        # */
+        def eventProperty(name):
+            def get(self):
+                try:
+                    return SunMoonCalculator.Ephemeris.__dict__[name].__get__(self)
+                except AttributeError:
+                    return getattr(self.events, name)
+            def set(self, value):
+                SunMoonCalculator.Ephemeris.__dict__[name].__set__(self, value)
+            return property(get, set)
+
+        rise = eventProperty('rise')
+        set = eventProperty('set')
+        transit = eventProperty('transit')
+        transitElevation = eventProperty('transitElevation')
+        del eventProperty
+
+        #/**
+        # * Returns a plain Ephemeris with all the fields computed.
+        # * @return The ephemeris.
+        # */
+        def materialize(self):
+            out = SunMoonCalculator.Ephemeris.__new__(SunMoonCalculator.Ephemeris)
+            for name in SunMoonCalculator.Ephemeris.__slots__:
+                setattr(out, name, getattr(self, name))
+            return out
+
+        def __copy__(self):
+            return self.materialize()
+
+        def __reduce__(self):
+            return (SunMoonCalculator.Ephemeris, (self.azimuth, self.elevation, self.rise, self.set, self.transit,
+                self.transitElevation, self.rightAscension, self.declination, self.distance, self.eclipticLongitude,
+                self.eclipticLatitude, self.angularRadius, self.illuminationPhase))
+
+    #/**
+    # * Results of {@linkplain #calcSunAndMoon} for a state, each computed on first access
+    # * and then cached: the positions, Moon's age and illumination all together, and the
+    # * rise, set and transit times of each body. Reading only positions skips the rise/set
+    # * solver, which is most of the cost of calcSunAndMoonAt.
+    # */
+    class Result(object):
+
+        def __init__(self, state):
+            self.state = state
+
+        # Sun and Moon ephemeris objects and Moon's age, see {@linkplain SunMoonCalculator#calcPositionsAt}.
+        @cached_property
+        def positions(self):
+            sun, moon, moonAge = SunMoonCalculator.calcPositionsAt(self.state)
+            return SunMoonCalculator.LazyEphemeris(sun, self, True), SunMoonCalculator.LazyEphemeris(moon, self, False), moonAge
+
+        sun = property(lambda self: self.positions[0])
+        moon = property(lambda self: self.positions[1])
+        moonAge = property(lambda self: self.positions[2])
+
+        # Rise/set solver, which shares the time dependent parameters for both bodies.
+        @cached_property
+        def solver(self):
+            from RiseSetSolver import RiseSetSolver
+            state = self.state
+            return RiseSetSolver(state.obsLon, state.obsLat, state.obsAlt, state.TTminusUT, state.twilight, state.accuracy)
+
+        @cached_property
+        def sunEvents(self):
+            with Instrumentation.stage('calcSunAndMoon.riseSet'):
+                return self.solver.getEvents(self.state.jd_UT, True)
+
+        @cached_property
+        def moonEvents(self):
+            with Instrumentation.stage('calcSunAndMoon.riseSet'):
+                return self.solver.getEvents(self.state.jd_UT, False)
+
+    #/**
+    # * Bounded cache of the time dependent parameters computed by {@linkplain #setUTDate},
+    # * evicting the least recently used instants. Optionally, nutation and obliquity are
+    # * interpolated linearly between nodes spaced to keep the error below a tolerance, so
+    # * that the nodes are shared by the nearby instants of a dense time grid.
+    # */
+    class TimeStateCache(object):
+
+        # Bound of the second derivative of the nutation in longitude and obliquity, in radians/day^2.
+        NUTATION_CURVATURE = 7.7e-9
+
+        #/**
+        # * Constructor.
+        # * @param maxSize Maximum number of instants (and interpolation nodes) kept.
+        # * @param tolerance Maximum error in radians of the interpolated nutation, 0 to
+        # * compute it exactly at each instant.
+        # */
+        def __init__(self, maxSize = 1024, tolerance = 0.0):
+            self.maxSize = maxSize
+            self.tolerance = tolerance
+            self.hits = 0
+            self.misses = 0
+            self.entries = OrderedDict()
+            self.nodes = OrderedDict()
+            self.lock = threading.Lock()
+
+        #/**
+        # * Returns the time dependent parameters for an instant.
+        # * @param jd The Julian day in UT.
+        # * @param TTminusUT TT minus UT in seconds.
+        # * @return Julian centuries from J2000 in TT, nutation in longitude and obliquity,
+        # * mean obliquity and Greenwich apparent sidereal time (not normalized).
+        # */
+        def get(self, jd, TTminusUT):
+            key = (jd, TTminusUT)
+            with self.lock:
+                state = self.entries.get(key)
+                if (state is not None):
+                    self.hits += 1
+                    self.entries.move_to_end(key)
+                    return state
+                self.misses += 1
+
+            t = (jd + TTminusUT / SunMoonCalculator.SECONDS_PER_DAY - SunMoonCalculator.J2000) / SunMoonCalculator.JULIAN_DAYS_PER_CENTURY
+            if (self.tolerance > 0):
+                nutLon, nutObl, meanObliquity = self.interpolate(t)
+            else:
+                nutLon, nutObl = SunMoonCalculator.getNutation(t)
+                meanObliquity = SunMoonCalculator.getMeanObliquity(t)
+            gast = SunMoonCalculator.getApparentSiderealTime(jd, nutLon, meanObliquity + nutObl)
+            state = (t, nutLon, nutObl, meanObliquity, gast)
+
+            with self.lock:
+                self.store(self.entries, key, state)
+            return state
+
+        #/**
+        # * Interpolates nutation and mean obliquity between the two nodes around an instant.
+        # * @param t Julian centuries from J2000 in TT.
+        # * @return Nutation in longitude and obliquity, and mean obliquity.
+        # */
+        def interpolate(self, t):
+            # Node spacing for which the error of the linear interpolation is below the tolerance
+            step = math.sqrt(8.0 * self.tolerance / self.NUTATION_CURVATURE) / SunMoonCalculator.JULIAN_DAYS_PER_CENTURY
+            n = math.floor(t / step)
+            f = t / step - n
+
+            values = []
+            for node in (n, n + 1):
+                key = (node, step)
+                with self.lock:
+                    value = self.nodes.get(key)
+                    if (value is not None):
+                        self.nodes.move_to_end(key)
+                if (value is None):
+                    value = SunMoonCalculator.getNutation(node * step) + (SunMoonCalculator.getMeanObliquity(node * step), )
+                    with self.lock:
+                        self.store(self.nodes, key, value)
+                values.append(value)
+
+            return tuple(a + (b - a) * f for a, b in zip(values[0], values[1]))
+
+        def store(self, entries, key, value):
+            entries[key] = value
+            if (len(entries) > self.maxSize):
+                entries.popitem(last = False)
+
+        # Removes all entries and resets the counters.
+        def clear(self):
+            with self.lock:
+                self.entries.clear()
+                self.nodes.clear()
+                self.hits = 0
+                self.misses = 0
+
+    # Time dependent parameters shared by all instances, replace it to change the size or tolerance.
+    timeStateCache = TimeStateCache()
 
     def __init__(self, obsLon, obsLat, obsAlt, year = None, month = None, day = None, hour = 0, minute = 0, second = 0, date: datetime = None):
         if date != None:
@@ -223,20 +457,22 @@ class SunMoonCalculator:
         self.obsLon = obsLon
         self.obsLat = obsLat
         self.obsAlt = obsAlt
+        self.twilight = self.TWILIGHT.HORIZON_34arcmin
+        self.accuracy = self.ACCURACY.FULL
+        self.TTminusUT = 0
+
+        # Ephemeris for the Sun and Moon bodies, and Moon's age in days, set by calcSunAndMoon
+        # from the lazy result.
+        self.result = None
+        self.sun = None
+        self.moon = None
+        self.moonAge = None
 
         jd = self.toJulianDay(self.year,self.month,self.day, self.hour, self.minute,self.second)
-        TTminusUT = 0.0
-        if (self.year > -600 and self.year < 2200):
-            x = self.year + (self.month - 1 + self.day / 30.0) / 12.0
-            x2 = x * x
-            x3 = x2 * x
-            x4 = x3 * x
-            if (self.year < 1600):
-                self.TTminusUT = 10535.328003 - 9.9952386275 * x + 0.00306730763 * x2 - 7.7634069836E-6 * x3 + 3.1331045394E-9 * x4 + 8.2255308544E-12 * x2 * x3 - 7.4861647156E-15 * x4 * x2 + 1.936246155E-18 * x4 * x3 - 8.4892249378E-23 * x4 * x4
-            else:
-                self.TTminusUT = -1027175.3477559977 + 2523.256625418965 * x - 1.885686849058459 * x2 + 5.869246227888417E-5 * x3 + 3.3379295816475025E-7 * x4 + \
-                    1.7758961671447929E-10 * x2 * x3 - 2.7889902806153024E-13 * x2 * x4 + 1.0224295822336825E-16 * x3 * x4 - 1.2528102370680435E-20 * x4 * x4
 
+        # TT minus UT is taken from the process wide provider at each setUTDate. Set
+        # deltaT to None and TTminusUT to a value in seconds to use a fixed value.
+        self.deltaT = DeltaT.getDefault()
         self.setUTDate(jd)
 
     # /**
@@ -245,80 +481,174 @@ class SunMoonCalculator:
     # */
     def setTwilight(self,t):
         self.twilight = t
+        self.state = self.state._replace(twilight = t)
+
+    # /**
+    # Sets the accuracy tier of the positions. Default is the full series.
+    # @param accuracy The ACCURACY.
+    # */
+    def setAccuracy(self, accuracy):
+        self.accuracy = accuracy
+        self.state = self.getState(self.jd_UT, self.obsLon, self.obsLat, self.obsAlt, self.TTminusUT, self.twilight, accuracy)
 
     # **
-	# * Sets the UT date from the provided Julian day and computes the nutation, obliquity, and
-	# * sidereal time. TT minuts UT1 is not updated since it changes very slowly with time.
-	# * Use this only to update the computation time for the same year as the one used when the
-	# * instance was created.
+	# * Sets the UT date from the provided Julian day and computes TT minus UT, the nutation,
+	# * obliquity, and sidereal time. TT minus UT is obtained from {@linkplain #deltaT}, unless
+	# * it is None. The calculator keeps them in a new immutable {@linkplain #state}.
 	# * @param jd The new Julian day in UT.
 	# */
     def setUTDate(self,jd):
-        self.jd_UT = jd
-        self.t = (jd + self.TTminusUT / self.SECONDS_PER_DAY - self.J2000) / self.JULIAN_DAYS_PER_CENTURY
+        if (Instrumentation.enabled):
+            Instrumentation.count('setUTDate')
+        if (self.deltaT is not None):
+            self.TTminusUT = self.deltaT.getTTminusUT(jd)
+        self.state = self.getState(jd, self.obsLon, self.obsLat, self.obsAlt, self.TTminusUT, self.twilight, self.accuracy)
+
+    #/**
+    # * Computes the time and observer state for an instant. The parameters are taken from
+    # * {@linkplain #timeStateCache} when the same instant was already computed.
+    # * @param jd The Julian day in UT.
+    # * @param obsLon Observer's longitude in radians.
+    # * @param obsLat Observer's latitude in radians.
+    # * @param obsAlt Observer's altitude in m.
+    # * @param TTminusUT TT minus UT in seconds.
+    # * @param twilight The Twilight for rise/set times.
+    # * @param accuracy The ACCURACY tier. Nutation is set to 0 when the tier skips it.
+    # * @return The state.
+    # */
+    @classmethod
+    def getState(cls, jd, obsLon, obsLat, obsAlt, TTminusUT, twilight = TWILIGHT.HORIZON_34arcmin, accuracy = ACCURACY.FULL):
+        t, nutLon, nutObl, meanObliquity, gast = cls.timeStateCache.get(jd, TTminusUT)
+        if (not accuracy.nutation):
+            gast -= nutLon * math.cos(meanObliquity + nutObl)
+            nutLon = nutObl = 0.0
+
+        # Obtain local apparent sidereal time
+        lst = cls.normalizeRadians(gast + obsLon)
+        return cls.State(jd, t, obsLon, obsLat, obsAlt, TTminusUT, twilight, nutLon, nutObl, meanObliquity, lst, accuracy)
 
-        # Compute nutation
-        M1 = (124.90 - 1934.134 * self.t + 0.002063 * self.t * self.t) * DEG_TO_RAD
-        M2 = (201.11 + 72001.5377 * self.t + 0.00057 * self.t * self.t) * DEG_TO_RAD
-        self.nutLon = (-0.0047785 * math.sin(M1) - 0.0003667 * math.sin(M2)) * DEG_TO_RAD
-        self.nutObl = (0.002558 * math.cos(M1) - 0.00015339 * math.cos(M2)) * DEG_TO_RAD
+    # Values of the current state, read only. Use setUTDate to change the instant.
+    jd_UT = property(lambda self: self.state.jd_UT)
+    t = property(lambda self: self.state.t)
+    nutLon = property(lambda self: self.state.nutLon)
+    nutObl = property(lambda self: self.state.nutObl)
+    meanObliquity = property(lambda self: self.state.meanObliquity)
+    lst = property(lambda self: self.state.lst)
 
-        # Compute mean obliquity
-        t2 = self.t / 100.0
+    #/**
+    # * Computes the nutation in longitude and obliquity.
+    # * @param t Julian centuries from J2000 in TT.
+    # * @return Nutation in longitude and obliquity in radians.
+    # */
+    @staticmethod
+    def getNutation(t):
+        M1 = (124.90 - 1934.134 * t + 0.002063 * t * t) * DEG_TO_RAD
+        M2 = (201.11 + 72001.5377 * t + 0.00057 * t * t) * DEG_TO_RAD
+        nutLon = (-0.0047785 * math.sin(M1) - 0.0003667 * math.sin(M2)) * DEG_TO_RAD
+        nutObl = (0.002558 * math.cos(M1) - 0.00015339 * math.cos(M2)) * DEG_TO_RAD
+        return nutLon, nutObl
+
+    #/**
+    # * Computes the mean obliquity of the ecliptic.
+    # * @param t Julian centuries from J2000 in TT.
+    # * @return The mean obliquity in radians.
+    # */
+    @staticmethod
+    def getMeanObliquity(t):
+        t2 = t / 100.0
         tmp = t2 * (27.87 + t2 * (5.79 + t2 * 2.45))
         tmp = t2 * (-249.67 + t2 * (-39.05 + t2 * (7.12 + tmp)))
         tmp = t2 * (-1.55 + t2 * (1999.25 + t2 * (-51.38 + tmp)))
         tmp = (t2 * (-4680.93 + tmp)) / 3600.0
-        self.meanObliquity = (23.4392911111111 + tmp) * DEG_TO_RAD
+        return (23.4392911111111 + tmp) * DEG_TO_RAD
 
-        # Obtain local apparent sidereal time
-        jd0 = math.floor(self.jd_UT - 0.5) + 0.5
-        T0 = (jd0 - self.J2000) / self.JULIAN_DAYS_PER_CENTURY
-        secs = (self.jd_UT - jd0) * self.SECONDS_PER_DAY
+    #/**
+    # * Computes the Greenwich apparent sidereal time.
+    # * @param jd The Julian day in UT.
+    # * @param nutLon Nutation in longitude in radians.
+    # * @param obliquity True obliquity in radians.
+    # * @return The sidereal time in radians, not normalized.
+    # */
+    @staticmethod
+    def getApparentSiderealTime(jd, nutLon, obliquity):
+        jd0 = math.floor(jd - 0.5) + 0.5
+        T0 = (jd0 - SunMoonCalculator.J2000) / SunMoonCalculator.JULIAN_DAYS_PER_CENTURY
+        secs = (jd - jd0) * SunMoonCalculator.SECONDS_PER_DAY
         gmst = (((((-6.2e-6 * T0) + 9.3104e-2) * T0) + 8640184.812866) * T0) + 24110.54841
-        msday = 1.0 + (((((-1.86e-5 * T0) + 0.186208) * T0) + 8640184.812866) / (self.SECONDS_PER_DAY * self.JULIAN_DAYS_PER_CENTURY))
+        msday = 1.0 + (((((-1.86e-5 * T0) + 0.186208) * T0) + 8640184.812866) / (SunMoonCalculator.SECONDS_PER_DAY * SunMoonCalculator.JULIAN_DAYS_PER_CENTURY))
         gmst = (gmst + msday * secs) * (15.0 / 3600.0) * DEG_TO_RAD
-        self.lst = self.normalizeRadians(gmst + self.obsLon + self.nutLon * math.cos(self.meanObliquity + self.nutObl))
-
-    # ** Calculates everything for the Sun and the Moon.
-    def calcSunAndMoon(self):
-        jd = self.jd_UT
+        return gmst + nutLon * math.cos(obliquity)
 
-        # First the Sun
-        self.sun = self.doCalc(self.getSun(),False)
+    #/**
+    # * Calculates the Sun and Moon positions at the current instant for a set of
+    # * observers, evaluating the series only once. Rise/set/transit times are not computed.
+    # * @param obsLon Observers' longitudes in radians.
+    # * @param obsLat Observers' latitudes in radians.
+    # * @param obsAlt Observers' altitudes in m.
+    # * @return The Sun and Moon ephemeris series, see {@linkplain SunMoonBatch#calcForObservers}.
+    # */
+    def calcForObservers(self, obsLon, obsLat, obsAlt = 0.0):
+        import SunMoonBatch
+        state = self.state
+        geocentric = SunMoonBatch.calcGeocentric(state.jd_UT, state.TTminusUT, state.accuracy)
+        return SunMoonBatch.calcForObservers(geocentric, obsLon, obsLat, obsAlt)
 
-        niter = 15 # // Number of iterations to get accurate rise/set/transit times
-        self.sun.rise = self.obtainAccurateRiseSetTransit(self.sun.rise, self.EVENT.RISE, niter, True)
-        self.sun.set= self.obtainAccurateRiseSetTransit(self.sun.set, self.EVENT.SET, niter, True)
-        self.sun.transit = self.obtainAccurateRiseSetTransit(self.sun.transit, self.EVENT.TRANSIT, niter, True)
-        if (self.sun.transit == -1):
-            self.sun.transitElevation = 0
-        else:
-            #// Update Sun's maximum elevation
-            self.setUTDate(self.sun.transit)
-            self.sun.transitElevation = self.doCalc(self.getSun(),False).transitElevation
+    #/**
+    # * Calculates everything for the Sun and the Moon. The positions are computed now, and the
+    # * rise, set and transit times of each body the first time one of them is read.
+    # * @return The lazy {@linkplain #Result}, also kept in {@linkplain #result}.
+    # */
+    def calcSunAndMoon(self):
+        with Instrumentation.stage('calcSunAndMoon'):
+            self.result = self.Result(self.state)
+            self.sun, self.moon, self.moonAge = self.result.positions
+        return self.result
 
-        # Now Moon
-        self.setUTDate(jd)
-        self.moon = self.doCalc(self.getMoon(),False)
-        ma = self.moonAge
-        #//niter = 15 #// Number of iterations to get accurate rise/set/transit times
-        self.moon.rise = self.obtainAccurateRiseSetTransit(self.moon.rise, self.EVENT.RISE, niter, False)
-        self.moon.set = self.obtainAccurateRiseSetTransit(self.moon.set, self.EVENT.SET, niter, False)
-        self.moon.transit = self.obtainAccurateRiseSetTransit(self.moon.transit, self.EVENT.TRANSIT, niter, False)
+    #/**
+    # * Calculates everything for the Sun and the Moon without modifying the calculator.
+    # * @param state The time and observer state, see {@linkplain #getState}.
+    # * @return The Sun and Moon ephemeris objects and the Moon's age in days.
+    # */
+    @classmethod
+    def calcSunAndMoonAt(cls, state):
+        with Instrumentation.stage('calcSunAndMoon'):
+            sun, moon, moonAge = cls.calcPositionsAt(state)
+
+            # Rise, set and transit times from the bracketed solver, which shares the
+            # time dependent parameters for both bodies
+            from RiseSetSolver import RiseSetSolver
+            with Instrumentation.stage('calcSunAndMoon.riseSet'):
+                solver = RiseSetSolver(state.obsLon, state.obsLat, state.obsAlt, state.TTminusUT, state.twilight, state.accuracy)
+                for body, isSun in ((sun, True), (moon, False)):
+                    events = solver.getEvents(state.jd_UT, isSun)
+                    body.rise = events.rise
+                    body.set = events.set
+                    body.transit = events.transit
+                    body.transitElevation = events.transitElevation
+
+        return sun, moon, moonAge
 
+    #/**
+    # * Calculates the Sun and Moon positions and the Moon's illumination, without the rise,
+    # * set and transit times: the fields of the ephemeris objects for them hold the rough
+    # * estimates of {@linkplain #calcBody}.
+    # * @param state The time and observer state, see {@linkplain #getState}.
+    # * @return The Sun and Moon ephemeris objects and the Moon's age in days.
+    # */
+    @classmethod
+    def calcPositionsAt(cls, state):
+        with Instrumentation.stage('calcSunAndMoon.positions'):
+            # First the Sun
+            sun = cls.calcBody(state, [float(x) for x in cls.getSunPosition(state.t, state.accuracy)], False)
 
-        if (self.moon.transit == -1):
-            self.moon.transitElevation = 0
-        else:
-            self.setUTDate(self.moon.transit)
-            self.moon.transitElevation = self.doCalc(self.getMoon(),False).transitElevation
+            # Now Moon
+            pos, moonAge = cls.getMoonPosition(state.t, sun.eclipticLongitude, state.accuracy)
+            moon = cls.calcBody(state, [float(x) for x in pos], False)
 
-        self.setUTDate(jd)
-        self.moonAge = ma
+            #// Compute illumination phase percentage for the Moon
+            cls.calcIlluminationPhase(moon, sun)
 
-        #// Compute illumination phase percentage for the Moon
-        self.getIlluminationPhase(self.moon)
+        return sun, moon, float(moonAge)
 
 
     # Sun data from the expansion "Planetary Programs
@@ -376,44 +706,306 @@ class SunMoonCalculator:
     [ 10.0, -9.0, 2.55, 157208.4 ]))
 
 
-    def getSun(self):
-        L = 0.0
-        R = 0.0
-        t2 = self.t * 0.01
-        Lp = 0.0
-        deltat = 0.5
-        t2p = (self.t + deltat / self.JULIAN_DAYS_PER_CENTURY) * 0.01
-
-        for i in range(len(self.sun_elements)):
-            v = self.sun_elements[i][2] + self.sun_elements[i][3] * t2
-            u = self.normalizeRadians(v)
-            L = L + self.sun_elements[i][0] * math.sin(u)
-            R = R + self.sun_elements[i][1] * math.cos(u)
-            vp = self.sun_elements[i][2] + self.sun_elements[i][3] * t2p
-            up = self.normalizeRadians(vp)
-            Lp = Lp + self.sun_elements[i][0] * math.sin(up)
-
-        lon = self.normalizeRadians(4.9353929 + self.normalizeRadians(62833.196168 * t2) + L / 10000000.0) * RAD_TO_DEG
+    # The sun_elements series in matrix form: longitude and distance amplitudes,
+    # phases and frequencies as separate arrays, plus the amplitudes of the
+    # analytic time derivative of the longitude series used for aberration.
+    sun_lon_amplitude = sun_elements[:, 0].copy()
+    sun_dist_amplitude = sun_elements[:, 1].copy()
+    sun_phase = sun_elements[:, 2].copy()
+    sun_frequency = sun_elements[:, 3].copy()
+    sun_lon_rate_amplitude = sun_lon_amplitude * sun_frequency
+
+    # Truncated series of each accuracy tier, built on first use by getSunSeries and getMoonSeries.
+    series_cache = {}
+
+    #/**
+    # * Returns the Sun series arrays for an accuracy tier, keeping the terms with a
+    # * longitude or distance amplitude at or above the threshold of the tier.
+    # * @param accuracy The ACCURACY tier.
+    # * @return Phases, frequencies, longitude, distance and longitude rate amplitudes.
+    # */
+    @classmethod
+    def getSunSeries(cls, accuracy = ACCURACY.FULL):
+        series = cls.series_cache.get(('sun', accuracy))
+        if (series is None):
+            keep = np.maximum(np.abs(cls.sun_lon_amplitude), np.abs(cls.sun_dist_amplitude)) >= accuracy.sunThreshold
+            series = tuple(x[keep].copy() for x in (cls.sun_phase, cls.sun_frequency, cls.sun_lon_amplitude,
+                                                     cls.sun_dist_amplitude, cls.sun_lon_rate_amplitude))
+            cls.series_cache[('sun', accuracy)] = series
+        return series
+
+    #/**
+    # * Evaluates the Sun series for one or many instants. The sine and cosine of
+    # * every term are computed once, and the aberration uses the analytic
+    # * derivative of the longitude instead of a second evaluation of the series.
+    # * @param t Julian centuries from J2000 in TT, scalar or array.
+    # * @param accuracy The ACCURACY tier, see {@linkplain #getSunSeries}.
+    # * @return Apparent ecliptic longitude, latitude, distance and angular radius,
+    # * with the shape of t.
+    # */
+    @classmethod
+    def getSunPosition(cls, t, accuracy = ACCURACY.FULL):
+        if (Instrumentation.enabled):
+            Instrumentation.count('series.sun', np.size(t))
+        phase, frequency, lonAmplitude, distAmplitude, lonRateAmplitude = cls.getSunSeries(accuracy)
+        t2 = np.multiply(t, 0.01)
+        u = phase + frequency * np.expand_dims(t2, -1)
+        sinu = np.sin(u)
+        cosu = np.cos(u)
+        L = sinu @ lonAmplitude
+        R = cosu @ distAmplitude
+        dL = cosu @ lonRateAmplitude
+
+        lon = np.mod(4.9353929 + 62833.196168 * t2 + L / 10000000.0, cls.TWO_PI)
         sdistance = 1.0001026 + R / 10000000.0
 
-        # // Now subtract aberration.
-        dlon = ((Lp - L) / 10000000.0 + 62833.196168 * (t2p - t2)) / deltat
-        aberration = dlon * sdistance * 0.00577551833109
-        lon -= aberration * RAD_TO_DEG
+        # // Now subtract aberration. Longitude rate in radians per day.
+        dlon = (dL / 10000000.0 + 62833.196168) * 0.01 / cls.JULIAN_DAYS_PER_CENTURY
+        aberration = dlon * sdistance * cls.LIGHT_TIME_DAYS_PER_AU
+
+        slongitude = lon - aberration # apparent longitude (error<0.001 deg)
+        slatitude = np.zeros_like(slongitude) # Sun's ecliptic latitude is always negligible
+
+        return [slongitude, slatitude, sdistance, np.arctan(cls.BODY.Sun.eqRadius / (cls.AU * sdistance))]
 
-        slongitude = lon * DEG_TO_RAD # apparent longitude (error<0.001 deg)
-        slatitude = 0 # Sun's ecliptic latitude is always negligible
+    def getSun(self):
+        slongitude, slatitude, sdistance, angR = self.getSunPosition(self.state.t, self.state.accuracy)
 
-        array = [slongitude, slatitude, sdistance, math.atan(self.BODY.Sun.eqRadius / (self.AU * sdistance))]
+        array = [float(slongitude), 0.0, float(sdistance), float(angR)]
 
         return array
 
-    def getMoon(self):
+    # Lunar series following P. Duffet's MOON program. Each row holds the multipliers
+    # of phase, sanomaly, anomaly and node, the power of E and the amplitude.
+    # Longitude terms, amplitudes in degrees: the three main correcting terms of
+    # evection, variation, and equation of year, plus other terms (error<0.01 deg)
+    moon_longitude_terms = np.array((
+        [0, 0, 1, 0, 0, 6.28875],
+        [2, 0, -1, 0, 0, 1.274018],
+        [2, 0, 0, 0, 0, 0.658309],
+        [0, 0, 2, 0, 0, 0.213616],
+        [0, 1, 0, 0, 1, -0.185596],
+        [0, 0, 0, 2, 0, -0.114336],
+        [2, 0, -2, 0, 0, 0.058793],
+        [2, -1, -1, 0, 1, 0.057212],
+        [2, 0, 1, 0, 0, 0.05332],
+        [2, -1, 0, 0, 1, 0.045874],
+        [0, -1, 1, 0, 1, 0.041024],
+        [1, 0, 0, 0, 0, -0.034718],
+        [0, 1, 1, 0, 1, -0.030465],
+        [2, 0, 0, -2, 0, 0.015326],
+        [0, 0, 1, 2, 0, -0.012528],
+        [0, 0, -1, 2, 0, -0.01098],
+        [4, 0, -1, 0, 0, 0.010674],
+        [0, 0, 3, 0, 0, 0.010034],
+        [4, 0, -2, 0, 0, 0.008548],
+        [2, 1, -1, 0, 1, -0.00791],
+        [2, 1, 0, 0, 1, -0.006783],
+        [-1, 0, 1, 0, 0, 0.005162],
+        [1, 1, 0, 0, 1, 0.005],
+        [4, 0, 0, 0, 0, 0.003862],
+        [2, -1, 1, 0, 1, 0.004049],
+        [2, 0, 2, 0, 0, 0.003996],
+        [2, 0, -3, 0, 0, 0.003665],
+        [0, -1, 2, 0, 1, 0.002695],
+        [-2, 0, 1, -2, 0, 0.002602],
+        [2, -1, -2, 0, 1, 0.002396],
+        [1, 0, 1, 0, 0, -0.002349],
+        [2, -2, 0, 0, 2, 0.002249],
+        [0, 1, 2, 0, 1, -0.002125],
+        [0, 2, 0, 0, 2, -0.002079],
+        [2, -2, -1, 0, 2, 0.002059],
+        [2, 0, 1, -2, 0, -0.001773],
+        [2, 0, 0, 2, 0, -0.001595],
+        [4, -1, -1, 0, 1, 0.00122],
+        [0, 0, 2, 2, 0, -0.00111],
+        [-3, 0, 1, 0, 0, 0.000892],
+        [2, 1, 1, 0, 1, -0.000811],
+        [4, -1, -2, 0, 1, 0.000761],
+        [-2, -2, 1, 0, 2, 0.000704],
+        [2, 1, -2, 0, 1, 0.000693],
+        [2, -1, 0, -2, 1, 0.000598],
+        [4, 0, 1, 0, 0, 0.00055],
+        [0, 0, 4, 0, 0, 0.000538],
+        [4, -1, 0, 0, 1, 0.000521],
+        [-1, 0, 2, 0, 0, 0.000486],
+        [0, -2, 1, 0, 2, 0.000717]
+    ))
+
+    # Parallax terms, amplitudes in degrees (cosine series)
+    moon_parallax_terms = np.array((
+        [0, 0, 1, 0, 0, 0.051818],
+        [2, 0, -1, 0, 0, 0.009531],
+        [2, 0, 0, 0, 0, 0.007843],
+        [0, 0, 2, 0, 0, 0.002824],
+        [2, 0, 1, 0, 0, 0.000857],
+        [2, -1, 0, 0, 1, 0.000533],
+        [2, -1, -1, 0, 1, 0.000401],
+        [0, -1, 1, 0, 1, 0.00032],
+        [1, 0, 0, 0, 0, -0.000271],
+        [0, 1, 1, 0, 1, -0.000264],
+        [0, 0, -1, 2, 0, -0.000198],
+        [0, 0, 3, 0, 0, 0.000173],
+        [4, 0, -1, 0, 0, 0.000167],
+        [0, 1, 0, 0, 1, -0.000111],
+        [4, 0, -2, 0, 0, 0.000103],
+        [-2, 0, 2, 0, 0, -8.4e-05],
+        [2, 1, 0, 0, 1, -8.3e-05],
+        [2, 0, 2, 0, 0, 7.9e-05],
+        [4, 0, 0, 0, 0, 7.2e-05],
+        [2, -1, 1, 0, 1, 6.4e-05],
+        [2, 1, -1, 0, 1, -6.3e-05],
+        [1, 1, 0, 0, 1, 4.1e-05],
+        [0, -1, 2, 0, 1, 3.5e-05],
+        [-2, 0, 3, 0, 0, -3.3e-05],
+        [1, 0, 1, 0, 0, -3e-05],
+        [-2, 0, 0, 2, 0, -2.9e-05],
+        [0, 1, 2, 0, 1, -2.9e-05],
+        [2, -2, 0, 0, 2, 2.6e-05],
+        [-2, 0, 1, 2, 0, -2.3e-05],
+        [4, -1, -1, 0, 1, 1.9e-05]
+    ))
+
+    # Ecliptic latitude terms with nodal phase, amplitudes in degrees (error<0.01 deg)
+    moon_latitude_terms = np.array((
+        [0, 0, 0, 1, 0, 5.128189],
+        [0, 0, 1, 1, 0, 0.280606],
+        [0, 0, 1, -1, 0, 0.277693],
+        [2, 0, 0, -1, 0, 0.173238],
+        [2, 0, -1, 1, 0, 0.055413],
+        [2, 0, -1, -1, 0, 0.046272],
+        [2, 0, 0, 1, 0, 0.032573],
+        [0, 0, 2, 1, 0, 0.017198],
+        [2, 0, 1, -1, 0, 0.009267],
+        [0, 0, 2, -1, 0, 0.008823],
+        [2, -1, 0, -1, 1, 0.008247],
+        [2, 0, -2, -1, 0, 0.004323],
+        [2, 0, 1, 1, 0, 0.0042],
+        [-2, -1, 0, 1, 1, 0.003372],
+        [2, -1, -1, 1, 1, 0.002472],
+        [2, -1, 0, 1, 1, 0.002222],
+        [2, -1, -1, -1, 1, 0.002072],
+        [0, -1, 1, 1, 1, 0.001877],
+        [4, 0, -1, -1, 0, 0.001828],
+        [0, 1, 0, 1, 1, -0.001803],
+        [0, 0, 0, 3, 0, -0.00175],
+        [0, -1, 1, -1, 1, 0.00157],
+        [1, 0, 0, 1, 0, -0.001487],
+        [0, 1, 1, 1, 1, -0.001481],
+        [0, -1, -1, 1, 1, 0.001417],
+        [0, -1, 0, 1, 1, 0.00135],
+        [-1, 0, 0, 1, 0, 0.00133],
+        [0, 0, 3, 1, 0, 0.001106],
+        [4, 0, 0, -1, 0, 0.00102],
+        [4, 0, -1, 1, 0, 0.000833],
+        [0, 0, 1, -3, 0, 0.000781],
+        [4, 0, -2, 1, 0, 0.00067],
+        [2, 0, 0, -3, 0, 0.000606],
+        [2, 0, 2, -1, 0, 0.000597],
+        [2, -1, 1, -1, 1, 0.000492],
+        [-2, 0, 2, -1, 0, 0.00045],
+        [0, 0, 3, -1, 0, 0.000439],
+        [2, 0, 2, 1, 0, 0.000423],
+        [2, 0, -3, -1, 0, 0.000422],
+        [2, 1, -1, 1, 1, -0.000367],
+        [2, 1, 0, 1, 1, -0.000353],
+        [4, 0, 0, 1, 0, 0.000331],
+        [2, -1, 1, 1, 1, 0.000317],
+        [2, -2, 0, -1, 2, 0.000306],
+        [0, 0, 1, 3, 0, -0.000283]
+    ))
+
+    # Highest multiple of a fundamental argument in the tables above.
+    moon_max_harmonic = 4
+
+    # Precompiled form of the tables. For each term, moon_harmonic_index holds the
+    # position of every fundamental's multiple in the flattened harmonics table,
+    # and moon_series_matrix the amplitude in the column (E power * 3 + series).
+    # Parallax amplitudes are multiplied by 1j so the imaginary part yields a cosine.
+    _terms = np.concatenate((moon_longitude_terms, moon_parallax_terms, moon_latitude_terms))
+    _series = np.repeat(np.arange(3), (len(moon_longitude_terms), len(moon_parallax_terms), len(moon_latitude_terms)))
+    moon_harmonic_index = (np.arange(4) * (2 * moon_max_harmonic + 1) + moon_max_harmonic + _terms[:, :4].astype(int)).T.copy()
+    moon_series_matrix = np.zeros((len(_terms), 9), dtype=complex)
+    moon_series_matrix[np.arange(len(_terms)), 3 * _terms[:, 4].astype(int) + _series] = _terms[:, 5] * np.where(_series == 1, 1j, 1)
+    del _terms, _series
+
+    #/**
+    # * Returns the precompiled lunar series for an accuracy tier, keeping the terms with
+    # * an amplitude at or above the threshold of the tier for their series.
+    # * @param accuracy The ACCURACY tier.
+    # * @return The harmonic index and series matrix, see {@linkplain #moon_series_matrix}.
+    # */
+    @classmethod
+    def getMoonSeries(cls, accuracy = ACCURACY.FULL):
+        series = cls.series_cache.get(('moon', accuracy))
+        if (series is None):
+            amplitude = np.abs(cls.moon_series_matrix)
+            isParallax = amplitude.argmax(axis=1) % 3 == 1
+            keep = amplitude.max(axis=1) >= np.where(isParallax, accuracy.parallaxThreshold, accuracy.moonThreshold)
+            series = (cls.moon_harmonic_index[:, keep].copy(), cls.moon_series_matrix[keep])
+            cls.series_cache[('moon', accuracy)] = series
+        return series
+
+    #/**
+    # * Evaluates the lunar longitude, parallax and latitude series. The sine and cosine
+    # * of each fundamental argument are computed once, their multiples are obtained by
+    # * angle addition, and every term is the product of those harmonics.
+    # * @param phase, sanomaly, anomaly, node Fundamental arguments in radians, scalar or array.
+    # * @param E Eccentricity factor of the Earth's orbit.
+    # * @param accuracy The ACCURACY tier, see {@linkplain #getMoonSeries}.
+    # * @return Longitude and latitude corrections and parallax in degrees.
+    # */
+    @classmethod
+    def evaluateMoonSeries(cls, phase, sanomaly, anomaly, node, E, accuracy = ACCURACY.FULL):
+        index, matrix = cls.getMoonSeries(accuracy)
+        H = cls.moon_max_harmonic
+        if (np.ndim(phase) == 0):
+            harmonics = []
+            for x in (phase, sanomaly, anomaly, node):
+                z = complex(math.cos(x), math.sin(x))
+                z2 = z * z
+                z3 = z2 * z
+                z4 = z3 * z
+                harmonics += (z4.conjugate(), z3.conjugate(), z2.conjugate(), z.conjugate(), 1.0, z, z2, z3, z4)
+            Z = np.array(harmonics)
+            v = (Z[index].prod(axis=0) @ matrix).imag.tolist()
+            return (v[0] + E * (v[3] + E * v[6]), v[1] + E * (v[4] + E * v[7]), v[2] + E * (v[5] + E * v[8]))
+
+        # Harmonics table with the instants along the last axis: (fundamental, multiple, instant)
+        x = np.stack((phase, sanomaly, anomaly, node))
+        z = np.cos(x) + 1j * np.sin(x)
+        powers = np.cumprod(np.repeat(z[:, None], H, axis=1), axis=1)
+        Z = np.concatenate((np.conj(powers[:, ::-1]), np.ones((4, 1) + z.shape[1:]), powers), axis=1)
+        Z = Z.reshape((-1,) + z.shape[1:])
+
+        terms = Z[index[0]] * Z[index[1]] * Z[index[2]] * Z[index[3]]
+        v = np.tensordot(matrix, terms, axes=(0, 0)).imag
+        sums = v[0:3] + E * (v[3:6] + E * v[6:9])
+
+        return sums[0], sums[1], sums[2]
+
+    #/**
+    # * Moon position for one or many instants.
+    # * @param t Julian centuries from J2000 in TT, scalar or array.
+    # * @param sunLongitude Apparent Sun longitude (including nutation) to compute the
+    # * Moon's age, or None to estimate it from the mean phase.
+    # * @param accuracy The ACCURACY tier, see {@linkplain #getMoonSeries}.
+    # * @return Ecliptic longitude, latitude, distance and angular radius, and the Moon's age in days.
+    # */
+    @classmethod
+    def getMoonPosition(cls, t, sunLongitude = None, accuracy = ACCURACY.FULL):
+        if (Instrumentation.enabled):
+            Instrumentation.count('series.moon', np.size(t))
         # Implementation following P. Duffet's MOON program
-        self.td = self.t + 1
-        td2 = self.t * self.t
+        if (np.ndim(t) == 0):
+            t = float(t)
+            sin, cos = math.sin, math.cos
+        else:
+            sin, cos = np.sin, np.cos
+        td = t + 1
+        td2 = t * t
 
-        qd = self.td * self.JULIAN_DAYS_PER_CENTURY * 360.0
+        qd = td * cls.JULIAN_DAYS_PER_CENTURY * 360.0
 
         M1 = qd / 2.732158213E1
         M2 = qd / 3.652596407E2
@@ -422,116 +1014,196 @@ class SunMoonCalculator:
         M5 = qd / 2.721222039E1
         M6 = qd / 6.798363307E3
 
-        l = self.normalizeRadians((2.70434164E2 + M1 - (1.133E-3 - 1.9E-6 * self.td) * td2) * DEG_TO_RAD)
-        sanomaly = self.normalizeRadians((3.58475833E2 + M2 - (1.5E-4 + 3.3E-6 * self.td) * td2) * DEG_TO_RAD)
-        anomaly = self.normalizeRadians((2.96104608E2 + M3 + (9.192E-3 + 1.44E-5 * self.td) * td2) * DEG_TO_RAD)
-        phase = self.normalizeRadians((3.50737486E2 + M4 - (1.436E-3 - 1.9E-6 * self.td) * td2) * DEG_TO_RAD)
-        node = self.normalizeRadians((11.250889 + M5 - (3.211E-3 + 3E-7 * self.td) * td2) * DEG_TO_RAD)
-        NA = self.normalizeRadians((2.59183275E2 - M6 + (2.078E-3 + 2.2E-6 * self.td) * td2) * DEG_TO_RAD)
-        A = DEG_TO_RAD * (51.2 + 20.2 * self.td)
-        S1 = math.sin(A)
-        S2 = math.sin(NA)
-        B = 346.56 + (132.87 - 9.1731E-3 * self.td) * self.td
-        S3 = 3.964E-3 * math.sin(DEG_TO_RAD * B)
-        C = NA + DEG_TO_RAD * (275.05 - 2.3 * self.td)
-        S4 = math.sin(C)
+        l = ((2.70434164E2 + M1 - (1.133E-3 - 1.9E-6 * td) * td2) * DEG_TO_RAD) % cls.TWO_PI
+        sanomaly = ((3.58475833E2 + M2 - (1.5E-4 + 3.3E-6 * td) * td2) * DEG_TO_RAD) % cls.TWO_PI
+        anomaly = ((2.96104608E2 + M3 + (9.192E-3 + 1.44E-5 * td) * td2) * DEG_TO_RAD) % cls.TWO_PI
+        phase = ((3.50737486E2 + M4 - (1.436E-3 - 1.9E-6 * td) * td2) * DEG_TO_RAD) % cls.TWO_PI
+        node = ((11.250889 + M5 - (3.211E-3 + 3E-7 * td) * td2) * DEG_TO_RAD) % cls.TWO_PI
+        NA = ((2.59183275E2 - M6 + (2.078E-3 + 2.2E-6 * td) * td2) * DEG_TO_RAD) % cls.TWO_PI
+        A = DEG_TO_RAD * (51.2 + 20.2 * td)
+        S1 = sin(A)
+        S2 = sin(NA)
+        B = 346.56 + (132.87 - 9.1731E-3 * td) * td
+        S3 = 3.964E-3 * sin(DEG_TO_RAD * B)
+        C = NA + DEG_TO_RAD * (275.05 - 2.3 * td)
+        S4 = sin(C)
         l = l * RAD_TO_DEG + (2.33E-4 * S1 + S3 + 1.964E-3 * S2)
         sanomaly = sanomaly - (1.778E-3 * S1) * DEG_TO_RAD
         anomaly = anomaly + (8.17E-4 * S1 + S3 + 2.541E-3 * S2) * DEG_TO_RAD
         node = node + (S3 - 2.4691E-2 * S2 - 4.328E-3 * S4) * DEG_TO_RAD
         phase = phase + (2.011E-3 * S1 + S3 + 1.964E-3 * S2) * DEG_TO_RAD
-        E = 1 - (2.495E-3 + 7.52E-6 * self.td) * self.td
-        E2 = E * E
-
-		#// Now longitude, with the three main correcting terms of evection,
-		#// variation, and equation of year, plus other terms (error<0.01 deg)
-        l += 6.28875 * math.sin(anomaly) + 1.274018 * math.sin(2 * phase - anomaly) + .658309 * math.sin(2 * phase)
-        l +=  0.213616 * math.sin(2 * anomaly) - E * .185596 * math.sin(sanomaly) - 0.114336 * math.sin(2 * node)
-        l += .058793 * math.sin(2 * phase - 2 * anomaly) + .057212 * E * math.sin(2 * phase - anomaly - sanomaly) + .05332 * math.sin(2 * phase + anomaly)
-        l += .045874 * E * math.sin(2 * phase - sanomaly) + .041024 * E * math.sin(anomaly - sanomaly) - .034718 * math.sin(phase) - E * .030465 * math.sin(sanomaly + anomaly)
-        l += .015326 * math.sin(2 * (phase - node)) - .012528 * math.sin(2 * node + anomaly) - .01098 * math.sin(2 * node - anomaly) + .010674 * math.sin(4 * phase - anomaly)
-        l += .010034 * math.sin(3 * anomaly) + .008548 * math.sin(4 * phase - 2 * anomaly)
-        l += -E * .00791 * math.sin(sanomaly - anomaly + 2 * phase) - E * .006783 * math.sin(2 * phase + sanomaly) + .005162 * math.sin(anomaly - phase) + E * .005 * math.sin(sanomaly + phase)
-        l += .003862 * math.sin(4 * phase) + E * .004049 * math.sin(anomaly - sanomaly + 2 * phase) + .003996 * math.sin(2 * (anomaly + phase)) + .003665 * math.sin(2 * phase - 3 * anomaly)
-        l += E * 2.695E-3 * math.sin(2 * anomaly - sanomaly) + 2.602E-3 * math.sin(anomaly - 2*(node+phase))
-        l += E * 2.396E-3 * math.sin(2*(phase - anomaly) - sanomaly) - 2.349E-3 * math.sin(anomaly+phase)
-        l += E * E * 2.249E-3 * math.sin(2*(phase-sanomaly)) - E * 2.125E-3 * math.sin(2*anomaly+sanomaly)
-        l += -E * E * 2.079E-3 * math.sin(2*sanomaly) + E * E * 2.059E-3 * math.sin(2*(phase-sanomaly)-anomaly)
-        l += -1.773E-3 * math.sin(anomaly+2*(phase-node)) - 1.595E-3 * math.sin(2*(node+phase))
-        l += E * 1.22E-3 * math.sin(4*phase-sanomaly-anomaly) - 1.11E-3 * math.sin(2*(anomaly+node))
-        l += 8.92E-4 * math.sin(anomaly - 3 * phase) - E * 8.11E-4 * math.sin(sanomaly + anomaly + 2 * phase)
-        l += E * 7.61E-4 * math.sin(4 * phase - sanomaly - 2 * anomaly)
-        l += E2 * 7.04E-4 * math.sin(anomaly - 2 * (sanomaly + phase))
-        l += E * 6.93E-4 * math.sin(sanomaly - 2 * (anomaly - phase))
-        l += E * 5.98E-4 * math.sin(2 * (phase - node) - sanomaly)
-        l += 5.5E-4 * math.sin(anomaly + 4 * phase) + 5.38E-4 * math.sin(4 * anomaly)
-        l += E * 5.21E-4 * math.sin(4 * phase - sanomaly) + 4.86E-4 * math.sin(2 * anomaly - phase)
-        l += E2 * 7.17E-4 * math.sin(anomaly - 2 * sanomaly)
-
-        longitude = l * DEG_TO_RAD
+        E = 1 - (2.495E-3 + 7.52E-6 * td) * td
+
+        dl, p, b = cls.evaluateMoonSeries(phase, sanomaly, anomaly, node, E, accuracy)
+
+        longitude = (l + dl) * DEG_TO_RAD
 
         Psin = 29.530588853
-        if (self.sun != None):
-			#// Get Moon age, more accurate than 'phase' but we need the Sun position
-            self.moonAge = self.normalizeRadians(longitude - self.sun.eclipticLongitude) * Psin / self.TWO_PI
+        if (sunLongitude is not None):
+            #// Get Moon age, more accurate than 'phase' but we need the Sun position
+            moonAge = ((longitude - sunLongitude) % cls.TWO_PI) * Psin / cls.TWO_PI
         else:
-			#// Use the phase variable as estimate, less accurate but this is used only when we don't need an accurate value
-            self.moonAge = phase * Psin / self.TWO_PI
-
-		#// Now Moon parallax
-        p = .950724 + .051818 * math.cos(anomaly) + .009531 * math.cos(2 * phase - anomaly)
-        p += .007843 * math.cos(2 * phase) + .002824 * math.cos(2 * anomaly)
-        p += 0.000857 * math.cos(2 * phase + anomaly) + E * .000533 * math.cos(2 * phase - sanomaly)
-        p += E * .000401 * math.cos(2 * phase - anomaly - sanomaly) + E * .00032 * math.cos(anomaly - sanomaly) - .000271 * math.cos(phase)
-        p += -E * .000264 * math.cos(sanomaly + anomaly) - .000198 * math.cos(2 * node - anomaly)
-        p += 1.73E-4 * math.cos(3 * anomaly) + 1.67E-4 * math.cos(4*phase-anomaly)
-        p += -E * 1.11E-4 * math.cos(sanomaly) + 1.03E-4 * math.cos(4 * phase - 2 * anomaly)
-        p += -8.4E-5 * math.cos(2 * anomaly - 2 * phase) - E * 8.3E-5 * math.cos(2 * phase + sanomaly)
-        p += 7.9E-5 * math.cos(2 * phase + 2 * anomaly) + 7.2E-5 * math.cos(4 * phase)
-        p += E * 6.4E-5 * math.cos(2 * phase - sanomaly + anomaly) - E * 6.3E-5 * math.cos(2 * phase + sanomaly - anomaly)
-        p += E * 4.1E-5 * math.cos(sanomaly + phase) + E * 3.5E-5 * math.cos(2 * anomaly - sanomaly)
-        p += -3.3E-5 * math.cos(3 * anomaly - 2 * phase) - 3E-5 * math.cos(anomaly + phase)
-        p += -2.9E-5 * math.cos(2 * (node - phase)) - E * 2.9E-5 * math.cos(2 * anomaly + sanomaly)
-        p += E2 * 2.6E-5 * math.cos(2 * (phase - sanomaly)) - 2.3E-5 * math.cos(2 * (node - phase) + anomaly)
-        p += E * 1.9E-5 * math.cos(4 * phase - sanomaly - anomaly)
+            #// Use the phase variable as estimate, less accurate but this is used only when we don't need an accurate value
+            moonAge = phase * Psin / cls.TWO_PI
 
         #// So Moon distance in Earth radii is, more or less,
-        distance = 1.0 / math.sin(p * DEG_TO_RAD)
-
-		#// Ecliptic latitude with nodal phase (error<0.01 deg)
-        l = 5.128189 * math.sin(node) + 0.280606 * math.sin(node + anomaly) + 0.277693 * math.sin(anomaly - node)
-        l += .173238 * math.sin(2 * phase - node) + .055413 * math.sin(2 * phase + node - anomaly)
-        l += .046272 * math.sin(2 * phase - node - anomaly) + .032573 * math.sin(2 * phase + node)
-        l += .017198 * math.sin(2 * anomaly + node) + .009267 * math.sin(2 * phase + anomaly - node)
-        l += .008823 * math.sin(2 * anomaly - node) + E * .008247 * math.sin(2 * phase - sanomaly - node) + .004323 * math.sin(2 * (phase - anomaly) - node)
-        l += .0042 * math.sin(2 * phase + node + anomaly) + E * .003372 * math.sin(node - sanomaly - 2 * phase)
-        l += E * 2.472E-3 * math.sin(2 * phase + node - sanomaly - anomaly)
-        l += E * 2.222E-3 * math.sin(2 * phase + node - sanomaly)
-        l += E * 2.072E-3 * math.sin(2 * phase - node - sanomaly - anomaly)
-        l += E * 1.877E-3 * math.sin(node - sanomaly + anomaly) + 1.828E-3 * math.sin(4 * phase - node - anomaly)
-        l += -E * 1.803E-3 * math.sin(node + sanomaly) - 1.75E-3 * math.sin(3 * node)
-        l += E * 1.57E-3 * math.sin(anomaly - sanomaly - node) - 1.487E-3 * math.sin(node + phase)
-        l += -E * 1.481E-3 * math.sin(node + sanomaly + anomaly) + E * 1.417E-3 * math.sin(node - sanomaly - anomaly)
-        l += E * 1.35E-3 * math.sin(node - sanomaly) + 1.33E-3 * math.sin(node - phase)
-        l += 1.106E-3 * math.sin(node + 3 * anomaly) + 1.02E-3 * math.sin(4 * phase - node)
-        l += 8.33E-4 * math.sin(node + 4 * phase - anomaly) + 7.81E-4 * math.sin(anomaly - 3 * node)
-        l += 6.7E-4 * math.sin(node + 4 * phase - 2 * anomaly) + 6.06E-4 * math.sin(2 * phase - 3 * node)
-        l += 5.97E-4 * math.sin(2 * (phase + anomaly) - node)
-        l += E * 4.92E-4 * math.sin(2 * phase + anomaly - sanomaly - node) + 4.5E-4 * math.sin(2 * (anomaly - phase) - node)
-        l += 4.39E-4 * math.sin(3 * anomaly - node) + 4.23E-4 * math.sin(node + 2 * (phase + anomaly))
-        l += 4.22E-4 * math.sin(2 * phase - node - 3 * anomaly) - E * 3.67E-4 * math.sin(sanomaly + node + 2 * phase - anomaly)
-        l += -E * 3.53E-4 * math.sin(sanomaly + node + 2 * phase) + 3.31E-4 * math.sin(node + 4 * phase)
-        l += E * 3.17E-4 * math.sin(2 * phase + node - sanomaly + anomaly)
-        l += E2 * 3.06E-4 * math.sin(2 * (phase - sanomaly) - node) - 2.83E-4 * math.sin(anomaly + 3 * node)
-        W1 = 4.664E-4 * math.cos(NA)
-        W2 = 7.54E-5 * math.cos(C)
-
-        latitude = l * DEG_TO_RAD * (1.0 - W1 - W2)
-
-        array = [longitude, latitude, distance * self.EARTH_RADIUS / self.AU, math.atan(self.BODY.Moon.eqRadius / (distance * self.EARTH_RADIUS))]
+        distance = 1.0 / sin((.950724 + p) * DEG_TO_RAD)
+
+        W1 = 4.664E-4 * cos(NA)
+        W2 = 7.54E-5 * cos(C)
+
+        latitude = b * DEG_TO_RAD * (1.0 - W1 - W2)
+
+        array = [longitude, latitude, distance * cls.EARTH_RADIUS / cls.AU, np.arctan(cls.BODY.Moon.eqRadius / (distance * cls.EARTH_RADIUS))]
+
+        return array, moonAge
+
+    def getMoon(self):
+        sunLongitude = None
+        if (self.sun is not None):
+            sunLongitude = self.sun.eclipticLongitude
+        pos, moonAge = self.getMoonPosition(self.state.t, sunLongitude, self.state.accuracy)
+        self.moonAge = float(moonAge)
+
+        array = [float(x) for x in pos]
 
         return array
 
+    # Keplerian elements of the planets from E. M. Standish, "Keplerian Elements for
+    # Approximate Positions of the Major Planets" (JPL), valid from 1800 to 2050, referred
+    # to the mean ecliptic and equinox of J2000. Rows are indexed by the first value of the
+    # BODY enum. Columns are a (AU), e, I, L, long. perihelion and long. ascending node
+    # (degrees), followed by their rates per Julian century. Heliocentric errors in right
+    # ascension are below 20" for the inner planets, 40" for Mars and 600" for Jupiter and
+    # Saturn, and grow in the geocentric positions of the planets close to the Earth. Maximum
+    # geocentric errors over 1900-2050 against the theory of Simon et al. (1994): Mercury
+    # 0.4', Venus 0.7', Mars 2.7', Jupiter 10.6', Saturn 12.3', Uranus 2.1' and Neptune 1.2'.
+    planet_elements = np.array((
+        [0.38709927, 0.20563593, 7.00497902, 252.25032350, 77.45779628, 48.33076593,
+            0.00000037, 0.00001906, -0.00594749, 149472.67411175, 0.16047689, -0.12534081],
+        [0.72333566, 0.00677672, 3.39467605, 181.97909950, 131.60246718, 76.67984255,
+            0.00000390, -0.00004107, -0.00078890, 58517.81538729, 0.00268329, -0.27769418],
+        [1.00000261, 0.01671123, -0.00001531, 100.46457166, 102.93768193, 0.0,
+            0.00000562, -0.00004392, -0.01294668, 35999.37244981, 0.32327364, 0.0],
+        [1.52371034, 0.09339410, 1.84969142, -4.55343205, -23.94362959, 49.55953891,
+            0.00001847, 0.00007882, -0.00813131, 19140.30268499, 0.44441088, -0.29257343],
+        [5.20288700, 0.04838624, 1.30439695, 34.39644051, 14.72847983, 100.47390909,
+            -0.00011607, -0.00013253, -0.00183714, 3034.74612775, 0.21252668, 0.20469106],
+        [9.53667594, 0.05386179, 2.48599187, 49.95424423, 92.59887831, 113.66242448,
+            -0.00125060, -0.00050991, 0.00193609, 1222.49362201, -0.41897216, -0.28867794],
+        [19.18916464, 0.04725744, 0.77263783, 313.23810451, 170.95427630, 74.01692503,
+            -0.00196176, -0.00004397, -0.00242939, 428.48202785, 0.40805281, 0.04240589],
+        [30.06992276, 0.00859048, 1.77004347, -55.12002969, 44.96476227, 131.78422574,
+            0.00026291, 0.00005105, 0.00035372, 218.45945325, -0.32241464, -0.01262724]
+    ))
+
+    # Constant of aberration in radians.
+    ABERRATION = 20.49552 * ARCSEC_TO_RAD
+
+    #/**
+    # * Heliocentric rectangular coordinates of a planet from its Keplerian elements.
+    # * @param body The planet.
+    # * @param t Julian centuries from J2000 in TT, scalar or array.
+    # * @return x, y, z in AU, referred to the mean ecliptic and equinox of J2000.
+    # */
+    @classmethod
+    def getHeliocentricPlanet(cls, body, t):
+        el = cls.planet_elements[body.value[0]]
+        a, e, I, L, peri, node = [el[i] + el[i + 6] * t for i in range(6)]
+        I = I * DEG_TO_RAD
+        node = node * DEG_TO_RAD
+        w = (peri - node / DEG_TO_RAD) * DEG_TO_RAD
+        M = np.mod((L - peri) * DEG_TO_RAD + math.pi, cls.TWO_PI) - math.pi
+
+        # Kepler equation by Newton iteration, enough for e < 0.25
+        E = M + e * np.sin(M)
+        for i in range(5):
+            E = E - (E - e * np.sin(E) - M) / (1.0 - e * np.cos(E))
+
+        xp = a * (np.cos(E) - e)
+        yp = a * np.sqrt(1.0 - e * e) * np.sin(E)
+        cw, sw = np.cos(w), np.sin(w)
+        cn, sn = np.cos(node), np.sin(node)
+        ci, si = np.cos(I), np.sin(I)
+        x = (cw * cn - sw * sn * ci) * xp + (-sw * cn - cw * sn * ci) * yp
+        y = (cw * sn + sw * cn * ci) * xp + (-sw * sn + cw * cn * ci) * yp
+        z = sw * si * xp + cw * si * yp
+        return x, y, z
+
+    #/**
+    # * Precession of ecliptic coordinates from J2000 to the mean ecliptic and equinox of date
+    # * (Meeus, Astronomical Algorithms, chapter 21).
+    # * @param x J2000 ecliptic x coordinate.
+    # * @param y J2000 ecliptic y coordinate.
+    # * @param z J2000 ecliptic z coordinate.
+    # * @param t Julian centuries from J2000 in TT.
+    # * @return x, y, z referred to the ecliptic and equinox of date.
+    # */
+    @classmethod
+    def precessEcliptic(cls, x, y, z, t):
+        eta = (47.0029 - 0.03302 * t + 0.000060 * t * t) * t * cls.ARCSEC_TO_RAD
+        pi = 174.876384 * DEG_TO_RAD - (869.8089 * t - 0.03536 * t * t) * cls.ARCSEC_TO_RAD
+        p = (5029.0966 * t + 1.11113 * t * t - 0.000006 * t * t * t) * cls.ARCSEC_TO_RAD
+
+        # Rotate to the node of the ecliptic of date, tilt by eta and rotate back adding precession
+        cp, sp = np.cos(pi), np.sin(pi)
+        u = x * cp + y * sp
+        v = -x * sp + y * cp
+        ce, se = np.cos(eta), np.sin(eta)
+        v, z = v * ce + z * se, -v * se + z * ce
+        cq, sq = np.cos(pi + p), np.sin(pi + p)
+        return u * cq - v * sq, u * sq + v * cq, z
+
+    #/**
+    # * Computes the apparent geocentric position of a planet, referred to the mean
+    # * ecliptic of date like {@linkplain #getSunPosition}, corrected for light time and
+    # * aberration. The Earth is obtained from the Sun position, which can be shared by
+    # * all the planets of an instant.
+    # * @param body The planet, MERCURY to NEPTUNE.
+    # * @param t Julian centuries from J2000 in TT, scalar or array.
+    # * @param sunPosition The output of getSunPosition for t, computed if not given.
+    # * @return Ecliptic longitude, latitude, distance and angular radius.
+    # */
+    @classmethod
+    def getPlanetPosition(cls, body, t, sunPosition = None):
+        if (body.value[0] < 0 or body == cls.BODY.EMB):
+            raise ValueError("Not a planet: " + body.name)
+        if (Instrumentation.enabled):
+            Instrumentation.count('series.planet', np.size(t))
+        if (sunPosition is None):
+            sunPosition = cls.getSunPosition(t)
+
+        # Heliocentric Earth, removing the aberration included in the Sun longitude
+        sunDistance = sunPosition[2]
+        sunLon = sunPosition[0] + cls.ABERRATION / sunDistance
+        xe = -sunDistance * np.cos(sunLon)
+        ye = -sunDistance * np.sin(sunLon)
+
+        # Light time iteration
+        tau = 0.0
+        for i in range(2):
+            x, y, z = cls.precessEcliptic(*cls.getHeliocentricPlanet(body, t - tau / cls.JULIAN_DAYS_PER_CENTURY), t)
+            x, y = x - xe, y - ye
+            distance = np.sqrt(x * x + y * y + z * z)
+            tau = distance * cls.LIGHT_TIME_DAYS_PER_AU
+
+        lon = np.arctan2(y, x)
+        lat = np.arcsin(z / distance)
+
+        # Annual aberration, without the e-terms
+        lon = lon - cls.ABERRATION * np.cos(sunLon - lon) / np.cos(lat)
+        lat = lat - cls.ABERRATION * np.sin(sunLon - lon) * np.sin(lat)
+
+        return [np.mod(lon, cls.TWO_PI), lat, distance, np.arctan(body.eqRadius / (cls.AU * distance))]
+
+    #/**
+    # * Returns the position of a planet at the current instant, to be used with doCalc.
+    # * @param body The planet, MERCURY to NEPTUNE.
+    # * @return Ecliptic longitude, latitude, distance and angular radius.
+    # */
+    def getPlanet(self, body):
+        return [float(x) for x in self.getPlanetPosition(body, self.state.t)]
+
     #/**
 	# * Compute the position of the body.
 	# * @param pos Values for the ecliptic longitude, latitude, distance and so on from previous methods for the specific body.
@@ -539,17 +1211,27 @@ class SunMoonCalculator:
 	# * @return The ephemeris object with the output position
 	# */
     def doCalc(self, pos, geocentric):
+        return self.calcBody(self.state, pos, geocentric)
+
+    #/**
+	# * Compute the position of the body without modifying the calculator or pos.
+	# * @param state The time and observer state, see {@linkplain #getState}.
+	# * @param pos Values for the ecliptic longitude, latitude, distance and so on from previous methods for the specific body.
+	# * @param geocentric True to return geocentric position. Set this to false generally.
+	# * @return The ephemeris object with the output position
+	# */
+    @classmethod
+    def calcBody(cls, state, pos, geocentric):
         #// Correct for nutation in longitude and obliquity
-        pos[0] = pos[0] + self.nutLon
-        pos[1] = pos[1] + self.nutObl
+        pos = [pos[0] + state.nutLon, pos[1] + state.nutObl, pos[2], pos[3]]
 
         #// Ecliptic to equatorial coordinates
         cl = math.cos(pos[1])
         x = pos[2] * math.cos(pos[0]) * cl
         y = pos[2] * math.sin(pos[0]) * cl
         z = pos[2] * math.sin(pos[1])
-        sinEcl = math.sin(self.meanObliquity)
-        cosEcl = math.cos(self.meanObliquity)
+        sinEcl = math.sin(state.meanObliquity)
+        cosEcl = math.cos(state.meanObliquity)
         tmp = y * cosEcl - z * sinEcl
         z = y * sinEcl + z * cosEcl
         y = tmp
@@ -560,12 +1242,12 @@ class SunMoonCalculator:
         ztopo = z
 
         if (geocentric==False):
-            geocLat = (self.obsLat - .1925 * math.sin(2 * self.obsLat) * DEG_TO_RAD)
+            geocLat = (state.obsLat - .1925 * math.sin(2 * state.obsLat) * DEG_TO_RAD)
             sinLat = math.sin(geocLat)
             cosLat = math.cos(geocLat)
-            geocR = 1.0 - math.pow(math.sin(self.obsLat), 2) / 298.257
-            radiusAU = (geocR * self.EARTH_RADIUS + self.obsAlt * 0.001) / self.AU
-            correction = np.array([radiusAU * cosLat * math.cos(self.lst), radiusAU * cosLat * math.sin(self.lst), radiusAU * sinLat])
+            geocR = 1.0 - math.pow(math.sin(state.obsLat), 2) / 298.257
+            radiusAU = (geocR * cls.EARTH_RADIUS + state.obsAlt * 0.001) / cls.AU
+            correction = np.array([radiusAU * cosLat * math.cos(state.lst), radiusAU * cosLat * math.sin(state.lst), radiusAU * sinLat])
 
             xtopo -= correction[0]
             ytopo -= correction[1]
@@ -574,7 +1256,7 @@ class SunMoonCalculator:
 
         # Obtain topocentric equatorial coordinates
         ra = 0.0
-        dec = self.PI_OVER_TWO
+        dec = cls.PI_OVER_TWO
         if (ztopo < 0.0):
             dec = - (dec)
         if (ytopo != 0.0 or xtopo != 0.0):
@@ -583,11 +1265,11 @@ class SunMoonCalculator:
         dist = math.sqrt(xtopo * xtopo + ytopo * ytopo + ztopo * ztopo)
 
         # Hour angle
-        angh = self.lst - ra
+        angh = state.lst - ra
 
         # Obtain azimuth and geometric alt
-        sinLat = math.sin(self.obsLat)
-        cosLat = math.cos(self.obsLat)
+        sinLat = math.sin(state.obsLat)
+        cosLat = math.cos(state.obsLat)
         sinDec = math.sin(dec)
         cosDec = math.cos(dec)
         h = sinLat * sinDec + cosLat * cosDec * math.cos(angh)
@@ -597,129 +1279,101 @@ class SunMoonCalculator:
         azi = math.pi + math.atan2(azy, azx) #// 0 = north
 
         if (geocentric==True):
-            return self.Ephemeris(azi, alt, -1, -1, -1, -1, self.normalizeRadians(ra), dec, dist, pos[0], pos[1], pos[3])
+            return cls.Ephemeris(azi, alt, -1, -1, -1, -1, cls.normalizeRadians(ra), dec, dist, pos[0], pos[1], pos[3])
 
 		# Get apparent elevation
-        alt = self.refraction(alt)
-
-        if (self.twilight.value==self.TWILIGHT.HORIZON_34arcmin.value):
-            tmp = -(34.0 / 60.0) * DEG_TO_RAD - pos[3]
-
-        if (self.twilight.value==self.TWILIGHT.CIVIL.value):
-            tmp = -6 * DEG_TO_RAD
+        if (state.accuracy.refraction):
+            alt = cls.refraction(alt)
 
-        if (self.twilight.value==self.TWILIGHT.NAUTICAL.value):
-            tmp = -12 * DEG_TO_RAD
-
-        if (self.twilight.value==self.TWILIGHT.ASTRONOMICAL.value):
-            tmp = -18 * DEG_TO_RAD
+        tmp = cls.getTwilightElevation(state.twilight, pos[3])
 
         # // Compute cosine of hour angle
         tmp = (math.sin(tmp) - sinLat * sinDec) / (cosLat * cosDec)
 		# /** Length of a sidereal day in days according to IERS Conventions. */
         siderealDayLength = 1.00273781191135448
-        celestialHoursToEarthTime = 1.0 / (siderealDayLength * self.TWO_PI)
+        celestialHoursToEarthTime = 1.0 / (siderealDayLength * cls.TWO_PI)
 
         # // Make calculations for the meridian
-        transit_time1 = celestialHoursToEarthTime * self.normalizeRadians(ra - self.lst)
-        transit_time2 = celestialHoursToEarthTime * (self.normalizeRadians(ra - self.lst) - self.TWO_PI)
+        transit_time1 = celestialHoursToEarthTime * cls.normalizeRadians(ra - state.lst)
+        transit_time2 = celestialHoursToEarthTime * (cls.normalizeRadians(ra - state.lst) - cls.TWO_PI)
         transit_alt = math.asin(sinDec * sinLat + cosDec * cosLat)
-        transit_alt = self.refraction(transit_alt)
+        if (state.accuracy.refraction):
+            transit_alt = cls.refraction(transit_alt)
 
         # // Obtain the current event in time
         transit_time = transit_time1
-        jdToday = math.floor(self.jd_UT - 0.5) + 0.5
-        transitToday2 = math.floor(self.jd_UT + transit_time2 - 0.5) + 0.5
+        jdToday = math.floor(state.jd_UT - 0.5) + 0.5
+        transitToday2 = math.floor(state.jd_UT + transit_time2 - 0.5) + 0.5
         # // Obtain the transit time. Preference should be given to the closest event
         # // in time to the current calculation time
         if (jdToday == transitToday2 and abs(transit_time2) < abs(transit_time1)):
             transit_time = transit_time2
 
-        transit = self.jd_UT + transit_time
+        transit = state.jd_UT + transit_time
 
         # // Make calculations for rise and set
         rise = -1
         set = -1
         if (abs(tmp) <= 1.0):
             ang_hor = abs(math.acos(tmp))
-            rise_time1 = celestialHoursToEarthTime * self.normalizeRadians(ra - ang_hor - self.lst)
-            set_time1 = celestialHoursToEarthTime * self.normalizeRadians(ra + ang_hor - self.lst)
-            rise_time2 = celestialHoursToEarthTime * (self.normalizeRadians(ra - ang_hor - self.lst) - self.TWO_PI)
-            set_time2 = celestialHoursToEarthTime * (self.normalizeRadians(ra + ang_hor - self.lst) - self.TWO_PI)
+            rise_time1 = celestialHoursToEarthTime * cls.normalizeRadians(ra - ang_hor - state.lst)
+            set_time1 = celestialHoursToEarthTime * cls.normalizeRadians(ra + ang_hor - state.lst)
+            rise_time2 = celestialHoursToEarthTime * (cls.normalizeRadians(ra - ang_hor - state.lst) - cls.TWO_PI)
+            set_time2 = celestialHoursToEarthTime * (cls.normalizeRadians(ra + ang_hor - state.lst) - cls.TWO_PI)
 
 			# // Obtain the current events in time. Preference should be given to the closest event
 			# // in time to the current calculation time (so that iteration in other method will converge)
             rise_time = rise_time1
-            riseToday2 = math.floor(self.jd_UT + rise_time2 - 0.5) + 0.5
+            riseToday2 = math.floor(state.jd_UT + rise_time2 - 0.5) + 0.5
             if (jdToday == riseToday2 and abs(rise_time2) < abs(rise_time1)):
                 rise_time = rise_time2
             set_time = set_time1
-            setToday2 = math.floor(self.jd_UT + set_time2 - 0.5) + 0.5
+            setToday2 = math.floor(state.jd_UT + set_time2 - 0.5) + 0.5
             if (jdToday == setToday2 and abs(set_time2) < abs(set_time1)):
                 set_time = set_time2
-            rise = self.jd_UT + rise_time
-            set = self.jd_UT + set_time
+            rise = state.jd_UT + rise_time
+            set = state.jd_UT + set_time
 
-        out = self.Ephemeris(azi, alt, rise, set, transit, transit_alt, self.normalizeRadians(ra), dec, dist, pos[0], pos[1], pos[3])
+        out = cls.Ephemeris(azi, alt, rise, set, transit, transit_alt, cls.normalizeRadians(ra), dec, dist, pos[0], pos[1], pos[3])
         return out
 
     #/**
-	# * Corrects geometric elevation for refraction if it is greater than -3 degrees.
+    # * Returns the geometric elevation of the center of the body at its rise/set
+    # * for a given twilight.
+    # * @param twilight The Twilight.
+    # * @param angR Angular radius of the body in radians, scalar or array.
+    # * @return The elevation in radians.
+    # */
+    @staticmethod
+    def getTwilightElevation(twilight, angR):
+        if (twilight.value == SunMoonCalculator.TWILIGHT.CIVIL.value):
+            return -6 * DEG_TO_RAD
+        if (twilight.value == SunMoonCalculator.TWILIGHT.NAUTICAL.value):
+            return -12 * DEG_TO_RAD
+        if (twilight.value == SunMoonCalculator.TWILIGHT.ASTRONOMICAL.value):
+            return -18 * DEG_TO_RAD
+        return -(34.0 / 60.0) * DEG_TO_RAD - angR
+
+    #/**
+	# * Corrects geometric elevation for refraction with the process wide model of
+	# * {@linkplain Refraction#getDefault}, if it is greater than -3 degrees.
 	# * @param alt Geometric elevation in radians.
 	# * @return Apparent elevation.
 	# */
-    def refraction(self,alt):
-        if (alt <= -3 * DEG_TO_RAD):
-            return alt
-
-        altIn = alt
-        niter = 0
-        prevAlt = alt
-
-        while(True):
-            altOut = self.computeGeometricElevation(alt)
-            alt = altIn - (altOut-alt)
-            niter= niter + 1
-            if (abs(prevAlt-alt) < 0.001 * DEG_TO_RAD):
-                break
-            prevAlt = alt
-            if (niter < 8):
-                break
-
-        return (alt)
+    @staticmethod
+    def refraction(alt):
+        return Refraction.getDefault().getApparentElevation(alt)
 
     # /**
 	#  * Compute geometric elevation from apparent elevation. Note ephemerides
 	#  * calculates geometric elevation, so an inversion is required, something
-	#  * achieved in method {@linkplain #refraction(double)} by iteration.
+	#  * achieved in method {@linkplain #refraction(double)}.
 	#  * @param alt Apparent elevation in radians.
 	#  * @return Geometric elevation in radians.
 	#  */
-
-    def computeGeometricElevation(self,alt):
-        Ps = 1010 #// Pressure in mb
-        Ts = 10 + 273.15 #// Temperature in K
-        altDeg = alt * RAD_TO_DEG
-
-		# // Bennet 1982 formulae for optical wavelengths, do the job but not accurate close to horizon
-		# // Yan 1996 formulae would be better but with much more lines of code
-        r = DEG_TO_RAD * abs(math.tan(self.PI_OVER_TWO - (altDeg + 7.31 / (altDeg + 4.4)) * DEG_TO_RAD)) / 60.0
-        refr = r * (0.28 * Ps / Ts)
-
-        return min(alt - refr, self.PI_OVER_TWO)
-
-		# # // Bennet formulae adapted to radio wavelenths. Use this for position in radio wavelengths
-		# # // Reference for some values: http://icts-yebes.oan.es/reports/doc/IT-OAN-2003-2.pdf (Yebes 40m radiotelescope)
-        # Hs = 20 #// Humidity %
-		# #// Water vapor saturation pressure following Crane (1976), as in the ALMA memorandum
-        # esat = 6.105 * math.exp(25.22 * (Ts - 273.15) / Ts) + math.pow(Ts / 273.15, -5.31)
-        # Pw = Hs * esat / 100.0
-
-        # R0 = (16.01 / Ts) * (Ps - 0.072 * Pw + 4831 * Pw / Ts) * self.ARCSEC_TO_RAD
-        # refr = R0 * abs(math.tan(self.PI_OVER_TWO - (altDeg + 5.9 / (altDeg + 2.5)) * DEG_TO_RAD))
-
-        # return min(alt - refr, self.PI_OVER_TWO)
-
+    @staticmethod
+    def computeGeometricElevation(alt):
+        return float(Refraction.getDefault().computeGeometricElevation(alt))
 
     #/**
 	# * Sets the illumination phase field for the provided body.
@@ -727,10 +1381,19 @@ class SunMoonCalculator:
 	# * @param body The ephemeris object for this body.
 	# */
     def getIlluminationPhase(self,body):
-        dlon = body.rightAscension - self.sun.rightAscension
-        cosElong = (math.sin(self.sun.declination) * math.sin(body.declination) + math.cos(self.sun.declination) * math.cos(body.declination) * math.cos(dlon))
+        self.calcIlluminationPhase(body, self.sun)
+
+    #/**
+	# * Sets the illumination phase field for the provided body.
+	# * @param body The ephemeris object for this body.
+	# * @param sun The ephemeris object for the Sun.
+	# */
+    @staticmethod
+    def calcIlluminationPhase(body, sun):
+        dlon = body.rightAscension - sun.rightAscension
+        cosElong = (math.sin(sun.declination) * math.sin(body.declination) + math.cos(sun.declination) * math.cos(body.declination) * math.cos(dlon))
 
-        RE = self.sun.distance
+        RE = sun.distance
         RO = body.distance
         #Use elongation cosine as trick to solve the rectangle and get RP (distance body - sun)
         RP = math.sqrt(-(cosElong * 2.0 * RE * RO - RE * RE - RO * RO))
@@ -741,6 +1404,7 @@ class SunMoonCalculator:
     #/**
 	# * Transforms a common date into a Julian day number (counting days from Jan 1, 4713 B.C. at noon).
 	# * Dates before October, 15, 1582 are assumed to be in the Julian calendar, after that the Gregorian one is used.
+	# * See {@linkplain Calendar#toJulianDay} for arrays of dates.
 	# * @param year Year.
 	# * @param month Month.
 	# * @param day Day.
@@ -748,111 +1412,47 @@ class SunMoonCalculator:
 	# * @param m Minute.
 	# * @param s Second.
 	# * @return Julian day number.
-	# * @throws Exception For an inexistent date.
 	# */
     def toJulianDay(self,year,month,day,h,m,s):
-        julian = False
-        jd = 0
-
-        if (year < 1582 or (year == 1582 and month < 10) or (year == 1582 and month == 10 and day < 15)):
-            julian=True
-        D = day
-        M = month
-        Y = year
-        if (M<3):
-            Y = Y - 1
-            M += 12
-        A = int(Y / 100)
-        if (julian==True):
-            B = 0
-        else:
-            B = 2 - A + A / 4
-        B = int(B)
-        dayFraction = (h + (m + (s / 60.0)) / 60.0) / 24.0
-        jd = dayFraction + (int) (365.25 * (Y + 4716)) + (int) (30.6001 * (M + 1)) + D + B - 1524.5
-
-        return jd
+        return float(Calendar.toJulianDay(year, month, day, h, m, s))
 
     #/**
 	# * Transforms a Julian day (rise/set/transit fields) to a common date.
+	# * See {@linkplain Calendar#getDate} for arrays of Julian days.
 	# * @param jd The Julian day.
 	# * @return A set of integers: year, month, day, hour, minute, second.
-	# * @throws Exception If the input date does not exists.
 	# */
     def getDate(self,jd):
-        #// The conversion formulas are from Meeus,
-        # Chapter 7
-        Z = math.floor(jd + 0.5)
-        F = jd + 0.5 - Z
-        A = Z
-        if (Z >= 2299161):
-            a = (int) ((Z - 1867216.25) / 36524.25)
-            A += 1 + a - a / 4
-        B = A + 1524
-        C = (int) ((B - 122.1) / 365.25)
-        D = (int) (C * 365.25)
-        E = (int) ((B - D) / 30.6001)
-        exactDay = F + B - D - (int) (30.6001 * E)
-        day = int(exactDay)
-        if (E<14):
-            month = E-1
-        else:
-            month = E-13
-        year = C - 4715
-        if (month > 2):
-            year=year-1
-        h = ((exactDay - day) * self.SECONDS_PER_DAY) / 3600.0
-
-        hour = int(h)
-        m = (h - hour) * 60.0
-        minute = int(m)
-        second = (int) ((m - minute) * 60.0)
-
-        array = np.array([year, month, day, hour, minute, second])
-
-        return  array
+        return np.array([int(x) for x in Calendar.getDate(jd)])
 
     #/**
 	# * Returns a date as a string.
+	# * See {@linkplain Calendar#getDateAsString} for arrays of Julian days.
 	# * @param jd The Julian day.
 	# * @return The String.
-	# * @throws Exception If the date does not exists.
 	# */
     def getDateAsString(self,jd):
-        if (jd == -1):
-            return "NO RISE/SET/TRANSIT FOR THIS OBSERVER/DATE"
-        date = np.array(self.getDate(jd))
-        zyr = ""
-        zmo = ""
-        zh = ""
-        zm = ""
-        zs = ""
-
-        if (date[1] < 10): zyr = "0"
-        if (date[2] < 10): zmo = "0"
-        if (date[3] < 10): zh = "0"
-        if (date[4] < 10): zm = "0"
-        if (date[5] < 10): zs = "0"
-
-        return str(date[0])+"-"+zyr+str(date[1])+"-"+zmo+str(date[2])+" "+zh+str(date[3])+":"+zm+str(date[4])+":"+zs+str(date[5])+" UT"
+        return str(Calendar.getDateAsString(jd))
 
     #/**
 	# * Reduce an angle in radians to the range (0 - 2 Pi).
 	# * @param r Value in radians.
 	# * @return The reduced radians value.
 	# */
-    def normalizeRadians(self,r):
-
-        if (r < 0 and r >= -self.TWO_PI):
-            return r + self.TWO_PI
-        if (r >= self.TWO_PI and r < 2*self.TWO_PI):
-            return r - self.TWO_PI
-        if (r >= 0 and r < self.TWO_PI):
+    @staticmethod
+    def normalizeRadians(r):
+        TWO_PI = SunMoonCalculator.TWO_PI
+
+        if (r < 0 and r >= -TWO_PI):
+            return r + TWO_PI
+        if (r >= TWO_PI and r < 2*TWO_PI):
+            return r - TWO_PI
+        if (r >= 0 and r < TWO_PI):
             return r
 
-        r -= self.TWO_PI * math.floor(r / self.TWO_PI)
+        r -= TWO_PI * math.floor(r / TWO_PI)
         if (r < 0.):
-            r += self.TWO_PI
+            r += TWO_PI
 
         return(r)
 
@@ -865,58 +1465,65 @@ class SunMoonCalculator:
 	# * @return The Julian day in UT for the event, 1s accuracy.
 	# */
     def obtainAccurateRiseSetTransit(self,riseSetJD, index, niter, sun):
+        return self.calcAccurateRiseSetTransit(self.state, riseSetJD, index, niter, sun)
+
+    #/**
+	# * Computes an accurate rise/set/transit time for a moving object without modifying
+	# * the calculator. TT minus UT is kept at the value of the state.
+	# * @param state The time and observer state, see {@linkplain #getState}.
+	# * @param riseSetJD Start date for the event.
+	# * @param index Event identifier.
+	# * @param niter Maximum number of iterations.
+	# * @param sun True for the Sun.
+	# * @return The Julian day in UT for the event, 1s accuracy.
+	# */
+    @classmethod
+    def calcAccurateRiseSetTransit(cls, state, riseSetJD, index, niter, sun):
         step = -1
         i=0
         while (i < niter):
             if (riseSetJD == -1):
+                if (Instrumentation.enabled):
+                    Instrumentation.count('riseSetTransit.noEvent')
                 return riseSetJD #// -1 means no rise/set from that location
-            self.setUTDate(riseSetJD)
-            out = self.Ephemeris
-            out = None
+            if (Instrumentation.enabled):
+                Instrumentation.count('riseSetTransit.iterations')
+            eventState = cls.getState(riseSetJD, state.obsLon, state.obsLat, state.obsAlt, state.TTminusUT, state.twilight, state.accuracy)
+            sunPos = [float(x) for x in cls.getSunPosition(eventState.t, state.accuracy)]
             if (sun):
-                out = self.doCalc(self.getSun(),False)
+                out = cls.calcBody(eventState, sunPos, False)
             else:
-                out = self.doCalc(self.getMoon(),False)
+                moonPos = cls.getMoonPosition(eventState.t, sunPos[0] + eventState.nutLon, state.accuracy)[0]
+                out = cls.calcBody(eventState, [float(x) for x in moonPos], False)
             val = out.rise
-            if (index == self.EVENT.SET):
+            if (index == cls.EVENT.SET):
                 val = out.set
-            if (index == self.EVENT.TRANSIT):
+            if (index == cls.EVENT.TRANSIT):
                 val = out.transit
             step = abs(riseSetJD - val)
             riseSetJD = val
-            if (step <= 1.0 / self.SECONDS_PER_DAY):
+            if (step <= 1.0 / cls.SECONDS_PER_DAY):
                 break # // convergency reached
             i=i+1
-        if (step > 1.0 / self.SECONDS_PER_DAY):
+        if (step > 1.0 / cls.SECONDS_PER_DAY):
+            if (Instrumentation.enabled):
+                Instrumentation.count('riseSetTransit.notConverged')
             return -1 # // did not converge => without rise/set/transit in this date
         return riseSetJD
 
     #/**
-    #* Returns the instant of a given moon phase.
+    #* Returns the instant of a given moon phase, the closest one to the current instant.
+    #* See {@linkplain MoonPhases#generateMoonPhases} to obtain all phases in a range of time.
     #* @param phase The phase.
     #* @return The instant of that phase, accuracy around 1 minute or better.
     #*/
     def getMoonPhaseTime(self, phase):
-        accuracy = 10 / (30 * self.SECONDS_PER_DAY) #// 10s / lunar cycle length in s => 10s accuracy
-        refPhase = phase
-        oldJD = self.jd_UT
-        oldMoonAge = self.moonAge
-        while (True):
-            age = self.normalizeRadians((self.getMoon()[0] - self.getSun()[0])) / self.TWO_PI - refPhase
-            if (age < 0): age += 1
-            if (age < accuracy or age > 1 - accuracy): break
-            if (age < 0.5):
-                self.jd_UT -= age
-            else:
-                self.jd_UT += 1-age
-
-            self.setUTDate(self.jd_UT)
-
-        out = self.jd_UT
-        self.setUTDate(oldJD)
-        moonAge = oldMoonAge
-
-        return out
+        import MoonPhases
+        # Half a lunar cycle around the current instant always contains the phase
+        state = self.state
+        with Instrumentation.stage('getMoonPhaseTime'):
+            jd = MoonPhases.findPhaseTimes(state.jd_UT - 16, state.jd_UT + 16, [phase], state.TTminusUT)[0]
+        return float(jd[np.argmin(np.abs(jd - state.jd_UT))])
 
 
 ############################################## MAIN PROGRAM ####################################################################
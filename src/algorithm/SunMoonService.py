@@ -0,0 +1,205 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+#################################################################################################################################
+# asyncio front-end for Sun/Moon queries.
+# Concurrent requests for the same time bucket, site and twilight share one computation.
+# The requests queued during one iteration of the event loop are sent together as a batch
+# to a process pool, where positions are computed with the vectorized path and rise/set/
+# transit times with RiseSetSolver, so the event loop is never blocked by the series.
+#################################################################################################################################
+
+import asyncio
+import math
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from SunMoonCalculator import SunMoonCalculator
+from RiseSetSolver import RiseSetSolver
+import SunMoonBatch
+
+
+#/**
+# * Computes a batch of requests. This runs in the worker processes.
+# * @param keys The (Julian day, longitude, latitude, altitude, twilight value) of each request.
+# * @return For each request a dictionary with the 'sun' and 'moon' results, as dictionaries
+# * with the fields of {@linkplain SunMoonCalculator.Ephemeris}, and the 'moonAge'.
+# */
+def calcBatch(keys):
+    jd, obsLon, obsLat, obsAlt, twilight = [np.array(x) for x in zip(*keys)]
+    TTminusUT = SunMoonBatch.getTTminusUT(jd)
+    geocentric = SunMoonBatch.calcGeocentric(jd, TTminusUT)
+    sun, moon = SunMoonBatch.calcForObservers(geocentric, obsLon, obsLat, obsAlt)
+
+    out = []
+    for i in range(len(keys)):
+        solver = RiseSetSolver(float(obsLon[i]), float(obsLat[i]), float(obsAlt[i]), float(TTminusUT[i]),
+            SunMoonCalculator.TWILIGHT(int(twilight[i])))
+        result = {'moonAge': float(geocentric.moonAge[i])}
+        for name, series in (('sun', sun), ('moon', moon)):
+            events = solver.getEvents(float(jd[i]), name == 'sun')
+            body = {field: float(getattr(series, field)[i]) for field in SunMoonBatch.FIELDS}
+            body['rise'] = events.rise
+            body['set'] = events.set
+            body['transit'] = events.transit
+            body['transitElevation'] = events.transitElevation
+            result[name] = body
+        out.append(result)
+    return out
+
+
+class SunMoonService(object):
+
+    # Default width of the time buckets in seconds.
+    BUCKET = 60.0
+
+    # Default resolution in radians of the site coordinates (about 600 m).
+    SITE_RESOLUTION = 1.0e-4
+
+    # Maximum number of computations sent to one worker, larger batches are split among workers.
+    BATCH_SIZE = 64
+
+    #/**
+    # * Constructor.
+    # * @param bucket Width of the time buckets in seconds. Requests are computed for
+    # * the center of their bucket.
+    # * @param siteResolution Longitude and latitude are rounded to this resolution in
+    # * radians, and the altitude to 1 m.
+    # * @param executor The executor for the computations. By default a process pool,
+    # * owned and shut down by the service.
+    # * @param workers Number of worker processes of the default pool.
+    # */
+    def __init__(self, bucket = BUCKET, siteResolution = SITE_RESOLUTION, executor = None, workers = None):
+        self.bucket = bucket / SunMoonCalculator.SECONDS_PER_DAY
+        self.siteResolution = siteResolution
+        self.ownExecutor = executor is None
+        self.executor = ProcessPoolExecutor(workers) if executor is None else executor
+
+        # Futures of the requests being computed or waiting for the next batch, by key
+        self.pending = {}
+        self.queue = []
+
+        # Number of requests received, of distinct computations and of batches.
+        self.requests = 0
+        self.computations = 0
+        self.batches = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
+
+    # Shuts down the executor if it was created by the service.
+    def close(self):
+        if (self.ownExecutor):
+            self.executor.shutdown()
+
+    #/**
+    # * Returns the key identifying the computation for a request.
+    # */
+    def getKey(self, jd, obsLon, obsLat, obsAlt, twilight):
+        jd = (math.floor(jd / self.bucket) + 0.5) * self.bucket
+        obsLon = round(obsLon / self.siteResolution) * self.siteResolution
+        obsLat = round(obsLat / self.siteResolution) * self.siteResolution
+        return (jd, obsLon, obsLat, float(round(obsAlt)), twilight.value)
+
+    #/**
+    # * Calculates the Sun and Moon for an instant and site. Results are shared by all
+    # * requests with the same key and must not be modified.
+    # * @param jd The Julian day in UT.
+    # * @param obsLon Observer's longitude in radians.
+    # * @param obsLat Observer's latitude in radians.
+    # * @param obsAlt Observer's altitude in m.
+    # * @param twilight The twilight for the rise and set times.
+    # * @return A dictionary with the 'sun' and 'moon' results and the 'moonAge', see
+    # * {@linkplain #calcBatch}.
+    # */
+    async def calc(self, jd, obsLon, obsLat, obsAlt = 0.0, twilight = SunMoonCalculator.TWILIGHT.HORIZON_34arcmin):
+        self.requests += 1
+        key = self.getKey(jd, obsLon, obsLat, obsAlt, twilight)
+        future = self.pending.get(key)
+        if (future is None):
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self.pending[key] = future
+            self.queue.append(key)
+            if (len(self.queue) == 1):
+                loop.call_soon(self.flush)
+
+        # A cancelled request must not cancel the computation shared with other requests
+        return await asyncio.shield(future)
+
+    # Sends the queued requests to the executor, in batches of up to BATCH_SIZE.
+    def flush(self):
+        loop = asyncio.get_running_loop()
+        self.computations += len(self.queue)
+        for start in range(0, len(self.queue), self.BATCH_SIZE):
+            keys = self.queue[start:start + self.BATCH_SIZE]
+            self.batches += 1
+            task = loop.run_in_executor(self.executor, calcBatch, keys)
+            task.add_done_callback(lambda done, keys = keys: self.resolve(keys, done))
+        self.queue = []
+
+    # Sets the results of a batch to the futures of its requests.
+    def resolve(self, keys, done):
+        error = done.exception()
+        results = None if error is not None else done.result()
+        for i, key in enumerate(keys):
+            future = self.pending.pop(key)
+            if (future.cancelled()):
+                continue
+            if (error is not None):
+                future.set_exception(error)
+            else:
+                future.set_result(results[i])
+
+
+async def demo(clients, sites):
+    # Many clients asking for the current minute at a few nearby sites
+    rng = random.Random(0)
+    jd = 2440587.5 + time.time() / SunMoonCalculator.SECONDS_PER_DAY
+    locations = [(math.radians(rng.uniform(-10, 10)), math.radians(rng.uniform(35, 45))) for i in range(sites)]
+    async with SunMoonService() as service:
+        start = time.perf_counter()
+        requests = []
+        for i in range(clients):
+            lon, lat = rng.choice(locations)
+            requests.append(service.calc(jd + rng.uniform(0, 30) / SunMoonCalculator.SECONDS_PER_DAY, lon, lat))
+        results = await asyncio.gather(*requests)
+        elapsed = time.perf_counter() - start
+        print(str(service.requests) + " requests, " + str(service.computations) + " computations in " +
+            str(service.batches) + " batches, " + str(elapsed) + " s")
+        print("Sun elevation: " + str(math.degrees(results[0]['sun']['elevation'])))
+
+
+def main():
+    # Usage: python SunMoonService.py [clients] [sites]
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    sites = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    asyncio.run(demo(clients, sites))
+
+if __name__ == '__main__':
+    main()
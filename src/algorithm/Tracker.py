@@ -0,0 +1,141 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+#################################################################################################################################
+# Continuous Sun/Moon tracking at a fixed cadence.
+# The topocentric right ascension and declination of both bodies and the local sidereal
+# time are computed with the full series only at three instants of each refresh interval,
+# and interpolated with a parabola at the ticks in between. Azimuth and elevation are then
+# obtained for all the ticks of the interval in one vectorized pass, so the cost per tick in
+# steady state is a few array elements and the yielded tuple.
+#################################################################################################################################
+
+import time
+import numpy as np
+
+from SunMoonCalculator import SunMoonCalculator
+import SunMoonBatch
+
+
+class Tracker(object):
+
+    # Default time between ticks in seconds.
+    CADENCE = 0.1
+
+    # Default length in seconds of the interval covered by each interpolating parabola.
+    REFRESH = 60.0
+
+    #/**
+    # * Constructor.
+    # * @param obsLon Observer's longitude in radians.
+    # * @param obsLat Observer's latitude in radians.
+    # * @param obsAlt Observer's altitude in m.
+    # * @param cadence Time between ticks in seconds.
+    # * @param refresh Time between evaluations of the series in seconds, rounded to
+    # * a whole number of ticks. The interpolation error is below 0.01" for 60s.
+    # */
+    def __init__(self, obsLon, obsLat, obsAlt = 0.0, cadence = CADENCE, refresh = REFRESH):
+        self.obsLon = obsLon
+        self.obsLat = obsLat
+        self.obsAlt = obsAlt
+        self.cadence = cadence
+        self.ticks = max(1, int(round(refresh / cadence)))
+
+        # Parabola through the three nodes of an interval, at u = 0 ... 1 for each tick
+        u = np.arange(self.ticks) / self.ticks
+        self.offsets = u
+        self.weights = np.array([1 - 3 * u + 2 * u * u, 4 * u - 4 * u * u, 2 * u * u - u])
+
+        # Number of evaluations of the Sun/Moon series done by this tracker.
+        self.evaluations = 0
+
+    #/**
+    # * Computes azimuth and apparent elevation of the Sun and the Moon for the ticks
+    # * of one refresh interval.
+    # * @param jd0 Julian day in UT of the first tick.
+    # * @return Julian days, Sun azimuth, Sun elevation, Moon azimuth and Moon elevation,
+    # * as arrays with one element per tick.
+    # */
+    def calcInterval(self, jd0):
+        span = self.ticks * self.cadence / SunMoonCalculator.SECONDS_PER_DAY
+        nodes = jd0 + np.array([0.0, 0.5, 1.0]) * span
+        geocentric = SunMoonBatch.calcGeocentric(nodes)
+        sun, moon = SunMoonBatch.calcForObservers(geocentric, self.obsLon, self.obsLat, self.obsAlt)
+        lst = geocentric.state[4] + self.obsLon
+        self.evaluations += 3
+
+        weights = self.weights
+        lst = np.unwrap(lst) @ weights
+
+        out = [jd0 + self.offsets * span]
+        for body in (sun, moon):
+            ra = np.unwrap(body.rightAscension) @ weights
+            dec = body.declination @ weights
+            azi, alt = SunMoonBatch.getHorizontal(ra, dec, lst, self.obsLat)
+            out.append(azi)
+            out.append(SunMoonBatch.refraction(alt))
+        return out
+
+    #/**
+    # * Generates the positions of the Sun and the Moon at a fixed cadence, indefinitely.
+    # * @param jdStart Julian day in UT of the first tick, by default the current time.
+    # * @param realtime True to wait until each tick is due in the system clock before
+    # * yielding it.
+    # * @return A generator of (Julian day in UT, Sun azimuth, Sun elevation, Moon azimuth,
+    # * Moon elevation) tuples, with angles in radians.
+    # */
+    def track(self, jdStart = None, realtime = False):
+        if (jdStart is None):
+            jdStart = self.getCurrentJulianDay()
+
+        span = self.ticks * self.cadence / SunMoonCalculator.SECONDS_PER_DAY
+        n = 0
+        while (True):
+            interval = self.calcInterval(jdStart + n * span)
+            for tick in zip(*[x.tolist() for x in interval]):
+                if (realtime):
+                    wait = (tick[0] - self.getCurrentJulianDay()) * SunMoonCalculator.SECONDS_PER_DAY
+                    if (wait > 0):
+                        time.sleep(wait)
+                yield tick
+            n += 1
+
+    #/**
+    # * Returns the current Julian day in UT from the system clock.
+    # */
+    @staticmethod
+    def getCurrentJulianDay():
+        return 2440587.5 + time.time() / SunMoonCalculator.SECONDS_PER_DAY
+
+
+def main():
+    # Prints one tick per second for 10 seconds of real time at the default cadence
+    import math
+    tracker = Tracker(math.radians(-4), math.radians(40))
+    for i, (jd, sunAz, sunEl, moonAz, moonEl) in enumerate(tracker.track(realtime = True)):
+        if (i % 10 == 0):
+            print("%.8f Sun %8.4f %8.4f Moon %8.4f %8.4f" % (jd, math.degrees(sunAz), math.degrees(sunEl), math.degrees(moonAz), math.degrees(moonEl)))
+        if (i == 100):
+            break
+
+if __name__ == '__main__':
+    main()
@@ -1 +1,2 @@
 export { moonAnglesAndRelativeSize } from './moonAnglesAndRelativeSize';
+export { fetchMoonTable, parseMoonTable, moonTableLookup } from './moonTable';
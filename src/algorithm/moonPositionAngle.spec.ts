@@ -0,0 +1,16 @@
+import { expect } from 'chai';
+import { MathUtils } from 'three';
+import { moonPositionAngle } from './moonPositionAngle';
+
+const { degToRad, radToDeg } = MathUtils;
+
+describe('moonPositionAngle', () => {
+    it('calculates the position angle of the bright limb for the example from the book', () => {
+        const sun = { α: degToRad(20.6579), δ: degToRad(8.6964) };
+        const moon = { α: degToRad(134.6885), δ: degToRad(13.7684) };
+
+        const χ = radToDeg(moonPositionAngle(sun, moon));
+
+        expect((χ + 360) % 360).to.be.closeTo(285.0, 5e-2);
+    });
+});
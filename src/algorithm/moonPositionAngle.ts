@@ -2,9 +2,10 @@ import { EquatorialCoordinates } from './coordinates/EquatorialCoordinates';
 
 const { atan2, cos, sin } = Math;
 
+// Position angle of the bright limb, Meeus (48.5), as baked by MoonTable.py
 export const moonPositionAngle = (sun: EquatorialCoordinates, moon: EquatorialCoordinates): number => (
     atan2(
-        sin(sun.δ) * sin(sun.α - moon.α),
-        cos(moon.δ) * sin(sun.δ) - sin(moon.δ) * cos(sun.δ) * cos(sun.α - moon.α),
+        cos(sun.δ) * sin(sun.α - moon.α),
+        sin(sun.δ) * cos(moon.δ) - cos(sun.δ) * sin(moon.δ) * cos(sun.α - moon.α),
     )
 );
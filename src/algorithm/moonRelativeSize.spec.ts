@@ -0,0 +1,20 @@
+import dayjs from 'dayjs';
+import { expect } from 'chai';
+import { moonProperies } from './moonProperies';
+import { moonRelativeSize } from './moonRelativeSize';
+
+describe('moonRelativeSize', () => {
+    // Rows of the table baked by MoonTable.py, close to the perigee and the apogee
+    const rows = [
+        { date: '2003-09-01 00:00:00', relativeSize: 1.0446605 },
+        { date: '2024-01-29 00:00:00', relativeSize: 0.9474657 },
+    ];
+
+    rows.forEach(({ date, relativeSize }) => {
+        it(`follows the baked table on ${date}`, () => {
+            const { Ec, MPrimM } = moonProperies(dayjs(date));
+
+            expect(moonRelativeSize(Ec, MPrimM)).to.be.closeTo(relativeSize, 0.02);
+        });
+    });
+});
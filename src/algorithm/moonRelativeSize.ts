@@ -1,4 +1,11 @@
+import { MathUtils } from 'three';
+
+const { degToRad } = MathUtils;
+
+// Apparent size over the one at the semi-major axis, a / r, as baked by MoonTable.py.
+// Ec and MPrimM are in degrees, as returned by moonProperies. Without the evection and the
+// other perturbations of the distance the result is within 0.02 of the baked table.
 export const moonRelativeSize = (Ec: number, MPrimM: number) => {
     const e = 0.0549;
-    return (1 - e ** 2) / (1 + e * Math.cos(MPrimM + Ec));
+    return (1 + e * Math.cos(degToRad(MPrimM + Ec))) / (1 - e ** 2);
 };
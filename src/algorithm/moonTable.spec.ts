@@ -0,0 +1,52 @@
+import dayjs from 'dayjs';
+import { expect } from 'chai';
+import { parseMoonTable, moonTableLookup } from './moonTable';
+
+const makeTable = (jdStart: number, step: number, rows: number[][]) => {
+    const buffer = new ArrayBuffer(32 + rows.length * 12);
+    const view = new DataView(buffer);
+
+    'MOON'.split('').forEach((c, i) => view.setUint8(i, c.charCodeAt(0)));
+    view.setUint32(4, 1, true);
+    view.setFloat64(8, jdStart, true);
+    view.setFloat64(16, step, true);
+    view.setUint32(24, rows.length, true);
+    view.setUint32(28, 3, true);
+    const values = new Float32Array(buffer, 32);
+    rows.forEach((row, i) => values.set(row, i * 3));
+
+    return buffer;
+};
+
+describe('moonTable', () => {
+    // 2000-01-01 00:00 UT
+    const jdStart = 2451544.5;
+
+    it('interpolates between rows, along the shortest arc for the angles', () => {
+        const table = parseMoonTable(makeTable(jdStart, 1, [
+            [6.2, -3.1, 1],
+            [0.1, 3.1, 1.1],
+        ]));
+
+        const props = moonTableLookup(table, dayjs('2000-01-01T12:00:00Z'));
+
+        expect(props?.phaseAngle).to.be.closeTo(6.2 + (0.1 + 2 * Math.PI - 6.2) / 2, 1e-6);
+        expect(props?.positionAngle).to.be.closeTo(-3.1 - (2 * Math.PI - 6.2) / 2, 1e-6);
+        expect(props?.relativeSize).to.be.closeTo(1.05, 1e-6);
+    });
+
+    it('returns undefined out of the table span', () => {
+        const table = parseMoonTable(makeTable(jdStart, 1, [[0, 0, 1], [0, 0, 1]]));
+
+        expect(moonTableLookup(table, dayjs('1999-12-31T23:00:00Z'))).to.be.undefined;
+        expect(moonTableLookup(table, dayjs('2000-01-02T01:00:00Z'))).to.be.undefined;
+    });
+
+    it('rejects tables with less than two rows', () => {
+        expect(() => parseMoonTable(makeTable(jdStart, 1, [[0, 0, 1]]))).to.throw();
+    });
+
+    it('rejects other files', () => {
+        expect(() => parseMoonTable(new ArrayBuffer(32))).to.throw();
+    });
+});
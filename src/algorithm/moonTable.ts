@@ -0,0 +1,74 @@
+import { Dayjs } from 'dayjs';
+
+// Layout written by src/algorithm/MoonTable.py: a 32 byte little endian header
+// (signature, version, Julian day in UT of the first row, step in days, rows, channels)
+// followed by the float32 rows of phase angle, position angle and relative size.
+const MAGIC = 'MOON';
+const VERSION = 1;
+const HEADER_SIZE = 32;
+const CHANNELS = 3;
+
+const UNIX_EPOCH_JD = 2440587.5;
+const MS_PER_DAY = 86400000;
+
+const { PI, floor, min, max } = Math;
+
+export interface MoonTable {
+    jdStart: number;
+    step: number;
+    rows: number;
+    values: Float32Array;
+}
+
+export const parseMoonTable = (buffer: ArrayBuffer): MoonTable => {
+    const view = new DataView(buffer);
+    const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+
+    if (magic !== MAGIC || view.getUint32(4, true) !== VERSION || view.getUint32(28, true) !== CHANNELS)
+        throw new Error('Not a version 1 moon table');
+
+    const rows = view.getUint32(24, true);
+
+    if (rows < 2 || buffer.byteLength < HEADER_SIZE + rows * CHANNELS * 4)
+        throw new Error('The moon table needs at least two complete rows');
+
+    return {
+        jdStart: view.getFloat64(8, true),
+        step: view.getFloat64(16, true),
+        rows,
+        values: new Float32Array(buffer, HEADER_SIZE, rows * CHANNELS),
+    };
+};
+
+export const fetchMoonTable = async (url: string) => {
+    const response = await fetch(url);
+
+    if (!response.ok)
+        throw new Error(`Could not fetch the moon table: ${response.status}`);
+
+    return parseMoonTable(await response.arrayBuffer());
+};
+
+const lerpAngle = (a: number, b: number, f: number) => {
+    const d = ((b - a + 3 * PI) % (2 * PI)) - PI;
+    return a + f * d;
+};
+
+// Returns undefined out of the span of the table, so the caller can fall back to the series
+export const moonTableLookup = ({ jdStart, step, rows, values }: MoonTable, date: Dayjs) => {
+    const x = ((date.valueOf() / MS_PER_DAY + UNIX_EPOCH_JD) - jdStart) / step;
+
+    if (!(x >= 0 && x <= rows - 1))
+        return undefined;
+
+    const i = max(min(floor(x), rows - 2), 0);
+    const f = x - i;
+    const a = i * CHANNELS;
+    const b = a + CHANNELS;
+
+    return {
+        phaseAngle: lerpAngle(values[a], values[b], f),
+        positionAngle: lerpAngle(values[a + 1], values[b + 1], f),
+        relativeSize: values[a + 2] + f * (values[b + 2] - values[a + 2]),
+    };
+};
@@ -0,0 +1,95 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+#################################################################################################################################
+# Tests of the bulk almanac against the iterations of the scalar calculator.
+#################################################################################################################################
+
+import io
+import math
+import numpy as np
+import pytest
+
+from SunMoonCalculator import SunMoonCalculator
+import Almanac
+import Calendar
+
+
+# 2024-01-01 0h UT
+JD_START = 2460310.5
+OBS_LON = np.radians([-4.0, 19.0, 151.2])
+OBS_LAT = np.radians([40.0, 54.0, -33.9])
+
+EVENTS = [('sunRise', SunMoonCalculator.EVENT.RISE, True), ('sunSet', SunMoonCalculator.EVENT.SET, True),
+    ('sunTransit', SunMoonCalculator.EVENT.TRANSIT, True), ('moonRise', SunMoonCalculator.EVENT.RISE, False),
+    ('moonSet', SunMoonCalculator.EVENT.SET, False), ('moonTransit', SunMoonCalculator.EVENT.TRANSIT, False)]
+
+
+def getBlocks(days, **kwargs):
+    return list(Almanac.generateAlmanac(JD_START, days, OBS_LON, OBS_LAT, 0.0, **kwargs))
+
+
+def testMatchesAccurateRiseSetTransit():
+    block = getBlocks(3)[0]
+    np.testing.assert_array_equal(block['site'], np.repeat(np.arange(3), 3))
+    np.testing.assert_array_equal(block['date'], np.tile(JD_START + np.arange(3), 3))
+
+    for row in range(len(block['site'])):
+        site = block['site'][row]
+        calc = SunMoonCalculator(OBS_LON[site], OBS_LAT[site], 0.0, *Calendar.getDate(block['date'][row]))
+        for key, event, isSun in EVENTS:
+            jd = block[key][row]
+            if (jd == -1):
+                continue
+            expected = calc.obtainAccurateRiseSetTransit(jd, event, 15, isSun)
+            assert jd == pytest.approx(expected, abs=1.0 / SunMoonCalculator.SECONDS_PER_DAY), key
+
+
+def testTwilightsBracketTheSunrise():
+    block = getBlocks(1)[0]
+    assert np.all(block['astronomicalDawn'] < block['nauticalDawn'])
+    assert np.all(block['nauticalDawn'] < block['civilDawn'])
+    assert np.all(block['civilDawn'] < block['sunRise'])
+    assert np.all(block['sunSet'] < block['civilDusk'])
+
+    calc = SunMoonCalculator(OBS_LON[1], OBS_LAT[1], 0.0, *Calendar.getDate(JD_START))
+    calc.setTwilight(SunMoonCalculator.TWILIGHT.CIVIL)
+    expected = calc.obtainAccurateRiseSetTransit(block['civilDawn'][1], SunMoonCalculator.EVENT.RISE, 15, True)
+    assert block['civilDawn'][1] == pytest.approx(expected, abs=1.0 / SunMoonCalculator.SECONDS_PER_DAY)
+
+
+def testBlocksOfDays():
+    days = Almanac.DAYS_PER_BLOCK + 3
+    blocks = getBlocks(days)
+    assert [len(block['site']) for block in blocks] == [Almanac.DAYS_PER_BLOCK * 3, 9]
+    # The second block is the same as an almanac starting at its first day
+    last = next(Almanac.generateAlmanac(JD_START + Almanac.DAYS_PER_BLOCK, 3, OBS_LON, OBS_LAT, 0.0, twilights=()))
+    for key in last:
+        np.testing.assert_allclose(blocks[1][key], last[key], rtol=0, atol=1e-9)
+
+
+def testCsv():
+    out = io.StringIO()
+    Almanac.writeCsv(getBlocks(2), out)
+    lines = out.getvalue().splitlines()
+    assert lines[0].startswith('site,date,sunRise,sunSet,civilDawn')
+    assert len(lines) == 1 + 2 * len(OBS_LON)
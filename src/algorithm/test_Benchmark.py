@@ -0,0 +1,84 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+#################################################################################################################################
+# Tests of the benchmark baselines and regression gates, on fixed timings.
+#################################################################################################################################
+
+import json
+import sys
+import pytest
+
+import Benchmark
+
+
+#/**
+# * Runs the benchmark command line with the given timings per call.
+# * @return The exit status.
+# */
+def runMain(monkeypatch, times, *args):
+    results = {name: {'time': t, 'median': t, 'items': 1, 'throughput': 1.0 / t, 'calls': 1} for name, t in times.items()}
+    monkeypatch.setattr(Benchmark, 'runCases', lambda names, samples: results)
+    monkeypatch.setattr(sys, 'argv', ['Benchmark.py', '-k', 'getSun'] + list(args))
+    return Benchmark.main()
+
+
+def testSaveAndCompare(monkeypatch, tmp_path, capsys):
+    path = str(tmp_path / 'baseline.json')
+    assert runMain(monkeypatch, {'getSun': 1.0e-5}, '--save', path) == 0
+    baseline = json.load(open(path))
+    assert baseline['machine'] == Benchmark.getMachine()
+    assert baseline['cases']['getSun']['time'] == 1.0e-5
+
+    # 20% slower passes the default threshold, but not a 10% one
+    assert runMain(monkeypatch, {'getSun': 1.2e-5}, '--compare', path) == 0
+    assert runMain(monkeypatch, {'getSun': 1.2e-5}, '--compare', path, '--threshold', '0.1') == 1
+    out, err = capsys.readouterr()
+    assert 'REGRESSION' in out
+    assert 'Warning' not in err
+
+
+def testSaveKeepsOtherCases(monkeypatch, tmp_path):
+    path = str(tmp_path / 'baseline.json')
+    runMain(monkeypatch, {'getSun': 1.0e-5}, '--save', path)
+    runMain(monkeypatch, {'getMoon': 2.0e-5}, '--save', path)
+    assert sorted(json.load(open(path))['cases']) == ['getMoon', 'getSun']
+
+
+def testOtherEnvironmentWarning(monkeypatch, tmp_path, capsys):
+    path = tmp_path / 'baseline.json'
+    machine = dict(Benchmark.getMachine(), numpy='0.0')
+    path.write_text(json.dumps({'machine': machine, 'cases': {'getSun': {'time': 1.0e-5}}}))
+    assert runMain(monkeypatch, {'getSun': 2.0e-5}, '--compare', str(path)) == 1
+    assert 'different machine or environment' in capsys.readouterr().err
+
+
+def testDefaultBaselinePerEnvironment(monkeypatch, tmp_path, capsys):
+    monkeypatch.setattr(Benchmark, 'BASELINES', str(tmp_path / 'benchmarks'))
+    with pytest.raises(SystemExit):
+        runMain(monkeypatch, {'getSun': 1.0e-5}, '--compare')
+    assert 'create it with --save' in capsys.readouterr().err
+
+    assert runMain(monkeypatch, {'getSun': 1.0e-5}, '--save') == 0
+    path = Benchmark.getBaselinePath()
+    assert path.startswith(str(tmp_path)) and Benchmark.getMachine()['numpy'] in path
+    assert runMain(monkeypatch, {'getSun': 1.0e-5}, '--compare') == 0
@@ -0,0 +1,88 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+#################################################################################################################################
+# Tests of the Julian day and calendar conversions, across the Julian/Gregorian switch.
+#################################################################################################################################
+
+import numpy as np
+import pytest
+
+import Calendar
+
+
+# Dates and Julian days from Meeus, Astronomical Algorithms, chapter 7
+DATES = [((2000, 1, 1, 12), 2451545.0), ((1957, 10, 4, 19, 26, 24), 2436116.31), ((333, 1, 27, 12), 1842713.0),
+    ((-4712, 1, 1, 12), 0.0), ((1582, 10, 4), 2299159.5), ((1582, 10, 15), 2299160.5), ((-1000, 7, 12, 12), 1356001.0)]
+
+
+@pytest.mark.parametrize('date, jd', DATES)
+def testToJulianDay(date, jd):
+    assert Calendar.toJulianDay(*date) == pytest.approx(jd, abs=1e-9)
+
+
+@pytest.mark.parametrize('date, jd', DATES)
+def testGetDate(date, jd):
+    fields = Calendar.getDate(jd)
+    assert fields == tuple(date) + (0,) * (6 - len(date))
+    assert all(type(x) is int for x in fields)
+
+
+def testArrays():
+    jd = np.array([[date[1] for date in DATES]])
+    fields = Calendar.getDate(jd)
+    assert all(x.shape == jd.shape for x in fields)
+    np.testing.assert_allclose(Calendar.toJulianDay(*fields), jd, rtol=0, atol=1e-9)
+
+
+def testRoundTripToTheSecond():
+    jd = 2451545.0 + np.arange(-2000000.0, 2000000.0, 997.123456)
+    jd = np.round(jd * Calendar.SECONDS_PER_DAY) / Calendar.SECONDS_PER_DAY
+    np.testing.assert_allclose(Calendar.toJulianDay(*Calendar.getDate(jd)), jd, rtol=0, atol=1e-8)
+
+
+def testEndOfTheDay():
+    # Less than a millisecond before midnight is rounded to the next day, not to 59.999 s
+    assert Calendar.getDate(2451545.5 - 1e-9) == (2000, 1, 2, 0, 0, 0)
+    assert Calendar.getDate(2451545.5 - 1.0 / Calendar.SECONDS_PER_DAY) == (2000, 1, 1, 23, 59, 59)
+
+
+def testDateAsString():
+    text = Calendar.getDateAsString(np.array([2451545.0, 1842713.0, 0.0, -1.0]))
+    assert text.tolist() == ['2000-01-01 12:00:00 UT', '333-01-27 12:00:00 UT', '-4712-01-01 12:00:00 UT', Calendar.NO_EVENT]
+    assert Calendar.getDateAsString(2436116.31) == '1957-10-04 19:26:24 UT'
+
+
+def testDatetime64():
+    jd = np.array([2451545.0, 2436116.31, 2460310.75])
+    date = Calendar.toDatetime64(jd)
+    assert date[0] == np.datetime64('2000-01-01T12:00:00')
+    # Julian days near 2.4e6 resolve about 40 us
+    assert abs(date[1] - np.datetime64('1957-10-04T19:26:24')) < np.timedelta64(100, 'us')
+    np.testing.assert_allclose(Calendar.fromDatetime64(date), jd, rtol=0, atol=1e-9)
+    assert Calendar.fromDatetime64(np.datetime64('2024-01-01')) == 2460310.5
+
+
+@pytest.mark.parametrize('jd', [Calendar.toJulianDay(1677, 1, 1), Calendar.toJulianDay(2263, 1, 1), np.nan])
+def testDatetime64OutOfRange(jd):
+    with pytest.raises(ValueError):
+        Calendar.toDatetime64(np.array([2451545.0, jd]))
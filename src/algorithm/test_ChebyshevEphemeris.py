@@ -0,0 +1,92 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+#################################################################################################################################
+# Tests of the Chebyshev ephemeris cache against the series it is fitted to.
+#################################################################################################################################
+
+import numpy as np
+import pytest
+
+from SunMoonCalculator import SunMoonCalculator
+from ChebyshevEphemeris import ChebyshevEphemeris
+import SunMoonBatch
+
+
+# 2024-01-01 0h TT, and two months of instants between the fitting nodes
+JD_START = 2460310.5
+JD = JD_START + np.linspace(0.0, 60.0, 1001)
+
+BODIES = (SunMoonCalculator.BODY.Sun, SunMoonCalculator.BODY.Moon)
+
+
+@pytest.fixture(scope='module')
+def ephemeris():
+    return ChebyshevEphemeris.generate(JD_START, JD_START + 64.0)
+
+
+@pytest.mark.parametrize('body', BODIES)
+def testMatchesTheSeries(ephemeris, body):
+    lon, lat, distance, angR = ephemeris.getPosition(body, JD)
+    reference = ChebyshevEphemeris.evaluateSeries(body, JD)
+    error = np.abs((lon - reference[0] + np.pi) % SunMoonCalculator.TWO_PI - np.pi)
+    assert np.degrees(error).max() < ChebyshevEphemeris.ACCURACY[body]
+    assert np.degrees(np.abs(lat - reference[1])).max() < ChebyshevEphemeris.ACCURACY[body]
+    assert max(ephemeris.segments[body].fitError[:2]) < ChebyshevEphemeris.ACCURACY[body]
+
+
+def testScalarPosition(ephemeris):
+    position = ephemeris.getPosition(SunMoonCalculator.BODY.Moon, JD[10])
+    assert all(isinstance(x, float) for x in position)
+    assert position == pytest.approx([x[10] for x in ephemeris.getPosition(SunMoonCalculator.BODY.Moon, JD)], abs=1e-12)
+
+
+def testEquatorialMatchesTheBatchEngine(ephemeris):
+    ra, dec, distance = ephemeris.getEquatorial(SunMoonCalculator.BODY.Moon, JD[:50])
+    t = (JD[:50] - SunMoonCalculator.J2000) / SunMoonCalculator.JULIAN_DAYS_PER_CENTURY
+    state = SunMoonBatch.getTimeState(JD[:50], 0.0, 0.0)
+    reference = SunMoonBatch.doCalc(SunMoonBatch.getMoon(t)[0], state, 0.0, 0.0, True)
+    np.testing.assert_allclose(np.degrees(dec), np.degrees(reference.declination), rtol=0, atol=0.005)
+
+
+def testOutsideTheSpan(ephemeris):
+    with pytest.raises(ValueError):
+        ephemeris.getPosition(SunMoonCalculator.BODY.Sun, JD_START - 1.0)
+
+
+def testSaveAndLoad(ephemeris, tmp_path):
+    path = tmp_path / 'ephemeris.bin'
+    ephemeris.save(path)
+    loaded = ChebyshevEphemeris.load(path)
+    assert path.stat().st_size % ChebyshevEphemeris.HEADER_SIZE == 0
+    for body in BODIES:
+        assert isinstance(loaded.segments[body].coefficients, np.memmap)
+        np.testing.assert_array_equal(loaded.segments[body].coefficients, ephemeris.segments[body].coefficients)
+        assert loaded.segments[body].jdEnd == ephemeris.segments[body].jdEnd
+        np.testing.assert_array_equal(loaded.getPosition(body, JD)[0], ephemeris.getPosition(body, JD)[0])
+
+
+def testLoadRejectsOtherFiles(tmp_path):
+    path = tmp_path / 'other.bin'
+    path.write_bytes(b'\0' * ChebyshevEphemeris.HEADER_SIZE)
+    with pytest.raises(ValueError):
+        ChebyshevEphemeris.load(path)
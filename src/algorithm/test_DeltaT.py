@@ -0,0 +1,90 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+#################################################################################################################################
+# Tests of the Delta T provider: the range of the polynomial fits, the table lookup and loading.
+#################################################################################################################################
+
+import numpy as np
+import pytest
+
+import DeltaT
+
+
+def testPolynomialRange():
+    # Values of the polynomial fits inside (-600, 2200), and 0 outside
+    years = np.array([-700.0, -601.0, -500.0, 1000.0, 1900.0, 2000.0, 2100.0, 2199.0, 2200.0, 2300.0])
+    expected = [0.0, 0.0, 17076.541, 1567.815, 12.685, 51.920, 201.314, 438.214, 0.0, 0.0]
+    np.testing.assert_allclose(DeltaT.getPolynomialTTminusUT(years), expected, rtol=0, atol=1e-3)
+
+
+def testDefaultTableMatchesThePolynomial():
+    years = np.array([-500.0, 1000.0, 1900.0, 2000.0, 2100.0, 2199.0])
+    jd = DeltaT.yearToJulianDay(years)
+    np.testing.assert_allclose(DeltaT.getTTminusUT(jd), DeltaT.getPolynomialTTminusUT(years), rtol=0, atol=1e-6)
+    # Between the monthly samples the interpolation error is below a millisecond
+    years = 2000.0 + np.arange(12) / 37.0
+    np.testing.assert_allclose(DeltaT.getTTminusUT(DeltaT.yearToJulianDay(years)), DeltaT.getPolynomialTTminusUT(years), rtol=0, atol=1e-3)
+
+
+def testOutsideTheTable():
+    jd = DeltaT.yearToJulianDay(np.array([-700.0, 2300.0]))
+    np.testing.assert_array_equal(DeltaT.getTTminusUT(jd), [0.0, 0.0])
+    assert DeltaT.getTTminusUT(float(jd[1])) == 0.0
+
+
+def testScalarLookup():
+    provider = DeltaT.DeltaT([2451545.0, 2451555.0], [60.0, 70.0])
+    value = provider.getTTminusUT(2451550.0)
+    assert isinstance(value, float)
+    assert value == 65.0
+    assert provider.getTTminusUT(np.float64(2451555.0)) == 70.0
+    np.testing.assert_array_equal(provider.getTTminusUT(np.array([2451545.0, 2451547.5, 2451600.0])), [60.0, 62.5, 0.0])
+
+
+def testInvalidTables():
+    with pytest.raises(ValueError):
+        DeltaT.DeltaT([2451545.0], [60.0])
+    with pytest.raises(ValueError):
+        DeltaT.DeltaT([2451555.0, 2451545.0], [60.0, 70.0])
+
+
+def testLoad(tmp_path):
+    path = tmp_path / 'deltat.txt'
+    path.write_text('# year, TT-UT\n2000.0 63.8\n\n2010, 1, 1, 66.1\n2020.0,69.4\n')
+    provider = DeltaT.DeltaT.load(path)
+    assert provider.getTTminusUT(float(DeltaT.yearToJulianDay(2000.0))) == pytest.approx(63.8)
+    assert provider.getTTminusUT(float(DeltaT.yearToJulianDay(2015.0))) == pytest.approx((66.1 + 69.4) / 2)
+    # Outside the file the process wide provider is used
+    jd = float(DeltaT.yearToJulianDay(1900.0))
+    assert provider.getTTminusUT(jd) == DeltaT.getTTminusUT(jd)
+
+
+def testSetDefault():
+    previous = DeltaT.getDefault()
+    provider = DeltaT.DeltaT([2451545.0, 2451555.0], [60.0, 70.0])
+    try:
+        DeltaT.setDefault(provider)
+        assert DeltaT.getTTminusUT(2451550.0) == 65.0
+    finally:
+        DeltaT.setDefault(previous)
+    assert DeltaT.getDefault() is previous
@@ -0,0 +1,90 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+
+#################################################################################################################################
+# Tests of the columnar export. The Arrow and Parquet tests are skipped when pyarrow is missing.
+#################################################################################################################################
+
+import io
+import numpy as np
+import pytest
+
+import EphemerisExport
+import SunMoonBatch
+
+
+JD = 2460310.5 + np.arange(48) / 24.0
+OBS_LON = np.radians([-3.7, 2.35, 139.7])
+OBS_LAT = np.radians([40.4, 48.85, 35.7])
+
+
+def getSeries():
+    sun, moon, moonAge = SunMoonBatch.calcSunAndMoon(JD, OBS_LON[:, None], OBS_LAT[:, None], 0.0)
+    return {'sun': sun, 'moon': moon}
+
+
+def testColumnsAreViewsOfTheSeries():
+    bodies = getSeries()
+    columns = EphemerisExport.getColumns(bodies, JD)
+    assert list(columns)[:3] == ['jd', 'sun.azimuth', 'sun.elevation']
+    assert columns['moon.rightAscension'].shape == (len(OBS_LON) * len(JD),)
+    assert np.shares_memory(columns['moon.rightAscension'], bodies['moon'].rightAscension)
+    np.testing.assert_array_equal(columns['jd'], np.tile(JD, len(OBS_LON)))
+
+
+def testCsvRoundTrip():
+    bodies = getSeries()
+    out = io.StringIO()
+    EphemerisExport.writeCsv(bodies, out, JD, fields=('elevation', 'distance'))
+    out.seek(0)
+    header = out.readline().strip().split(',')
+    values = np.loadtxt(out, delimiter=',')
+    assert header == ['jd', 'sun.elevation', 'sun.distance', 'moon.elevation', 'moon.distance']
+    np.testing.assert_allclose(values[:, 3], bodies['moon'].elevation.ravel(), atol=1e-9)
+
+
+def testRecordBatchesShareContiguousColumns():
+    pyarrow = pytest.importorskip('pyarrow')
+    bodies = getSeries()
+    batches = list(EphemerisExport.toRecordBatches(bodies, JD))
+    table = pyarrow.Table.from_batches(batches)
+    column = table.column('sun.azimuth').chunk(0).to_numpy()
+    assert np.shares_memory(column, bodies['sun'].azimuth)
+
+
+def testRecordBatchesOfSlicedSeries():
+    pyarrow = pytest.importorskip('pyarrow')
+    moon = getSeries()['moon'][:, ::5]
+    table = pyarrow.Table.from_batches(list(EphemerisExport.toRecordBatches(moon, fields=('declination',))))
+    np.testing.assert_array_equal(table.column('declination').to_numpy(), moon.declination.ravel())
+
+
+def testParquetRoundTrip(tmp_path):
+    pytest.importorskip('pyarrow')
+    import pyarrow.parquet
+    bodies = getSeries()
+    path = str(tmp_path / 'series.parquet')
+    EphemerisExport.writeParquet(bodies, path, JD)
+    table = pyarrow.parquet.read_table(path)
+    assert table.num_rows == len(OBS_LON) * len(JD)
+    np.testing.assert_array_equal(table.column('moon.distance').to_numpy(), bodies['moon'].distance.ravel())
@@ -0,0 +1,99 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+#################################################################################################################################
+# Tests of the opt-in instrumentation: recorders, hooks and the calculator counters.
+#################################################################################################################################
+
+import math
+import pytest
+
+from SunMoonCalculator import SunMoonCalculator
+import Instrumentation
+
+
+def testDisabledByDefault():
+    assert not Instrumentation.enabled
+    assert Instrumentation.stage('calcSunAndMoon') is Instrumentation.NULL_STAGE
+
+
+def testRecordCountersAndStages():
+    with Instrumentation.record() as recorder:
+        assert Instrumentation.enabled
+        calc = SunMoonCalculator(math.radians(-4), math.radians(40), 0.0, 2021, 6, 9, 18, 0, 0)
+        calc.calcSunAndMoon()
+        calc.sun.rise
+    assert not Instrumentation.enabled
+
+    values = recorder.toDict()
+    assert values['counters']['setUTDate'] == 1
+    assert values['counters']['riseSetSolver.getEvents'] == 1
+    timing = values['timings']['calcSunAndMoon']
+    assert timing['count'] == 1
+    assert 0 < timing['min'] <= timing['mean'] <= timing['max']
+    assert sum(timing['buckets']) == 1
+    assert len(timing['buckets']) == len(Instrumentation.BUCKETS) + 1
+
+
+def testNestedRecorders():
+    with Instrumentation.record() as outer:
+        Instrumentation.count('event')
+        with Instrumentation.record() as inner:
+            Instrumentation.count('event', 2)
+        assert Instrumentation.enabled
+        Instrumentation.count('event')
+    assert outer.toDict()['counters'] == {'event': 4}
+    assert inner.toDict()['counters'] == {'event': 2}
+
+
+def testRecordHookOnExit():
+    collected = []
+    with Instrumentation.record(collected.append):
+        with Instrumentation.stage('stage'):
+            pass
+    assert collected[0]['timings']['stage']['count'] == 1
+    assert collected[0]['counters'] == {}
+
+
+def testHooks():
+    events = []
+    hook = lambda kind, name, value: events.append((kind, name, value))
+    Instrumentation.addHook(hook)
+    try:
+        assert Instrumentation.enabled
+        Instrumentation.count('event', 3)
+        Instrumentation.addTime('stage', 0.5)
+    finally:
+        Instrumentation.removeHook(hook)
+    assert not Instrumentation.enabled
+    assert events == [('count', 'event', 3), ('time', 'stage', 0.5)]
+
+
+def testHistogramBuckets():
+    histogram = Instrumentation.Histogram()
+    for seconds in (0.5e-6, 1.5e-6, 1.5e-6, 10.0):
+        histogram.add(seconds)
+    values = histogram.toDict()
+    assert values['buckets'][:2] == [1, 2]
+    assert values['buckets'][-1] == 1
+    assert values['total'] == pytest.approx(10.0000035)
+    assert Instrumentation.Histogram().toDict()['min'] == 0.0
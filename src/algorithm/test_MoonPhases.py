@@ -0,0 +1,67 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+#################################################################################################################################
+# Tests of the Moon phase finder against published instants.
+#################################################################################################################################
+
+import math
+import pytest
+
+from SunMoonCalculator import SunMoonCalculator
+import Calendar
+import MoonPhases
+
+
+PHASES = list(SunMoonCalculator.MOONPHASE)
+
+# Phases of January 2024 in UT, to the minute (USNO)
+JANUARY_2024 = [(3, 4, 3, 30), (0, 11, 11, 57), (1, 18, 3, 53), (2, 25, 17, 54)]
+
+MINUTE = 60.0 / SunMoonCalculator.SECONDS_PER_DAY
+
+
+def testPublishedInstants():
+    jd, index = MoonPhases.findPhaseTimes(Calendar.toJulianDay(2024, 1, 1), Calendar.toJulianDay(2024, 2, 1),
+        [p.value[1] for p in PHASES])
+    assert index.tolist() == [phase for phase, day, h, m in JANUARY_2024]
+    for value, (phase, day, h, m) in zip(jd, JANUARY_2024):
+        assert value == pytest.approx(Calendar.toJulianDay(2024, 1, day, h, m), abs=MINUTE)
+
+
+def testGenerateAcrossBlocks():
+    jdStart = Calendar.toJulianDay(2000, 1, 1)
+    jdEnd = jdStart + MoonPhases.BLOCK_DAYS + 100
+    events = list(MoonPhases.generateMoonPhases(jdStart, jdEnd, [SunMoonCalculator.MOONPHASE.FULL_MOON]))
+    jd = [event for event, phase in events]
+    assert all(phase == SunMoonCalculator.MOONPHASE.FULL_MOON for event, phase in events)
+    assert all(jdStart <= x < jdEnd for x in jd)
+    # Synodic months, without events repeated or lost at the end of the block
+    gaps = [b - a for a, b in zip(jd, jd[1:])]
+    assert min(gaps) > 29.2 and max(gaps) < 29.9
+    assert len(jd) == round((jd[-1] - jd[0]) / 29.530589) + 1
+
+
+def testCalculatorPhaseTime():
+    calc = SunMoonCalculator(math.radians(-4), math.radians(40), 0.0, 2024, 1, 20, 0, 0, 0)
+    jd = calc.getMoonPhaseTime(SunMoonCalculator.MOONPHASE.FULL_MOON.value[1])
+    assert jd == pytest.approx(Calendar.toJulianDay(2024, 1, 25, 17, 54), abs=MINUTE)
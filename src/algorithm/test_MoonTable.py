@@ -0,0 +1,101 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+#################################################################################################################################
+# Tests of the baked Moon table: the values, the file format and the interpolation.
+#################################################################################################################################
+
+import math
+import numpy as np
+import pytest
+
+from SunMoonCalculator import SunMoonCalculator
+import MoonTable
+
+
+# 2024-01-01 0h UT
+JD_START = 2460310.5
+
+
+def testMeeusExample():
+    # Meeus, Astronomical Algorithms, example 48.a: 1992 April 12 at 0h TD, position angle
+    # of the bright limb 285.0 degrees and distance 368410 km
+    phaseAngle, positionAngle, relativeSize = MoonTable.getValues(np.array([2448724.5]), 0.0)[0]
+    assert math.degrees(positionAngle) % 360 == pytest.approx(285.0, abs=0.1)
+    assert relativeSize == pytest.approx(MoonTable.MOON_SEMI_MAJOR_AXIS / 368410.0, rel=1e-3)
+
+
+def testPhaseAngle():
+    # New Moon 2024-01-11 11:57 UT and full Moon 2024-01-25 17:54 UT
+    jd = np.array([JD_START + 10 + (11 + 57 / 60) / 24, JD_START + 24 + (17 + 54 / 60) / 24])
+    phaseAngle = MoonTable.getValues(jd)[:, 0]
+    assert math.degrees(SunMoonCalculator.normalizeRadians(phaseAngle[0] + math.pi) - math.pi) == pytest.approx(0, abs=0.1)
+    assert math.degrees(phaseAngle[1]) == pytest.approx(180, abs=0.1)
+
+
+def testWriteAndRead(tmp_path):
+    path = tmp_path / 'moon.bin'
+    table = MoonTable.bake(JD_START, JD_START + 2)
+    assert table.shape == (49, len(MoonTable.CHANNELS))
+    assert table.dtype == np.float32
+    MoonTable.write(path, JD_START, MoonTable.STEP, table)
+    assert path.stat().st_size == MoonTable.HEADER.size + table.nbytes
+
+    jdStart, step, loaded = MoonTable.read(path)
+    assert (jdStart, step) == (JD_START, MoonTable.STEP)
+    np.testing.assert_array_equal(loaded, table)
+
+
+def testLookup():
+    table = MoonTable.bake(JD_START, JD_START + 2)
+    jd = JD_START + np.array([0.0, 0.5, 1.0 + 1.0 / 48, 2.0])
+    values = MoonTable.lookup(JD_START, MoonTable.STEP, table, jd)
+    exact = MoonTable.getValues(jd)
+    error = np.abs((values - exact)[:, :2] + math.pi) % SunMoonCalculator.TWO_PI - math.pi
+    assert np.degrees(np.abs(error)).max() < 0.01
+    np.testing.assert_allclose(values[:, 2], exact[:, 2], rtol=0, atol=1e-4)
+    # Clamped out of the table
+    np.testing.assert_array_equal(MoonTable.lookup(JD_START, MoonTable.STEP, table, JD_START - 1), table[0])
+
+
+def testLookupAlongTheShortestArc():
+    table = np.array([[6.2, -3.1, 1.0], [0.1, 3.1, 1.1]], dtype=np.float32)
+    value = MoonTable.lookup(JD_START, 1.0, table, JD_START + 0.5)
+    assert value[0] == pytest.approx(6.2 + (0.1 + 2 * math.pi - 6.2) / 2, abs=1e-6)
+    assert value[1] == pytest.approx(-3.1 - (2 * math.pi - 6.2) / 2, abs=1e-6)
+    assert value[2] == pytest.approx(1.05, abs=1e-6)
+
+
+def testRejectsTablesWithLessThanTwoRows(tmp_path):
+    with pytest.raises(ValueError):
+        MoonTable.bake(JD_START, JD_START)
+    path = tmp_path / 'moon.bin'
+    MoonTable.write(path, JD_START, MoonTable.STEP, np.zeros((1, len(MoonTable.CHANNELS)), dtype=np.float32))
+    with pytest.raises(ValueError):
+        MoonTable.read(path)
+
+
+def testRejectsOtherFiles(tmp_path):
+    path = tmp_path / 'other.bin'
+    path.write_bytes(b'\0' * 64)
+    with pytest.raises(ValueError):
+        MoonTable.read(path)
@@ -0,0 +1,88 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+#################################################################################################################################
+# Tests of the parallel grid driver against the batch engine and the almanac.
+#################################################################################################################################
+
+import math
+from multiprocessing import shared_memory
+import numpy as np
+import pytest
+
+import ParallelGrid
+import SunMoonBatch
+import Almanac
+
+
+JD_START = 2460310.75
+JD_END = 2460313.5
+STEP = 1.0 / 8
+OBS_LON = np.radians([-4.0, 139.7, -70.6])
+OBS_LAT = np.radians([40.0, 35.7, -33.4])
+OBS_ALT = np.array([650.0, 40.0, 520.0])
+FIELDS = ('azimuth', 'elevation', 'distance', 'illuminationPhase')
+
+
+def testMatchesBatchEngineAndAlmanac():
+    # Several shards of sites and days, so that the shards are put together in the output
+    out = ParallelGrid.calcGrid(JD_START, JD_END, STEP, OBS_LON, OBS_LAT, OBS_ALT, fields = FIELDS, workers = 2,
+        sitesPerShard = 2, daysPerShard = 2)
+
+    jd = JD_START + np.arange(22) * STEP
+    np.testing.assert_array_equal(out['jd'], jd)
+    geocentric = SunMoonBatch.calcGeocentric(jd)
+    sun, moon = SunMoonBatch.calcForObservers(geocentric, OBS_LON[:, None], OBS_LAT[:, None], OBS_ALT[:, None])
+    for name, series in (('sun', sun), ('moon', moon)):
+        for field in FIELDS:
+            np.testing.assert_allclose(out[name + '.' + field], getattr(series, field), rtol=0, atol=1e-12, err_msg=field)
+
+    # The grid starts at 18h, the almanac at 0h of its date
+    jd0 = 2460310.5
+    days = 3
+    for block in Almanac.generateAlmanac(jd0, days, OBS_LON, OBS_LAT, OBS_ALT):
+        site = block['site']
+        day = (block['date'] - jd0).astype(int)
+        for column, values in block.items():
+            if (column not in ('site', 'date')):
+                assert out[column].shape == (len(OBS_LON), days)
+                np.testing.assert_allclose(out[column][site, day], values, rtol=0, atol=1e-9, err_msg=column)
+
+
+def testNoAlmanac():
+    out = ParallelGrid.calcGrid(JD_START, JD_END, STEP, OBS_LON, OBS_LAT, fields = ('elevation',), twilights = None,
+        workers = 1)
+    assert sorted(out) == ['jd', 'moon.elevation', 'sun.elevation']
+
+
+def testShardErrorIsRaised():
+    # A shard failing before the time grid is read reports its own error, and closes the block
+    layout = ParallelGrid.Layout([('jd', (1,))])
+    memory = shared_memory.SharedMemory(create=True, size=layout.size)
+    try:
+        ParallelGrid.initWorker({'memory': memory.name, 'layout': layout})
+        with pytest.raises(KeyError, match='obsLon'):
+            ParallelGrid.calcShard(slice(0, 1), slice(0, 1))
+    finally:
+        ParallelGrid.initWorker(None)
+        memory.close()
+        memory.unlink()
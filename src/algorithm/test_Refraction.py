@@ -0,0 +1,102 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+#################################################################################################################################
+# Tests of the refraction models: pinned Bennet values, the convergent inverse and the tables.
+#################################################################################################################################
+
+import math
+import numpy as np
+import pytest
+
+from SunMoonCalculator import SunMoonCalculator
+import Refraction
+import SunMoonBatch
+
+
+ARCSEC = math.radians(1.0 / 3600.0)
+
+
+def testBennetValues():
+    # Refraction for 1010 mb and 10 C, in arcminutes
+    refraction = Refraction.Refraction()
+    assert math.degrees(-refraction.computeGeometricElevation(0.0)) * 60 == pytest.approx(34.435, abs=1e-3)
+    geometric = np.radians([0.0, 10.0, 45.0])
+    apparent = refraction.getApparentElevation(geometric)
+    np.testing.assert_allclose(np.degrees(apparent - geometric) * 60, [28.903, 5.340, 0.993], rtol=0, atol=1e-3)
+
+
+def testAmbientConditions():
+    geometric = math.radians(10)
+    standard = Refraction.Refraction().getApparentElevation(geometric) - geometric
+    denser = Refraction.Refraction(pressure=1050.0, temperature=-10.0).getApparentElevation(geometric) - geometric
+    assert denser / standard == pytest.approx((1050.0 / 263.15) / (1010.0 / 283.15), rel=1e-3)
+    assert Refraction.Refraction(pressure=0.0).getApparentElevation(geometric) == geometric
+
+    # Conditions broadcast against the elevations
+    apparent = Refraction.Refraction(pressure=np.array([1010.0, 1050.0]), temperature=np.array([10.0, -10.0])).getApparentElevation(np.array([geometric, geometric]))
+    np.testing.assert_allclose(apparent - geometric, [standard, denser], rtol=1e-12)
+
+
+@pytest.mark.parametrize('model', list(Refraction.MODEL))
+def testInverseConverges(model):
+    refraction = Refraction.Refraction(model)
+    geometric = np.radians(np.linspace(model.value[2] + 0.01, 89.9, 9001))
+    apparent = refraction.getApparentElevation(geometric)
+    assert np.abs(refraction.computeGeometricElevation(apparent) - geometric).max() < 1e-6 * ARCSEC
+    # Clamped to the zenith
+    assert refraction.getApparentElevation(math.pi * 0.5) == math.pi * 0.5
+
+
+@pytest.mark.parametrize('model', list(Refraction.MODEL))
+def testBelowTheMinimum(model):
+    geometric = np.radians([model.value[2] - 1.0, -90.0])
+    np.testing.assert_array_equal(Refraction.Refraction(model).getApparentElevation(geometric), geometric)
+
+
+def testRadio():
+    radio = Refraction.Refraction(Refraction.MODEL.RADIO)
+    assert math.degrees(radio.getApparentElevation(0.0)) * 60 == pytest.approx(23.344, abs=1e-3)
+    # Water vapor increases the radio refraction
+    assert Refraction.Refraction(Refraction.MODEL.RADIO, humidity=80.0).getApparentElevation(0.0) > radio.getApparentElevation(0.0)
+
+
+def testTableError():
+    refraction = Refraction.Refraction()
+    table = refraction.getTable()
+    geometric = np.radians(np.linspace(-2.999, 90.0, 100001))
+    error = np.abs(table.getApparentElevation(geometric) - refraction.getApparentElevation(geometric))
+    assert error.max() < 0.12 * ARCSEC
+    assert error[(geometric >= 0) & (geometric <= math.radians(89.9))].max() < 0.003 * ARCSEC
+    assert isinstance(table.getApparentElevation(0.1), float)
+
+
+def testDefaultModel():
+    previous = Refraction.getDefault()
+    assert isinstance(previous, Refraction.RefractionTable)
+    assert SunMoonCalculator.refraction(0.1) == SunMoonBatch.refraction(0.1) == previous.getApparentElevation(0.1)
+    radio = Refraction.Refraction(Refraction.MODEL.RADIO)
+    try:
+        Refraction.setDefault(radio)
+        assert SunMoonCalculator.refraction(0.1) == radio.getApparentElevation(0.1)
+    finally:
+        Refraction.setDefault(previous)
@@ -0,0 +1,108 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+#################################################################################################################################
+# Tests of the bracketed rise/set/transit solver against the iterations of the scalar calculator.
+#################################################################################################################################
+
+import math
+import pytest
+
+from SunMoonCalculator import SunMoonCalculator
+from RiseSetSolver import RiseSetSolver
+
+
+DATES = [(2021, 6, 9, 18, 0, 0), (2024, 1, 1, 0, 0, 0), (1990, 3, 15, 6, 30, 0)]
+
+# Longitude, latitude in degrees and altitude in m
+SITES = [(-4.0, 40.0, 0.0), (19.0, 54.0, 1000.0), (151.2, -33.9, 50.0)]
+
+# Moon events where the solver does not follow obtainAccurateRiseSetTransit: longitude and
+# latitude in degrees, Julian day in UT, event, the Julian day of the event reported by the
+# solver and the one of obtainAccurateRiseSetTransit.
+REGRESSIONS = [
+    # Candidates about half a day before and after the instant, the closer one is reported
+    (-121.577, 25.291, 2450004.2113295975, 'rise', 2450003.699155678, 2450004.7317945873),
+    (-51.785, 18.248, 2453037.274610509, 'set', 2453037.792919394, 2453036.756050915),
+    (43.391, -41.183, 2449981.4729029625, 'set', 2449981.993093287, 2449980.952091837),
+    # The Moon does not rise or set at the instant, but does within the window
+    (145.801, -69.612, 2448676.2303283527, 'rise', 2448675.835725178, -1),
+    (-127.128, 66.709, 2448120.6493001743, 'set', 2448121.7169919116, -1),
+    (144.673, 71.227, 2458109.08544539, 'rise', 2458108.6820804775, -1),
+]
+
+EVENTS = (('rise', SunMoonCalculator.EVENT.RISE), ('set', SunMoonCalculator.EVENT.SET),
+    ('transit', SunMoonCalculator.EVENT.TRANSIT))
+
+
+@pytest.mark.parametrize('date', DATES)
+@pytest.mark.parametrize('lon, lat, alt', SITES)
+def testMatchesAccurateRiseSetTransit(date, lon, lat, alt):
+    calc = SunMoonCalculator(math.radians(lon), math.radians(lat), alt, *date)
+    sun, moon, moonAge = SunMoonCalculator.calcPositionsAt(calc.state)
+    solver = RiseSetSolver.fromCalculator(calc)
+    for body, isSun in ((sun, True), (moon, False)):
+        events = solver.getEvents(calc.state.jd_UT, isSun)
+        for name, event in EVENTS:
+            expected = calc.obtainAccurateRiseSetTransit(getattr(body, name), event, 15, isSun)
+            assert getattr(events, name) == pytest.approx(expected, abs=1.0 / SunMoonCalculator.SECONDS_PER_DAY), name
+
+
+@pytest.mark.parametrize('lon, lat, jd, name, solver, accurate', REGRESSIONS)
+def testChoiceBetweenCandidates(lon, lat, jd, name, solver, accurate):
+    calc = SunMoonCalculator(math.radians(lon), math.radians(lat), 0.0, 2000, 1, 1, 12, 0, 0)
+    calc.setUTDate(jd)
+    event = SunMoonCalculator.EVENT.RISE if name == 'rise' else SunMoonCalculator.EVENT.SET
+    moon = SunMoonCalculator.calcPositionsAt(calc.state)[1]
+    expected = calc.obtainAccurateRiseSetTransit(getattr(moon, name), event, 15, False)
+    assert expected == pytest.approx(accurate, abs=1.0 / SunMoonCalculator.SECONDS_PER_DAY)
+
+    value = getattr(RiseSetSolver.fromCalculator(calc).getEvents(jd, False), name)
+    assert value == pytest.approx(solver, abs=1.0 / SunMoonCalculator.SECONDS_PER_DAY)
+    # It is an actual event, the iterations starting there stay there
+    assert calc.obtainAccurateRiseSetTransit(value, event, 15, False) == pytest.approx(value, abs=1.0 / SunMoonCalculator.SECONDS_PER_DAY)
+
+
+def testNoEventsInPolarDay():
+    # Midsummer north of the arctic circle: the Sun neither rises nor sets
+    calc = SunMoonCalculator(0.0, math.radians(75), 0.0, 2024, 6, 21, 12, 0, 0)
+    events = RiseSetSolver.fromCalculator(calc).getEvents(calc.state.jd_UT, True)
+    assert events.rise == -1
+    assert events.set == -1
+    assert events.transit != -1
+
+
+def testTransitElevationRefractedOnlyWhenTheTierDoes():
+    calc = SunMoonCalculator(math.radians(-4), math.radians(40), 0.0, *DATES[0])
+    full = RiseSetSolver.fromCalculator(calc).getEvents(calc.state.jd_UT, True)
+    calc.setAccuracy(SunMoonCalculator.ACCURACY.RENDER)
+    render = RiseSetSolver.fromCalculator(calc).getEvents(calc.state.jd_UT, True)
+    # Refraction at the 73 degrees of the Sun is about 18"
+    assert math.degrees(full.transitElevation - render.transitElevation) * 3600 == pytest.approx(18, abs=2)
+
+
+def testLazyEventsUseTheSolver():
+    calc = SunMoonCalculator(math.radians(-4), math.radians(40), 0.0, *DATES[0])
+    calc.calcSunAndMoon()
+    events = RiseSetSolver.fromCalculator(calc).getEvents(calc.state.jd_UT, False)
+    assert calc.moon.rise == events.rise
+    assert calc.moon.transitElevation == events.transitElevation
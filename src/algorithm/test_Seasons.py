@@ -0,0 +1,60 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+#################################################################################################################################
+# Tests of the equinox and solstice finder against published instants.
+#################################################################################################################################
+
+import numpy as np
+import pytest
+
+from SunMoonCalculator import SunMoonCalculator
+import Calendar
+import Seasons
+
+
+# Equinoxes and solstices of 2024 in UT, to the minute (USNO)
+SEASONS_2024 = [(3, 20, 3, 6), (6, 20, 20, 51), (9, 22, 12, 44), (12, 21, 9, 20)]
+
+MINUTE = 60.0 / SunMoonCalculator.SECONDS_PER_DAY
+
+
+def testPublishedInstants():
+    jd = Seasons.findSeasons(2024, 2024)
+    assert jd.shape == (1, 4)
+    for value, (month, day, h, m) in zip(jd[0], SEASONS_2024):
+        assert value == pytest.approx(Calendar.toJulianDay(2024, month, day, h, m), abs=MINUTE)
+
+
+def testApparentLongitudeAtTheEvents():
+    jd = Seasons.findSeasons(1990, 2030)
+    longitude = np.mod(Seasons.getApparentLongitude(jd), SunMoonCalculator.TWO_PI)
+    expected = SunMoonCalculator.TWO_PI * np.array([s.value[1] for s in SunMoonCalculator.SEASON])
+    error = np.mod(longitude - expected + np.pi, SunMoonCalculator.TWO_PI) - np.pi
+    assert np.abs(error).max() < 1e-8
+
+
+def testGenerateInChronologicalOrder():
+    events = list(Seasons.generateSeasons(2023, 2024))
+    assert [season for jd, season in events] == list(SunMoonCalculator.SEASON) * 2
+    assert all(a[0] < b[0] for a, b in zip(events, events[1:]))
+    assert events[4][0] == Seasons.findSeasons(2024, 2024)[0, 0]
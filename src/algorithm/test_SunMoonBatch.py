@@ -0,0 +1,143 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+#################################################################################################################################
+# Tests of the batch engine against the scalar calculator, at fixed instants and sites.
+#################################################################################################################################
+
+import math
+import numpy as np
+import pytest
+
+from SunMoonCalculator import SunMoonCalculator
+import Calendar
+import SunMoonBatch
+
+
+DATES = [(2021, 6, 9, 18, 0, 0), (2024, 1, 1, 0, 0, 0), (1990, 3, 15, 6, 30, 0)]
+JD = np.array([Calendar.toJulianDay(*date) for date in DATES])
+
+# Longitude, latitude in degrees and altitude in m
+SITES = [(-4.0, 40.0, 0.0), (19.0, 54.0, 1000.0), (151.2, -33.9, 50.0)]
+
+FIELDS = ('azimuth', 'elevation', 'rightAscension', 'declination', 'distance', 'eclipticLongitude',
+    'eclipticLatitude', 'angularRadius', 'illuminationPhase')
+
+
+def getCalculator(date, lon, lat, alt):
+    return SunMoonCalculator(math.radians(lon), math.radians(lat), alt, *date)
+
+
+@pytest.mark.parametrize('lon, lat, alt', SITES)
+def testMatchesScalarCalculator(lon, lat, alt):
+    sun, moon, moonAge = SunMoonBatch.calcSunAndMoon(JD, math.radians(lon), math.radians(lat), alt)
+    for i, date in enumerate(DATES):
+        calc = getCalculator(date, lon, lat, alt)
+        calc.calcSunAndMoon()
+        for series, body in ((sun, calc.sun), (moon, calc.moon)):
+            for field in FIELDS:
+                assert getattr(series, field)[i] == pytest.approx(getattr(body, field), abs=1e-12), field
+        assert moonAge[i] == pytest.approx(calc.moonAge, abs=1e-12)
+
+
+def testObserversShareTheGeocentricState():
+    obsLon = np.radians([site[0] for site in SITES])
+    obsLat = np.radians([site[1] for site in SITES])
+    obsAlt = np.array([site[2] for site in SITES])
+    geocentric = SunMoonBatch.calcGeocentric(JD)
+    sun, moon = SunMoonBatch.calcForObservers(geocentric, obsLon[:, None], obsLat[:, None], obsAlt[:, None])
+    assert sun.elevation.shape == (len(SITES), len(JD))
+
+    for i in range(len(SITES)):
+        single = SunMoonBatch.calcSunAndMoon(JD, obsLon[i], obsLat[i], obsAlt[i])
+        np.testing.assert_allclose(sun.elevation[i], single[0].elevation, rtol=0, atol=1e-12)
+        np.testing.assert_allclose(moon.rightAscension[i], single[1].rightAscension, rtol=0, atol=1e-12)
+
+
+def testScalarInstant():
+    sun, moon, moonAge = SunMoonBatch.calcSunAndMoon(JD[0], math.radians(-4), math.radians(40), 0.0)
+    calc = getCalculator(DATES[0], -4.0, 40.0, 0.0)
+    calc.calcSunAndMoon()
+    assert np.ndim(sun.azimuth) == 0
+    assert float(moon.elevation) == pytest.approx(calc.moon.elevation, abs=1e-12)
+
+
+# Documented maximum errors of the tiers against FULL, see SunMoonCalculator.ACCURACY: Moon
+# longitude, latitude (degrees), angular radius (%), Sun longitude, phase angle and position
+# angle of the bright limb (degrees).
+TIER_ERRORS = {
+    SunMoonCalculator.ACCURACY.STANDARD: (0.0055, 0.0058, 0.025, 0.0016, 0.006, 0.03),
+    SunMoonCalculator.ACCURACY.RENDER: (0.038, 0.035, 0.2, 0.011, 0.040, 0.2),
+}
+
+
+def getPhaseAndPositionAngle(geocentric):
+    sun = geocentric.sun
+    moon = geocentric.moon
+    sunRA = np.arctan2(sun.y, sun.x)
+    sunDec = np.arctan2(sun.z, np.hypot(sun.x, sun.y))
+    moonRA = np.arctan2(moon.y, moon.x)
+    moonDec = np.arctan2(moon.z, np.hypot(moon.x, moon.y))
+    dRA = sunRA - moonRA
+    positionAngle = np.arctan2(np.cos(sunDec) * np.sin(dRA),
+        np.sin(sunDec) * np.cos(moonDec) - np.cos(sunDec) * np.sin(moonDec) * np.cos(dRA))
+    return moon.eclipticLongitude - sun.eclipticLongitude, positionAngle
+
+
+def getMaxDifference(a, b):
+    return np.degrees(np.abs(SunMoonBatch.normalizeRadians(a - b + math.pi) - math.pi)).max()
+
+
+@pytest.mark.parametrize('accuracy', list(TIER_ERRORS))
+def testAccuracyTierBounds(accuracy):
+    # Random instants over 1800-2200
+    jd = np.random.default_rng(3).uniform(2378496.5, 2524593.5, 5000)
+    full = SunMoonBatch.calcGeocentric(jd, 69.0)
+    tier = SunMoonBatch.calcGeocentric(jd, 69.0, accuracy)
+    fullPhase, fullLimb = getPhaseAndPositionAngle(full)
+    tierPhase, tierLimb = getPhaseAndPositionAngle(tier)
+    # The position angle is only defined away from the new and full Moon
+    limb = np.abs(np.cos(fullPhase)) < math.cos(math.radians(10))
+
+    errors = (getMaxDifference(tier.moon.eclipticLongitude, full.moon.eclipticLongitude),
+        getMaxDifference(tier.moon.eclipticLatitude, full.moon.eclipticLatitude),
+        np.abs(tier.moon.angularRadius / full.moon.angularRadius - 1).max() * 100,
+        getMaxDifference(tier.sun.eclipticLongitude, full.sun.eclipticLongitude),
+        getMaxDifference(tierPhase, fullPhase),
+        getMaxDifference(tierLimb[limb], fullLimb[limb]))
+    for error, bound in zip(errors, TIER_ERRORS[accuracy]):
+        assert 0 < error <= bound
+    # Most of the bound is reached, so the tier is not more accurate than documented
+    assert errors[0] > 0.5 * TIER_ERRORS[accuracy][0]
+
+
+def testFullTierUnchanged():
+    # Values computed before the accuracy tiers were added, which FULL must reproduce exactly
+    jd = 2459375.25 + np.arange(8)[::3] * 0.37
+    sun, moon, moonAge = SunMoonBatch.calcSunAndMoon(jd, math.radians(-4), math.radians(40), 650.0,
+        accuracy=SunMoonCalculator.ACCURACY.FULL)
+    assert moon.elevation.tolist() == [0.17531663705496608, -0.10603580273285444, -0.3202150450157278]
+    assert moon.rightAscension.tolist() == [1.2067276724329012, 1.456600026358344, 1.7181696826352368]
+    assert moon.distance.tolist() == [0.0027010005526062176, 0.0027017461490418176, 0.002694940563964236]
+    assert sun.azimuth.tolist() == [4.987835806016566, 5.424870387568597, 6.021071883272294]
+    assert sun.declination.tolist() == [0.4012480938052193, 0.40267964741378365, 0.40396875240889085]
+    assert moonAge.tolist() == [28.901117158196943, 0.36695154395649154, 1.3749806759912744]
@@ -0,0 +1,331 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+#################################################################################################################################
+# Tests of the scalar calculator.
+#################################################################################################################################
+
+import copy
+import math
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+
+from SunMoonCalculator import SunMoonCalculator
+import SunMoonBatch
+
+
+JD = 2460310.5
+TT_MINUS_UT = 69.0
+
+# Geocentric apparent right ascension, declination (degrees) and distance (AU) of the planets
+# at 0h TT, from the theory of Simon et al. (1994) with light time, aberration and the
+# IAU 2006/2000A precession-nutation. The third date of each planet is the one of its
+# largest error over 1900-2050.
+PLANETS = [
+    (SunMoonCalculator.BODY.MERCURY, 2447892.5, 297.686413905, -20.522144556, 0.782241),
+    (SunMoonCalculator.BODY.MERCURY, 2460310.5, 261.786897153, -20.153634649, 0.777532),
+    (SunMoonCalculator.BODY.MERCURY, 2433300.5, 296.650274397, -17.795247519, 0.664318),
+    (SunMoonCalculator.BODY.VENUS, 2447892.5, 308.202320089, -16.981255673, 0.307659),
+    (SunMoonCalculator.BODY.VENUS, 2460310.5, 240.949705554, -18.769046571, 1.181904),
+    (SunMoonCalculator.BODY.VENUS, 2453750.5, 293.893433850, -15.839280045, 0.266943),
+    (SunMoonCalculator.BODY.MARS, 2447892.5, 247.982553565, -21.927602740, 2.310449),
+    (SunMoonCalculator.BODY.MARS, 2460310.5, 267.052220535, -23.961319298, 2.423806),
+    (SunMoonCalculator.BODY.MARS, 2419360.5, 61.570622648, 21.853679991, 0.511776),
+    (SunMoonCalculator.BODY.JUPITER, 2447892.5, 95.672172928, 23.222222433, 4.170424),
+    (SunMoonCalculator.BODY.JUPITER, 2460310.5, 33.690166264, 12.266548519, 4.481221),
+    (SunMoonCalculator.BODY.JUPITER, 2469030.5, 48.122668932, 16.596082098, 4.005842),
+    (SunMoonCalculator.BODY.SATURN, 2447892.5, 286.888365916, -22.237818839, 11.006081),
+    (SunMoonCalculator.BODY.SATURN, 2460310.5, 335.770651329, -11.843493161, 10.295029),
+    (SunMoonCalculator.BODY.SATURN, 2419740.5, 58.063776619, 17.967182100, 8.112192),
+    (SunMoonCalculator.BODY.URANUS, 2447892.5, 276.296210712, -23.587129872, 20.358707),
+    (SunMoonCalculator.BODY.URANUS, 2460310.5, 47.018715486, 17.278910936, 18.973915),
+    (SunMoonCalculator.BODY.URANUS, 2438840.5, 163.758607875, 7.797662973, 17.336331),
+    (SunMoonCalculator.BODY.NEPTUNE, 2447892.5, 282.981370572, -22.055062094, 31.193034),
+    (SunMoonCalculator.BODY.NEPTUNE, 2460310.5, 355.972465593, -3.091929515, 30.143097),
+    (SunMoonCalculator.BODY.NEPTUNE, 2430440.5, 179.112519959, 1.857257407, 29.252800),
+]
+
+# Stated geocentric accuracy of each planet in arcminutes, see planet_elements.
+PLANET_ACCURACY = {
+    SunMoonCalculator.BODY.MERCURY: 0.4,
+    SunMoonCalculator.BODY.VENUS: 0.7,
+    SunMoonCalculator.BODY.MARS: 2.7,
+    SunMoonCalculator.BODY.JUPITER: 10.6,
+    SunMoonCalculator.BODY.SATURN: 12.3,
+    SunMoonCalculator.BODY.URANUS: 2.1,
+    SunMoonCalculator.BODY.NEPTUNE: 1.2,
+}
+
+
+def testCacheHitsAndMisses():
+    cache = SunMoonCalculator.TimeStateCache(maxSize = 4)
+    state = cache.get(JD, TT_MINUS_UT)
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert cache.get(JD, TT_MINUS_UT) is state
+    assert (cache.hits, cache.misses) == (1, 1)
+    # TT minus UT is part of the key
+    assert cache.get(JD, TT_MINUS_UT + 1) is not state
+    assert (cache.hits, cache.misses) == (1, 2)
+    cache.clear()
+    assert (cache.hits, cache.misses, len(cache.entries)) == (0, 0, 0)
+
+
+def testCacheEvictsTheLeastRecentlyUsed():
+    cache = SunMoonCalculator.TimeStateCache(maxSize = 3)
+    for i in range(3):
+        cache.get(JD + i, TT_MINUS_UT)
+    # Using the first instant makes the second one the least recently used
+    cache.get(JD, TT_MINUS_UT)
+    cache.get(JD + 3, TT_MINUS_UT)
+    assert [key[0] for key in cache.entries] == [JD + 2, JD, JD + 3]
+    misses = cache.misses
+    cache.get(JD + 1, TT_MINUS_UT)
+    assert cache.misses == misses + 1
+    assert [key[0] for key in cache.entries] == [JD, JD + 3, JD + 1]
+
+
+@pytest.mark.parametrize('maxSize', [0, 1])
+def testCacheCapacity(maxSize):
+    cache = SunMoonCalculator.TimeStateCache(maxSize = maxSize)
+    exact = cache.get(JD, TT_MINUS_UT)
+    assert cache.get(JD, TT_MINUS_UT) == exact
+    cache.get(JD + 1, TT_MINUS_UT)
+    assert len(cache.entries) == maxSize
+    cache.get(JD + 1, TT_MINUS_UT)
+    # Each repeated instant is a hit only when there is room for it
+    assert cache.hits == 2 * maxSize
+
+
+def testCacheMatchesTheDirectComputation():
+    t, nutLon, nutObl, meanObliquity, gast = SunMoonCalculator.TimeStateCache().get(JD + 0.3, TT_MINUS_UT)
+    assert t == (JD + 0.3 + TT_MINUS_UT / SunMoonCalculator.SECONDS_PER_DAY - SunMoonCalculator.J2000) / SunMoonCalculator.JULIAN_DAYS_PER_CENTURY
+    assert (nutLon, nutObl) == SunMoonCalculator.getNutation(t)
+    assert meanObliquity == SunMoonCalculator.getMeanObliquity(t)
+    assert gast == SunMoonCalculator.getApparentSiderealTime(JD + 0.3, nutLon, meanObliquity + nutObl)
+
+
+@pytest.mark.parametrize('tolerance', [1e-9, 1e-7])
+def testInterpolatedNutationWithinTolerance(tolerance):
+    cache = SunMoonCalculator.TimeStateCache(maxSize = 100000, tolerance = tolerance)
+    jd = JD + np.linspace(0.0, 60.0, 2001)
+    for x in jd.tolist():
+        t, nutLon, nutObl, meanObliquity, gast = cache.get(x, TT_MINUS_UT)
+        exactLon, exactObl = SunMoonCalculator.getNutation(t)
+        assert abs(nutLon - exactLon) <= tolerance
+        assert abs(nutObl - exactObl) <= tolerance
+        assert abs(meanObliquity - SunMoonCalculator.getMeanObliquity(t)) <= tolerance
+    # The nodes are shared by the nearby instants
+    assert len(cache.nodes) < len(jd) / 10
+
+
+def testSharedCacheInTheCalculator():
+    previous = SunMoonCalculator.timeStateCache
+    SunMoonCalculator.timeStateCache = SunMoonCalculator.TimeStateCache()
+    try:
+        calc = SunMoonCalculator(math.radians(-4), math.radians(40), 0.0, 2024, 1, 1, 0, 0, 0)
+        other = SunMoonCalculator(math.radians(19), math.radians(54), 0.0, 2024, 1, 1, 0, 0, 0)
+        assert SunMoonCalculator.timeStateCache.hits >= 1
+        assert calc.state.t == other.state.t
+    finally:
+        SunMoonCalculator.timeStateCache = previous
+
+
+@pytest.mark.parametrize('body, jd, ra, dec, distance', PLANETS)
+def testPlanetPositions(body, jd, ra, dec, distance):
+    state = SunMoonCalculator.getState(jd, 0.0, 0.0, 0.0, 0.0)
+    position = SunMoonCalculator.getPlanetPosition(body, state.t)
+    ephemeris = SunMoonCalculator.calcBody(state, [float(x) for x in position], True)
+
+    ra = math.radians(ra)
+    dec = math.radians(dec)
+    cosSeparation = math.sin(dec) * math.sin(ephemeris.declination) + math.cos(dec) * math.cos(ephemeris.declination) * math.cos(ra - ephemeris.rightAscension)
+    assert math.degrees(math.acos(min(cosSeparation, 1.0))) * 60 < PLANET_ACCURACY[body]
+    assert ephemeris.distance == pytest.approx(distance, rel=2e-3)
+
+
+def testScalarPlanet():
+    calc = SunMoonCalculator(math.radians(-4), math.radians(40), 0.0, 2024, 1, 1, 0, 0, 0)
+    for body in SunMoonBatch.PLANETS:
+        position = calc.getPlanet(body)
+        assert all(type(x) is float for x in position)
+        assert position == [float(x) for x in SunMoonCalculator.getPlanetPosition(body, calc.state.t)]
+
+
+def testBatchPlanetsMatchScalarCalculator():
+    jd = 2460310.5 + np.array([0.0, 100.25, 200.5])
+    planets = SunMoonBatch.calcPlanets(jd, math.radians(-4), math.radians(40), 0.0)
+    assert set(planets) == set(PLANET_ACCURACY)
+    for i, x in enumerate(jd.tolist()):
+        calc = SunMoonCalculator(math.radians(-4), math.radians(40), 0.0, 2000, 1, 1, 12, 0, 0)
+        calc.setUTDate(x)
+        sun = calc.doCalc(calc.getSun(), False)
+        for body, series in planets.items():
+            ephemeris = calc.doCalc(calc.getPlanet(body), False)
+            SunMoonCalculator.calcIlluminationPhase(ephemeris, sun)
+            assert series.rightAscension[i] == pytest.approx(ephemeris.rightAscension, abs=1e-12)
+            assert series.elevation[i] == pytest.approx(ephemeris.elevation, abs=1e-12)
+            assert series.illuminationPhase[i] == pytest.approx(ephemeris.illuminationPhase, abs=1e-9)
+
+
+@pytest.mark.parametrize('body', [SunMoonCalculator.BODY.Sun, SunMoonCalculator.BODY.Moon, SunMoonCalculator.BODY.EMB])
+def testNotAPlanet(body):
+    with pytest.raises(ValueError):
+        SunMoonCalculator.getPlanetPosition(body, 0.24)
+    with pytest.raises(ValueError):
+        SunMoonBatch.calcPlanets(2460310.5, 0.0, 0.0, 0.0, bodies=(body,))
+
+
+def getFields(ephemeris):
+    return tuple(getattr(ephemeris, name) for name in SunMoonCalculator.Ephemeris.__slots__)
+
+
+def testPureCoreLeavesInputsUnchanged():
+    calc = SunMoonCalculator(math.radians(-4), math.radians(40), 650.0, 2021, 6, 9, 18, 0, 0)
+    state = calc.state
+    sunPos = calc.getSun()
+    moonPos = calc.getMoon()
+    inputs = (list(sunPos), list(moonPos))
+    results = (calc.sun, calc.moon, calc.moonAge)
+
+    sun = SunMoonCalculator.calcBody(state, sunPos, False)
+    moon = SunMoonCalculator.calcBody(state, moonPos, False)
+    assert (sunPos, moonPos) == inputs
+    sunFields = getFields(sun)
+    SunMoonCalculator.calcIlluminationPhase(moon, sun)
+    assert getFields(sun) == sunFields
+
+    # The iterations and the phase search use their own states, not the one of the calculator
+    transit = calc.obtainAccurateRiseSetTransit(sun.transit, SunMoonCalculator.EVENT.TRANSIT, 10, True)
+    assert transit != state.jd_UT
+    calc.getMoonPhaseTime(SunMoonCalculator.MOONPHASE.FULL_MOON.value[1])
+    assert calc.state is state
+    assert (calc.sun, calc.moon, calc.moonAge) == results
+
+    sunAt, moonAt, moonAge = SunMoonCalculator.calcSunAndMoonAt(state)
+    assert calc.state is state
+    assert (calc.sun, calc.moon, calc.moonAge) == results
+    assert getFields(sunAt)[:2] == sunFields[:2]
+
+
+def testThreadsMatchSerialCalls():
+    # One state per site and instant, and one calculator shared by all the threads
+    rng = np.random.default_rng(1)
+    states = [SunMoonCalculator.getState(jd, lon, lat, 0.0, TT_MINUS_UT)
+        for jd, lon, lat in zip(JD + rng.uniform(0, 365, 48), rng.uniform(-math.pi, math.pi, 48), rng.uniform(-1.2, 1.2, 48))]
+    calc = SunMoonCalculator(math.radians(-4), math.radians(40), 0.0, 2024, 1, 1, 0, 0, 0)
+
+    def calcAt(state):
+        sun, moon, moonAge = SunMoonCalculator.calcSunAndMoonAt(state)
+        set = calc.obtainAccurateRiseSetTransit(state.jd_UT, SunMoonCalculator.EVENT.SET, 5, False)
+        return getFields(sun), getFields(moon), moonAge, set
+
+    serial = [calcAt(state) for state in states]
+    with ThreadPoolExecutor(8) as executor:
+        threaded = list(executor.map(calcAt, states))
+    assert threaded == serial
+
+
+# Sun and Moon fields in the order of PINNED_FIELDS and the Moon's age at three sites and
+# instants, computed before the accuracy tiers were added. FULL must reproduce them exactly.
+PINNED_FIELDS = ('azimuth', 'elevation', 'rightAscension', 'declination', 'distance', 'eclipticLongitude', 'angularRadius',
+    'illuminationPhase', 'rise', 'set', 'transit', 'transitElevation')
+PINNED = [
+    ((-4, 40, 0), (2021, 6, 9, 18, 0, 0), 28.901117158196943,
+        (4.987835806002292, 0.3037525414588819, 1.3641168201041394, 0.4012480962418237, 1.015223579121828, 1.3807760733730499, 0.004582618193984594, 100, 2459375.6991880406, 2459375.322123334, 2459375.010629235, 1.273683352298412),
+        (5.061177660230687, 0.17531820865197245, 1.2067289965374917, 0.3779214959636125, 0.0027010012989432657, 1.2467631764676985, 0.00428766210168924, 0.5452493886888454, 2459375.6935167154, 2459375.294745756, 2459374.97905325, 1.2419918464)),
+    ((139.7, 35.7, 40), (1987, 3, 14, 3, 25, 0), 13.411306674554703,
+        (3.3792050598724575, 0.8850952556341091, 6.17123639327619, -0.04838012655827289, 0.9940119369584041, 6.161284998101686, 0.004680310027468483, 100, 2446869.3704868676, 2446868.865965703, 2446868.6185209895, 0.899399412099688),
+        (0.4993232369167586, -0.6712591571211105, 2.7871785754375584, 0.19657189379296103, 0.002660832802977565, 2.731589932657363, 0.004408386351684517, 98.02963492459563, 2446868.81220141, 2446869.3654037137, 2446869.0922267428, 1.1042214771833734)),
+    ((-70.6, -33.4, 520), (2046, 11, 2, 22, 10, 30), 4.8763260625479505,
+        (4.527237130462131, 0.19952704747813485, 3.8089091141659384, -0.26203721982005607, 0.9922578808515349, 3.851157459984235, 0.004688699809129929, 100, 2468652.903161337, 2468652.4659243263, 2468652.184681345, 1.2486905287741639),
+        (5.013858767773948, 1.1793117748078519, 4.90039668140241, -0.4270605675661763, 0.002506374846016149, 4.888753637603847, 0.004561892552980436, 24.457467003782398, 2468652.0448878505, 2468652.665504857, 2468652.3568439516, 1.417930725384713)),
+]
+
+
+@pytest.mark.parametrize('site, date, moonAge, sun, moon', PINNED)
+def testFullTierUnchanged(site, date, moonAge, sun, moon):
+    calc = SunMoonCalculator(math.radians(site[0]), math.radians(site[1]), site[2], *date)
+    calc.setAccuracy(SunMoonCalculator.ACCURACY.FULL)
+    calc.calcSunAndMoon()
+    assert tuple(getattr(calc.sun, name) for name in PINNED_FIELDS) == sun
+    assert tuple(getattr(calc.moon, name) for name in PINNED_FIELDS) == moon
+    assert calc.moonAge == moonAge
+
+
+def getResultCalculator():
+    calc = SunMoonCalculator(math.radians(-4), math.radians(40), 650.0, 2021, 6, 9, 18, 0, 0)
+    calc.calcSunAndMoon()
+    return calc
+
+
+def testEventsComputedOnlyWhenRead():
+    calc = getResultCalculator()
+    result = calc.result
+    calc.sun.azimuth, calc.moon.elevation, calc.moonAge, calc.moon.illuminationPhase
+    assert 'solver' not in vars(result)
+
+    # The events of a body are computed together, once
+    calc.moon.rise
+    assert result.solver.evaluations == result.solver.NODES
+    calc.moon.set, calc.moon.transit, calc.moon.transitElevation
+    assert result.solver.evaluations == result.solver.NODES
+    assert 'sunEvents' not in vars(result)
+    calc.sun.transit
+    assert result.solver.evaluations == 2 * result.solver.NODES
+
+
+def testAssignedEventsAreKept():
+    calc = getResultCalculator()
+    calc.moon.rise = 2459375.5
+    calc.sun.transitElevation = 1.0
+    assert (calc.moon.rise, calc.sun.transitElevation) == (2459375.5, 1.0)
+    assert 'solver' not in vars(calc.result)
+
+    # The other events still come from the solver, and an assignment replaces them
+    assert calc.moon.set == calc.result.moonEvents.set
+    calc.moon.set = -1
+    assert calc.moon.set == -1
+    assert calc.moon.rise == 2459375.5
+
+
+@pytest.mark.parametrize('clone', [copy.copy, copy.deepcopy, lambda x: pickle.loads(pickle.dumps(x))])
+def testCopiesArePlainEphemeris(clone):
+    calc = getResultCalculator()
+    calc.sun.set = 2459375.25
+    for ephemeris in (calc.sun, calc.moon):
+        out = clone(ephemeris)
+        assert type(out) is SunMoonCalculator.Ephemeris
+        assert getFields(out) == getFields(ephemeris)
+    assert clone(calc.sun).set == 2459375.25
+
+
+@pytest.mark.parametrize('date', [(2021, 6, 9, 18, 0, 0), (1990, 3, 15, 6, 30, 0)])
+@pytest.mark.parametrize('lon, lat', [(-4.0, 40.0), (151.2, -33.9), (25.0, 69.0)])
+def testLazyResultMatchesEagerCalculation(date, lon, lat):
+    calc = SunMoonCalculator(math.radians(lon), math.radians(lat), 0.0, *date)
+    calc.calcSunAndMoon()
+    sun, moon, moonAge = SunMoonCalculator.calcSunAndMoonAt(calc.state)
+    assert getFields(calc.sun) == getFields(sun)
+    assert getFields(calc.moon) == getFields(moon)
+    assert calc.moonAge == moonAge
@@ -0,0 +1,156 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+#################################################################################################################################
+# Tests of the asyncio service: request coalescing, batching and cancellation. The computations
+# run in a thread pool, so the tests can look at the batches sent to it.
+#################################################################################################################################
+
+import asyncio
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+
+from SunMoonCalculator import SunMoonCalculator
+from SunMoonService import SunMoonService
+import SunMoonBatch
+
+
+# 2024-01-01 12:00:30 UT, the center of its one minute bucket
+JD = 2460311.0 + 30.0 / SunMoonCalculator.SECONDS_PER_DAY
+OBS_LON = math.radians(-4)
+OBS_LAT = math.radians(40)
+
+
+#/**
+# * Thread pool keeping the size of each batch submitted, and optionally holding the
+# * computations until released.
+# */
+class RecordingExecutor(ThreadPoolExecutor):
+
+    def __init__(self, hold = False):
+        super().__init__(2)
+        self.batches = []
+        self.release = threading.Event()
+        if (not hold):
+            self.release.set()
+
+    def submit(self, fn, keys):
+        self.batches.append(len(keys))
+        def run():
+            self.release.wait()
+            return fn(keys)
+        return super().submit(run)
+
+
+def run(test, hold = False):
+    executor = RecordingExecutor(hold)
+    try:
+        return asyncio.run(test(SunMoonService(executor = executor), executor))
+    finally:
+        executor.release.set()
+        executor.shutdown()
+
+
+def testConcurrentRequestsShareOneComputation():
+    async def test(service, executor):
+        # Same bucket and site within the resolution
+        requests = [service.calc(JD + i / SunMoonCalculator.SECONDS_PER_DAY, OBS_LON + i * 1e-6, OBS_LAT) for i in range(-10, 10)]
+        return service, executor, await asyncio.gather(*requests)
+
+    service, executor, results = run(test)
+    assert (service.requests, service.computations, service.batches) == (20, 1, 1)
+    assert executor.batches == [1]
+    assert all(result is results[0] for result in results)
+    assert service.pending == {}
+
+
+def testBatchesSplitAtBatchSize():
+    async def test(service, executor):
+        n = 2 * service.BATCH_SIZE + 1
+        first = [service.calc(JD, OBS_LON + i * 0.01, OBS_LAT) for i in range(n)]
+        results = await asyncio.gather(*first)
+        assert executor.batches == [service.BATCH_SIZE, service.BATCH_SIZE, 1]
+        return service, executor, results
+
+    service, executor, results = run(test)
+    assert service.computations == 2 * service.BATCH_SIZE + 1
+    assert len(set(id(result) for result in results)) == len(results)
+
+
+def testBatchPerLoopIteration():
+    async def test(service, executor):
+        first = asyncio.ensure_future(service.calc(JD, OBS_LON, OBS_LAT))
+        second = asyncio.ensure_future(service.calc(JD, OBS_LON + 0.1, OBS_LAT))
+        # Both requests are queued in the same iteration, and flushed in the next one
+        await asyncio.sleep(0)
+        assert executor.batches == []
+        await asyncio.sleep(0)
+        assert executor.batches == [2]
+        third = asyncio.ensure_future(service.calc(JD, OBS_LON + 0.2, OBS_LAT))
+        await asyncio.gather(first, second, third)
+        assert executor.batches == [2, 1]
+        return service
+
+    assert run(test).batches == 2
+
+
+def testCancelledRequestDoesNotCancelTheComputation():
+    async def test(service, executor):
+        first = asyncio.ensure_future(service.calc(JD, OBS_LON, OBS_LAT))
+        second = asyncio.ensure_future(service.calc(JD, OBS_LON, OBS_LAT))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        shared = next(iter(service.pending.values()))
+        first.cancel()
+        await asyncio.sleep(0)
+        assert first.cancelled()
+        assert not shared.cancelled()
+        executor.release.set()
+        result = await second
+        assert shared.result() is result
+        return service
+
+    service = run(test, hold = True)
+    assert service.computations == 1
+    assert service.pending == {}
+
+
+def testResultsMatchTheBatchEngine():
+    async def test(service, executor):
+        return await service.calc(JD + 10.0 / SunMoonCalculator.SECONDS_PER_DAY, OBS_LON, OBS_LAT, 100.4)
+
+    result = run(test)
+    obsLon = round(OBS_LON / SunMoonService.SITE_RESOLUTION) * SunMoonService.SITE_RESOLUTION
+    obsLat = round(OBS_LAT / SunMoonService.SITE_RESOLUTION) * SunMoonService.SITE_RESOLUTION
+    sun, moon, moonAge = SunMoonBatch.calcSunAndMoon(np.array([JD]), obsLon, obsLat, 100.0)
+    assert result['moonAge'] == pytest.approx(float(moonAge[0]), abs=1e-12)
+    for name, series in (('sun', sun), ('moon', moon)):
+        for field in SunMoonBatch.FIELDS:
+            assert result[name][field] == pytest.approx(float(getattr(series, field)[0]), abs=1e-12), field
+
+    calc = SunMoonCalculator(obsLon, obsLat, 100.0, 2024, 1, 1, 12, 0, 30)
+    calc.calcSunAndMoon()
+    assert result['moon']['rise'] == pytest.approx(calc.moon.rise, abs=1e-9)
+    assert result['sun']['transit'] == pytest.approx(calc.sun.transit, abs=1e-9)
@@ -0,0 +1,84 @@
+#MIT License
+
+#Copyright (c) 2022 Leandro Castro Pérez
+
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+
+#################################################################################################################################
+# Tests of the tracker against the batch engine evaluated at every tick.
+#################################################################################################################################
+
+import itertools
+import math
+import numpy as np
+import pytest
+
+from SunMoonCalculator import SunMoonCalculator
+from Tracker import Tracker
+import SunMoonBatch
+
+
+OBS_LON = math.radians(-4)
+OBS_LAT = math.radians(40)
+
+# Documented interpolation error for the default refresh
+TOLERANCE = math.radians(0.01 / 3600)
+
+# March equinox 2024 at 03:06 UT, when the right ascension of the Sun goes through 0
+EQUINOX = 2460389.5 + (3 * 60 + 6) / 1440.0
+
+
+def getTicks(tracker, jdStart, n):
+    return np.array(list(itertools.islice(tracker.track(jdStart), n)))
+
+
+@pytest.mark.parametrize('jdStart', [2460310.5, EQUINOX - 1.5 / 1440])
+def testMatchesTheBatchEngineAtEveryTick(jdStart):
+    tracker = Tracker(OBS_LON, OBS_LAT, 0.0, cadence = 1.0)
+    # Three refresh intervals, so the ticks around the boundaries are included
+    ticks = getTicks(tracker, jdStart, 3 * tracker.ticks)
+    np.testing.assert_allclose(ticks[:, 0], jdStart + np.arange(len(ticks)) / SunMoonCalculator.SECONDS_PER_DAY, rtol=0, atol=1e-9)
+
+    sun, moon = SunMoonBatch.calcForObservers(SunMoonBatch.calcGeocentric(ticks[:, 0]), OBS_LON, OBS_LAT, 0.0)
+    for column, body in ((1, sun), (3, moon)):
+        azimuth = np.mod(ticks[:, column] - body.azimuth + math.pi, SunMoonCalculator.TWO_PI) - math.pi
+        assert np.abs(azimuth * np.cos(body.elevation)).max() < TOLERANCE
+        assert np.abs(ticks[:, column + 1] - body.elevation).max() < TOLERANCE
+
+
+def testRightAscensionWrapAround():
+    tracker = Tracker(OBS_LON, OBS_LAT, 0.0, cadence = 1.0)
+    jd, sunAz, sunEl, moonAz, moonEl = tracker.calcInterval(EQUINOX - 0.5 / 1440)
+    sun = SunMoonBatch.calcSunAndMoon(jd, OBS_LON, OBS_LAT, 0.0)[0]
+    # The interval goes through 0h of right ascension
+    assert sun.rightAscension.max() - sun.rightAscension.min() > math.pi
+    assert np.abs(sunEl - sun.elevation).max() < TOLERANCE
+    assert np.abs(np.mod(sunAz - sun.azimuth + math.pi, SunMoonCalculator.TWO_PI) - math.pi).max() < TOLERANCE
+
+
+def testThreeEvaluationsPerRefresh():
+    tracker = Tracker(OBS_LON, OBS_LAT)
+    assert tracker.ticks == round(Tracker.REFRESH / Tracker.CADENCE)
+    generator = tracker.track(2460310.5)
+    next(generator)
+    assert tracker.evaluations == 3
+    list(itertools.islice(generator, tracker.ticks - 1))
+    assert tracker.evaluations == 3
+    next(generator)
+    assert tracker.evaluations == 6
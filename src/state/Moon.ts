@@ -1,15 +1,21 @@
 import { moonAnglesAndRelativeSize } from 'algorithm/moonAnglesAndRelativeSize';
+import { MoonTable, fetchMoonTable, moonTableLookup } from 'algorithm/moonTable';
+import moonTablePath from 'assets/tables/moon.bin';
 import dayjs, { Dayjs } from 'dayjs';
-import { makeAutoObservable } from 'mobx';
+import { makeAutoObservable, observable } from 'mobx';
 
 class Moon {
     minDate = dayjs().subtract(1, 'month');
     maxDate = dayjs().add(1, 'month');
     date = dayjs();
     isAutoUpdating = true;
+    table: MoonTable | null = null;
 
     constructor() {
-        makeAutoObservable(this);
+        makeAutoObservable(this, { table: observable.ref });
+        fetchMoonTable(moonTablePath)
+            .then(table => this.setTable(table))
+            .catch(e => console.warn('Using the analytic moon series, the table could not be loaded:', e));
         setInterval(() => {
             if (this.isAutoUpdating)
                 this.setDateToCurrent();
@@ -36,8 +42,13 @@ class Moon {
         this.date = d;
     }
 
+    // Table baked by src/algorithm/MoonTable.py into assets/tables/moon.bin, loaded at startup
+    setTable(table: MoonTable | null) {
+        this.table = table;
+    }
+
     get properties() {
-        return moonAnglesAndRelativeSize(this.date);
+        return (this.table && moonTableLookup(this.table, this.date)) || moonAnglesAndRelativeSize(this.date);
     }
 }
 
@@ -12,3 +12,8 @@ declare module '*.glb' {
     const link: string;
     export = link;
 }
+
+declare module '*.bin' {
+    const link: string;
+    export = link;
+}
@@ -29,7 +29,7 @@ module.exports = () => {
                     use: [{ loader: 'html-loader', options: { minimize: true } }]
                 },
                 {
-                    test: /\.(jpg|png|gif|svg|tiff|dae|ttf|woff|woff2|glb)$/,
+                    test: /\.(jpg|png|gif|svg|tiff|dae|ttf|woff|woff2|glb|bin)$/,
                     use: 'file-loader'
                 }
             ]